@@ -0,0 +1,275 @@
+# archives.py
+# Parcours d'archives distantes sans les télécharger.
+# ZIP : la table des matières (répertoire central) est à la fin du fichier ;
+# on lit la fin pour la localiser, puis le répertoire central d'un seul bloc.
+# Un membre est extrait en ne lisant que ses octets compressés, décompressés
+# à la volée.
+# TAR (compressé ou non) : pas d'index, le serveur fait le travail avec
+# `tar -t` pour la liste et `tar -xO` pour un membre, lu en flux sur exec.
+import bz2
+import zlib
+import shlex
+import struct
+import posixpath
+import datetime
+
+from logic import OperationCancelled
+
+ZIP_SUFFIXES = (".zip", ".jar", ".war", ".ear", ".whl", ".apk")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar.zst")
+
+# Fin d'archive : enregistrement EOCD (22 octets) + commentaire (64 Ko max)
+_EOCD_SEARCH = 22 + 65535
+EXTRACT_CHUNK = 256 * 1024
+EXTRACT_PREFETCH = 32
+
+
+def archive_kind(name):
+    """"zip", "tar" ou None selon l'extension de `name`."""
+    lower = name.lower()
+    if lower.endswith(ZIP_SUFFIXES):
+        return "zip"
+    if lower.endswith(TAR_SUFFIXES):
+        return "tar"
+    return None
+
+
+class Member:
+    """Entrée d'une archive. `size` vaut None si inconnue."""
+    __slots__ = ("name", "size", "is_dir", "mtime", "method", "flags", "crc",
+                 "compressed", "offset")
+
+    def __init__(self, name, size=None, is_dir=False, mtime=None):
+        self.name = name
+        self.size = size
+        self.is_dir = is_dir
+        self.mtime = mtime
+        self.method = self.flags = self.crc = self.compressed = self.offset = None
+
+
+def safe_parts(name):
+    """Composants d'un nom de membre sans "", "." ni ".." (ni lecteur Windows).
+
+    Un membre « ../../x » ou « ..\\..\\x » ne doit jamais désigner un chemin
+    hors du dossier d'extraction : les deux séparateurs sont reconnus.
+    """
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    if parts and len(parts[0]) == 2 and parts[0][1] == ":":
+        parts = parts[1:]
+    return parts
+
+
+def build_tree(members):
+    """{dossier virtuel: {nom: Member, ou None pour un sous-dossier}}.
+
+    Les dossiers intermédiaires absents de l'archive sont créés. Les noms sont
+    nettoyés par safe_parts.
+    """
+    tree = {"": {}}
+    for m in members:
+        parts = safe_parts(m.name)
+        if not parts:
+            continue
+        path = "/".join(parts)
+        for i in range(len(parts) - 1):
+            parent = "/".join(parts[:i])
+            tree.setdefault(parent, {}).setdefault(parts[i], None)
+            tree.setdefault("/".join(parts[:i + 1]), {})
+        parent = "/".join(parts[:-1])
+        if m.is_dir:
+            tree.setdefault(parent, {}).setdefault(parts[-1], None)
+            tree.setdefault(path, {})
+        else:
+            tree.setdefault(parent, {})[parts[-1]] = m
+    return tree
+
+
+def _dos_time(date, time_):
+    try:
+        return datetime.datetime(1980 + (date >> 9), (date >> 5) & 0xF, date & 0x1F,
+                                 time_ >> 11, (time_ >> 5) & 0x3F, (time_ & 0x1F) * 2).timestamp()
+    except ValueError:
+        return None
+
+
+# ===================== ZIP =====================
+
+class ZipArchive:
+    """Archive ZIP distante lue par plages d'octets (voir SSHClient.read_range)."""
+
+    def __init__(self, ssh, path, size=None):
+        self.ssh = ssh
+        self.path = path
+        self.size = size if size is not None else ssh.stat(path).st_size
+
+    def _central_directory(self):
+        tail = self.ssh.read_range(self.path, -_EOCD_SEARCH, _EOCD_SEARCH, size=self.size)
+        pos = tail.rfind(b"PK\x05\x06")
+        if pos < 0 or len(tail) - pos < 22:
+            raise ValueError("Archive ZIP invalide (fin de répertoire introuvable)")
+        count, cd_size, cd_offset = struct.unpack("<6xHII", tail[pos + 4:pos + 20])
+        if 0xFFFFFFFF in (cd_size, cd_offset) or count == 0xFFFF:
+            # ZIP64 : le localisateur précède l'EOCD et pointe l'EOCD 64 bits
+            loc = tail.rfind(b"PK\x06\x07", 0, pos)
+            if loc < 0:
+                raise ValueError("Archive ZIP64 invalide")
+            record = struct.unpack("<Q", tail[loc + 8:loc + 16])[0]
+            data = self.ssh.read_range(self.path, record, 56, size=self.size)
+            if data[:4] != b"PK\x06\x06":
+                raise ValueError("Archive ZIP64 invalide")
+            count, cd_size, cd_offset = struct.unpack("<QQQ", data[32:56])
+        tail_start = self.size - len(tail)
+        if cd_offset >= tail_start:
+            # Petite archive : le répertoire central est déjà dans la fin lue
+            return tail[cd_offset - tail_start:cd_offset - tail_start + cd_size], count
+        return self.ssh.read_range(self.path, cd_offset, cd_size, size=self.size), count
+
+    def members(self):
+        data, count = self._central_directory()
+        out = []
+        pos = 0
+        while pos + 46 <= len(data) and data[pos:pos + 4] == b"PK\x01\x02":
+            (flags, method, mtime, mdate, crc, compressed, size,
+             name_len, extra_len, comment_len, offset) = struct.unpack(
+                "<8xHHHHIIIHHH8xI", data[pos:pos + 46])
+            raw = data[pos + 46:pos + 46 + name_len]
+            name = raw.decode("utf-8" if flags & 0x800 else "cp437", "replace")
+            extra = data[pos + 46 + name_len:pos + 46 + name_len + extra_len]
+            size, compressed, offset = self._zip64_extra(extra, size, compressed, offset)
+            m = Member(name, size, name.endswith("/"), _dos_time(mdate, mtime))
+            m.method, m.flags, m.crc, m.compressed, m.offset = method, flags, crc, compressed, offset
+            out.append(m)
+            pos += 46 + name_len + extra_len + comment_len
+        return out
+
+    @staticmethod
+    def _zip64_extra(extra, size, compressed, offset):
+        i = 0
+        while i + 4 <= len(extra):
+            tag, length = struct.unpack("<HH", extra[i:i + 4])
+            if tag == 0x0001:
+                values = iter(struct.unpack(f"<{length // 8}Q", extra[i + 4:i + 4 + length // 8 * 8]))
+                # Seuls les champs saturés à 0xFFFFFFFF sont présents, dans cet ordre
+                if size == 0xFFFFFFFF:
+                    size = next(values, size)
+                if compressed == 0xFFFFFFFF:
+                    compressed = next(values, compressed)
+                if offset == 0xFFFFFFFF:
+                    offset = next(values, offset)
+                break
+            i += 4 + length
+        return size, compressed, offset
+
+    def extract(self, member, out, progress=None, cancel=None):
+        """Écrit le contenu décompressé de `member` dans `out` (fichier binaire ouvert)."""
+        if member.flags & 0x1:
+            raise ValueError(f"{member.name} : membre chiffré, extraction impossible")
+        if member.method == 0:
+            decompressor = None
+        elif member.method == 8:
+            decompressor = zlib.decompressobj(-15)
+        elif member.method == 12:
+            decompressor = bz2.BZ2Decompressor()
+        else:
+            raise ValueError(f"{member.name} : méthode de compression {member.method} non prise en charge")
+
+        header = self.ssh.read_range(self.path, member.offset, 30, size=self.size)
+        if header[:4] != b"PK\x03\x04":
+            raise ValueError(f"{member.name} : en-tête local invalide")
+        name_len, extra_len = struct.unpack("<HH", header[26:30])
+        start = member.offset + 30 + name_len + extra_len
+        end = start + member.compressed
+
+        crc = 0
+        done = 0
+        sftp = self.ssh.open_sftp_channel()
+        try:
+            with sftp.open(self.path, "rb") as f:
+                f.seek(start)
+                f.prefetch(end, max_concurrent_requests=EXTRACT_PREFETCH)
+                remaining = member.compressed
+                while remaining:
+                    if cancel is not None and cancel.is_set():
+                        raise OperationCancelled("Opération annulée")
+                    block = f.read(min(EXTRACT_CHUNK, remaining))
+                    if not block:
+                        raise IOError(f"{member.name} : archive tronquée")
+                    remaining -= len(block)
+                    data = decompressor.decompress(block) if decompressor else block
+                    if not remaining and hasattr(decompressor, "flush"):
+                        data += decompressor.flush()
+                    crc = zlib.crc32(data, crc)
+                    out.write(data)
+                    done += len(data)
+                    if progress:
+                        progress(done, member.size)
+        finally:
+            sftp.close()
+        if crc != member.crc:
+            raise IOError(f"{member.name} : somme de contrôle incorrecte")
+
+
+# ===================== TAR =====================
+
+class TarArchive:
+    """Archive tar distante (compression détectée par tar), via exec."""
+
+    def __init__(self, ssh, path, size=None):
+        self.ssh = ssh
+        self.path = path
+
+    def members(self, cancel=None):
+        out = []
+        command = "tar -tvf {} 2>/dev/null".format(shlex.quote(self.path))
+        for line in self.ssh.exec_lines(command, cancel=cancel):
+            m = _parse_tar_line(line.decode("utf-8", "replace"))
+            if m is not None:
+                out.append(m)
+        if not out:
+            raise ValueError("Archive tar illisible (ou tar indisponible sur le serveur)")
+        return out
+
+    def extract(self, member, out, progress=None, cancel=None):
+        command = "tar -xOf {} -- {}".format(shlex.quote(self.path), shlex.quote(member.name))
+        status = []
+        done = 0
+        for data in self.ssh.exec_chunks(command, cancel=cancel, status=status):
+            out.write(data)
+            done += len(data)
+            if progress:
+                progress(done, member.size)
+        if status and status[0] != 0:
+            raise IOError(f"{member.name} : extraction refusée par tar (code {status[0]})")
+
+
+def _parse_tar_line(line):
+    """Une ligne de `tar -tv` (GNU : « -rw-r--r-- u/g 123 2024-01-31 12:00 nom »,
+    bsdtar : « -rw-r--r--  0 u g 123 Jan 31 12:00 nom »)."""
+    fields = line.split(None, 5)
+    if len(fields) < 6 or len(fields[0]) != 10:
+        return None
+    mode = fields[0]
+    if "/" in fields[1]:                       # GNU tar
+        size, rest = fields[2], fields[5]
+    else:                                      # bsdtar : nlink user group size mois jour heure nom
+        more = line.split(None, 8)
+        if len(more) < 9:
+            return None
+        size, rest = more[4], more[8]
+    if mode[0] == "l":
+        rest = rest.split(" -> ", 1)[0]
+    elif mode[0] == "h":
+        rest = rest.split(" link to ", 1)[0]
+    if mode[0] not in "-dlh":
+        return None  # périphériques, fifos : rien à extraire
+    is_dir = mode[0] == "d"
+    return Member(rest, None if is_dir or not size.isdigit() else int(size), is_dir)
+
+
+def open_archive(ssh, path, size=None):
+    kind = archive_kind(posixpath.basename(path))
+    if kind == "zip":
+        return ZipArchive(ssh, path, size)
+    if kind == "tar":
+        return TarArchive(ssh, path, size)
+    raise ValueError(f"{path} : format d'archive non reconnu")
@@ -0,0 +1,473 @@
+# bench.py
+# Banc de mesure de bout en bout : un serveur SSH/SFTP paramiko tourne dans le
+# processus sur localhost, derrière un relais TCP qui simule la latence et le
+# débit d'un vrai lien. Les résultats sont écrits en JSON pour comparer deux
+# versions.
+#
+# Exemples :
+#   python bench.py --rtt 40 --bandwidth 20 --out bench.json
+#   python bench.py --listing 10,10000 --transfer 1,8 --compare ancien.json
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+from collections import deque
+
+import paramiko
+from paramiko import SFTPServer, SFTPServerInterface, SFTPAttributes, SFTPHandle, SFTP_OK, SFTP_EOF
+from paramiko.message import Message
+from paramiko.sftp import CMD_NAME
+
+from logic import SSHClient
+
+BENCH_USER = "bench"
+BENCH_PASSWORD = "bench"
+# Noms renvoyés par réponse READDIR (OpenSSH en envoie une centaine ; paramiko
+# se limite à 16, ce qui fausserait les mesures de listing sous latence).
+READDIR_BATCH = 96
+
+
+# ===================== SERVEUR SFTP LOCAL =====================
+
+class _StubServer(paramiko.ServerInterface):
+    """Accepte l'utilisateur de test, les sessions et le sous-système SFTP (pas d'exec)."""
+
+    def check_auth_password(self, username, password):
+        if (username, password) == (BENCH_USER, BENCH_PASSWORD):
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+
+class _SFTPServer(SFTPServer):
+    def _read_folder(self, request_number, folder):
+        flist = []
+        while len(flist) < READDIR_BATCH:
+            chunk = folder._get_next_files()
+            if not chunk:
+                break
+            flist += chunk
+        if not flist:
+            self._send_status(request_number, SFTP_EOF)
+            return
+        msg = Message()
+        msg.add_int(request_number)
+        msg.add_int(len(flist))
+        for attr in flist:
+            msg.add_string(attr.filename)
+            msg.add_string(attr)
+            attr._pack(msg)
+        self._send_packet(CMD_NAME, msg)
+
+
+class _LocalHandle(SFTPHandle):
+    def stat(self):
+        try:
+            return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def chattr(self, attr):
+        return SFTP_OK
+
+
+class _LocalSFTP(SFTPServerInterface):
+    """Sert un dossier local comme racine « / » du serveur."""
+
+    def __init__(self, server, root, *args, **kwargs):
+        super().__init__(server, *args, **kwargs)
+        self.root = root
+
+    def _real(self, path):
+        return os.path.join(self.root, self.canonicalize(path).lstrip("/"))
+
+    def _call(self, func, *args):
+        try:
+            func(*args)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def list_folder(self, path):
+        real = self._real(path)
+        try:
+            out = []
+            with os.scandir(real) as it:
+                for entry in it:
+                    attr = SFTPAttributes.from_stat(entry.stat(follow_symlinks=False))
+                    attr.filename = entry.name
+                    out.append(attr)
+            return out
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.stat(self._real(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def lstat(self, path):
+        try:
+            return SFTPAttributes.from_stat(os.lstat(self._real(path)))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def readlink(self, path):
+        try:
+            return os.readlink(self._real(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def open(self, path, flags, attr):
+        real = self._real(path)
+        try:
+            fd = os.open(real, flags | getattr(os, "O_BINARY", 0), 0o644)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        f = os.fdopen(fd, mode)
+        handle = _LocalHandle(flags)
+        handle.filename = real
+        handle.readfile = f
+        handle.writefile = f
+        return handle
+
+    def remove(self, path):
+        return self._call(os.remove, self._real(path))
+
+    def rename(self, oldpath, newpath):
+        real = self._real(newpath)
+        if os.path.exists(real):
+            return SFTPServer.convert_errno(17)  # EEXIST, comme OpenSSH
+        return self._call(os.rename, self._real(oldpath), real)
+
+    def posix_rename(self, oldpath, newpath):
+        return self._call(os.replace, self._real(oldpath), self._real(newpath))
+
+    def mkdir(self, path, attr):
+        return self._call(os.mkdir, self._real(path))
+
+    def rmdir(self, path):
+        return self._call(os.rmdir, self._real(path))
+
+    def chattr(self, path, attr):
+        if attr.st_mode is not None:
+            return self._call(os.chmod, self._real(path), attr.st_mode & 0o7777)
+        if attr.st_mtime is not None:
+            return self._call(os.utime, self._real(path), (attr.st_atime, attr.st_mtime))
+        return SFTP_OK
+
+
+class StubSFTPServer:
+    """Serveur SSH/SFTP en mémoire de processus, qui sert `root` sur 127.0.0.1."""
+
+    def __init__(self, root):
+        self.root = root
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        self.transports = []
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            t = paramiko.Transport(conn)
+            t.add_server_key(self.host_key)
+            t.set_subsystem_handler("sftp", _SFTPServer, _LocalSFTP, self.root)
+            t.start_server(server=_StubServer())
+            self.transports.append(t)
+
+    def close(self):
+        self.sock.close()
+        for t in self.transports:
+            t.close()
+
+
+# ===================== SIMULATION DU LIEN =====================
+
+class LinkEmulator:
+    """Relais TCP qui ajoute `rtt_ms`/2 de délai dans chaque sens et limite le débit.
+
+    `bandwidth_mbps` (mégabits/s, 0 = illimité) s'applique à chaque sens
+    indépendamment, comme sur un lien symétrique.
+    """
+
+    def __init__(self, target_port, rtt_ms=0.0, bandwidth_mbps=0.0):
+        self.target_port = target_port
+        self.delay = rtt_ms / 2000.0
+        self.rate = bandwidth_mbps * 1e6 / 8 if bandwidth_mbps else 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen(16)
+        self.port = self.sock.getsockname()[1]
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self.sock.accept()
+            except OSError:
+                return
+            upstream = socket.create_connection(("127.0.0.1", self.target_port))
+            for s in (client, upstream):
+                s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._pipe(client, upstream)
+            self._pipe(upstream, client)
+
+    def _pipe(self, src, dst):
+        queue = deque()
+        ready = threading.Condition()
+
+        def reader():
+            while True:
+                try:
+                    data = src.recv(65536)
+                except OSError:
+                    data = b""
+                with ready:
+                    queue.append((time.monotonic() + self.delay, data))
+                    ready.notify()
+                if not data:
+                    return
+
+        def writer():
+            while True:
+                with ready:
+                    while not queue:
+                        ready.wait()
+                    due, data = queue.popleft()
+                wait = due - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+                if not data:
+                    try:
+                        dst.shutdown(socket.SHUT_WR)
+                    except OSError:
+                        pass
+                    return
+                try:
+                    dst.sendall(data)
+                except OSError:
+                    return
+                if self.rate:
+                    time.sleep(len(data) / self.rate)
+
+        threading.Thread(target=reader, daemon=True).start()
+        threading.Thread(target=writer, daemon=True).start()
+
+    def close(self):
+        self.sock.close()
+
+
+# ===================== MESURES =====================
+
+def _median_time(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(times), "min_s": min(times), "runs": repeat}
+
+
+def _make_tree(root, listings, transfers_mb):
+    for n in listings:
+        folder = os.path.join(root, f"list_{n}")
+        os.makedirs(folder, exist_ok=True)
+        for i in range(n):
+            open(os.path.join(folder, f"f{i:06d}.txt"), "wb").close()
+    for mb in transfers_mb:
+        with open(os.path.join(root, f"blob_{mb}M.bin"), "wb") as f:
+            f.write(os.urandom(int(mb * 1024 * 1024)))
+
+
+def bench_connect(cfg, repeat):
+    def once():
+        ssh = SSHClient(dict(cfg))
+        ssh.connect()
+        ssh.close()
+    return _median_time(once, repeat)
+
+
+def bench_listing(ssh, n, repeat):
+    result = _median_time(lambda: ssh.listdir_attr(f"/list_{n}"), repeat)
+    result["entries"] = n
+    return result
+
+
+def bench_transfer(ssh, mb, workdir, repeat):
+    remote = f"/blob_{mb}M.bin"
+    local = os.path.join(workdir, f"down_{mb}M.bin")
+    size = int(mb * 1024 * 1024)
+    down = _median_time(lambda: ssh.download_to(remote, local), repeat)
+    up = _median_time(lambda: ssh.upload_from(local, f"/up_{mb}M.bin"), repeat)
+    return {
+        "bytes": size,
+        "download": dict(down, mb_per_s=size / down["median_s"] / 1e6),
+        "upload": dict(up, mb_per_s=size / up["median_s"] / 1e6),
+    }
+
+
+def bench_first_row(cfg, n, timeout=60):
+    """Temps entre la création d'ExplorerUI et l'affichage de la première ligne.
+
+    Nécessite un affichage (Tk) ; le cache des listings est isolé dans un
+    fichier temporaire pour mesurer un premier affichage à froid.
+    """
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        return {"skipped": f"Tk indisponible : {e}"}
+    import cache
+    from ui import ExplorerUI
+
+    db = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+    cache._cache = cache.ListingCache(db)
+    root.withdraw()
+    ssh = SSHClient(dict(cfg))
+    ssh.connect()
+    try:
+        start = time.perf_counter()
+        win = ExplorerUI(root, ssh, start_path=f"/list_{n}")
+        win.withdraw()
+        deadline = time.monotonic() + timeout
+        while not win.tree.get_children() and time.monotonic() < deadline:
+            root.update()
+            time.sleep(0.001)
+        elapsed = time.perf_counter() - start
+        rows = len(win.tree.get_children())
+        win.destroy()
+        return {"seconds": elapsed, "rows": rows, "entries": n}
+    finally:
+        ssh.close()
+        root.destroy()
+        cache._cache.close()
+        cache._cache = None
+        os.remove(db)
+
+
+def run(args):
+    listings = [int(x) for x in args.listing.split(",") if x]
+    transfers = [float(x) for x in args.transfer.split(",") if x]
+    workdir = tempfile.mkdtemp(prefix="bench_")
+    root = os.path.join(workdir, "remote")
+    os.makedirs(root)
+    server = link = None
+    try:
+        _make_tree(root, listings, transfers)
+        server = StubSFTPServer(root)
+        link = LinkEmulator(server.port, args.rtt, args.bandwidth)
+        cfg = {"host": "127.0.0.1", "port": link.port, "username": BENCH_USER,
+               "auth": {"type": "password", "password": BENCH_PASSWORD},
+               "start_path": "/", "allow_exec": False, "auto_tune": False}
+
+        results = {"connect": bench_connect(cfg, args.repeat)}
+        ssh = SSHClient(dict(cfg))
+        ssh.connect()
+        try:
+            results["listing"] = {str(n): bench_listing(ssh, n, args.repeat) for n in listings}
+            results["transfer"] = {f"{mb:g}M": bench_transfer(ssh, mb, workdir, args.repeat) for mb in transfers}
+        finally:
+            ssh.close()
+        if not args.no_ui:
+            results["first_row"] = {str(n): bench_first_row(cfg, n) for n in listings}
+        return {
+            "params": {"rtt_ms": args.rtt, "bandwidth_mbps": args.bandwidth, "repeat": args.repeat},
+            "environment": {"python": platform.python_version(), "paramiko": paramiko.__version__,
+                            "platform": platform.platform()},
+            "results": results,
+        }
+    finally:
+        if link:
+            link.close()
+        if server:
+            server.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+# ===================== COMPARAISON =====================
+
+def _flatten(data, prefix=""):
+    """{"a.b.median_s": valeur} pour toutes les durées d'un résultat."""
+    out = {}
+    for key, value in data.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            out.update(_flatten(value, name + "."))
+        elif key in ("median_s", "seconds") and isinstance(value, (int, float)):
+            out[name] = value
+    return out
+
+
+def compare(old, new, threshold=0.10):
+    """Lignes (mesure, ancien, nouveau, rapport) ; rapport > 1 + seuil = régression."""
+    before, after = _flatten(old["results"]), _flatten(new["results"])
+    rows = []
+    for name in sorted(before.keys() & after.keys()):
+        ratio = after[name] / before[name] if before[name] else float("inf")
+        rows.append((name, before[name], after[name], ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="bench.py", description="Banc de mesure de l'explorateur distant")
+    p.add_argument("--rtt", type=float, default=0.0, help="latence aller-retour simulée (ms)")
+    p.add_argument("--bandwidth", type=float, default=0.0, help="débit simulé par sens (Mbit/s, 0 = illimité)")
+    p.add_argument("--listing", default="10,10000,200000", help="tailles de dossiers à lister")
+    p.add_argument("--transfer", default="1,16", help="tailles de fichiers transférés (Mo)")
+    p.add_argument("--repeat", type=int, default=3, help="répétitions par mesure (médiane retenue)")
+    p.add_argument("--no-ui", action="store_true", help="ne mesure pas le temps jusqu'à la première ligne")
+    p.add_argument("--out", help="fichier JSON de sortie (sinon sortie standard)")
+    p.add_argument("--compare", help="résultat JSON précédent à comparer")
+    args = p.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            old = json.load(f)
+        regressions = 0
+        for name, before, after, ratio, worse in compare(old, report):
+            regressions += worse
+            mark = "  RÉGRESSION" if worse else ""
+            print(f"{name:45} {before:9.4f}s -> {after:9.4f}s  x{ratio:.2f}{mark}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
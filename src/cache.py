@@ -0,0 +1,213 @@
+# cache.py
+# Cache local persistant des listings distants (SQLite), un jeu par serveur.
+# La mtime du dossier distant sert de validateur : un listing en cache est
+# affiché immédiatement, puis revalidé en arrière-plan par un simple stat.
+import json
+import time
+import sqlite3
+import threading
+
+from paramiko.sftp_attr import SFTPAttributes
+
+from servers import get_path
+
+CACHE_FILE = get_path("cache.db")
+# Nombre maximal d'entrées (fichiers + dossiers listés) conservées par serveur,
+# et taille maximale de la base ; au-delà, les dossiers les moins récemment
+# consultés sont évincés.
+CACHE_MAX_ENTRIES_PER_SERVER = 200_000
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS listings (
+    server   TEXT NOT NULL,
+    path     TEXT NOT NULL,
+    mtime    INTEGER,
+    count    INTEGER NOT NULL,
+    data     TEXT NOT NULL,
+    accessed REAL NOT NULL,
+    PRIMARY KEY (server, path)
+);
+CREATE INDEX IF NOT EXISTS listings_lru ON listings (server, accessed);
+CREATE TABLE IF NOT EXISTS usage (
+    server   TEXT NOT NULL,
+    path     TEXT NOT NULL,
+    mtime    INTEGER,
+    total    INTEGER NOT NULL,
+    subdirs  TEXT NOT NULL,
+    method   TEXT NOT NULL,
+    computed REAL NOT NULL,
+    PRIMARY KEY (server, path)
+);
+"""
+
+
+def server_key(cfg):
+    """Identifiant d'un serveur dans le cache : utilisateur@hôte:port."""
+    return "{}@{}:{}".format(cfg.get("username"), cfg.get("host"), cfg.get("port", 22))
+
+
+def _encode(a):
+    row = [a.filename, a.st_mode, a.st_size, a.st_mtime]
+    if hasattr(a, "target_attr"):
+        target = a.target_attr
+        row += [a.link_target, target.st_mode if target else None, target.st_size if target else None]
+    return row
+
+
+class ListingCache:
+    """Listings {(serveur, dossier): [SFTPAttributes]} persistés dans SQLite.
+
+    Une seule connexion partagée entre threads, protégée par un verrou : les
+    accès sont courts (une ligne par dossier, listing sérialisé en JSON).
+    Une lecture n'écrit rien : les dates d'accès (ordre LRU) sont gardées en
+    mémoire et enregistrées avec l'écriture suivante. Les totaux (entrées par
+    serveur, octets) sont tenus à jour en mémoire ; l'éviction n'a lieu qu'au
+    dépassement d'une limite.
+    """
+
+    def __init__(self, path=CACHE_FILE):
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(_SCHEMA)
+        self._accessed = {}   # (serveur, dossier) -> date d'accès pas encore enregistrée
+        self._counts = None   # serveur -> entrées en cache (calculé à la demande)
+        self._bytes = 0
+
+    def get(self, server, path):
+        """Retourne (mtime du dossier, [SFTPAttributes]) ou None."""
+        with self._lock:
+            row = self.db.execute("SELECT mtime, data FROM listings WHERE server=? AND path=?",
+                                  (server, path)).fetchone()
+            if row is None:
+                return None
+            self._accessed[(server, path)] = time.time()
+        attrs = []
+        for name, mode, size, mtime, *link in json.loads(row[1]):
+            a = SFTPAttributes()
+            a.filename, a.st_mode, a.st_size, a.st_mtime = name, mode, size, mtime
+            if link:
+                # Lien symbolique résolu : [cible, mode et taille de la cible]
+                a.link_target, target_mode, target_size = link
+                a.target_attr = None
+                if target_mode is not None:
+                    a.target_attr = SFTPAttributes()
+                    a.target_attr.st_mode, a.target_attr.st_size = target_mode, target_size
+            attrs.append(a)
+        return row[0], attrs
+
+    def put(self, server, path, dir_mtime, attrs):
+        data = json.dumps([_encode(a) for a in attrs], ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._accessed.pop((server, path), None)
+            self._flush_accessed()
+            self._load_totals()
+            old = self.db.execute("SELECT count, LENGTH(data) FROM listings WHERE server=? AND path=?",
+                                  (server, path)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?)",
+                            (server, path, dir_mtime, len(attrs), data, time.time()))
+            old_count, old_bytes = old or (0, 0)
+            self._counts[server] = self._counts.get(server, 0) - old_count + len(attrs)
+            self._bytes += len(data) - old_bytes
+            if self._counts[server] > CACHE_MAX_ENTRIES_PER_SERVER or self._bytes > CACHE_MAX_BYTES:
+                self._evict(server)
+                self._counts = None
+            self.db.commit()
+
+    def _flush_accessed(self):
+        """Enregistre les dates d'accès accumulées par get (appelé verrou pris)."""
+        if self._accessed:
+            self.db.executemany("UPDATE listings SET accessed=? WHERE server=? AND path=?",
+                                [(t, s, p) for (s, p), t in self._accessed.items()])
+            self._accessed.clear()
+
+    def _load_totals(self):
+        if self._counts is None:
+            self._counts = dict(self.db.execute(
+                "SELECT server, SUM(count) FROM listings GROUP BY server").fetchall())
+            self._bytes = self.db.execute(
+                "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM listings").fetchone()[0]
+
+    # --- Tailles de dossiers (voir diskusage.py) ---
+    def get_usage(self, server, path):
+        """Retourne {mtime, total, subdirs, method, computed} ou None."""
+        with self._lock:
+            row = self.db.execute("SELECT mtime, total, subdirs, method, computed FROM usage"
+                                  " WHERE server=? AND path=?", (server, path)).fetchone()
+        if row is None:
+            return None
+        return {"mtime": row[0], "total": row[1], "subdirs": json.loads(row[2]),
+                "method": row[3], "computed": row[4]}
+
+    def put_usage(self, server, entries):
+        """Enregistre [(dossier, mtime, total, {sous-dossier: total}, méthode)]."""
+        now = time.time()
+        rows = [(server, path, mtime, total, json.dumps(subdirs, ensure_ascii=False), method, now)
+                for path, mtime, total, subdirs, method in entries]
+        with self._lock:
+            self.db.executemany("INSERT OR REPLACE INTO usage VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.db.commit()
+
+    def invalidate(self, server, path):
+        with self._lock:
+            self.db.execute("DELETE FROM listings WHERE server=? AND path=?", (server, path))
+            self.db.commit()
+            self._counts = None
+
+    def clear(self, server=None):
+        """Vide le cache d'un serveur (ou de tous)."""
+        with self._lock:
+            if server is None:
+                self.db.execute("DELETE FROM listings")
+                self.db.execute("DELETE FROM usage")
+            else:
+                self.db.execute("DELETE FROM listings WHERE server=?", (server,))
+                self.db.execute("DELETE FROM usage WHERE server=?", (server,))
+            self.db.commit()
+            self.db.execute("VACUUM")
+            self._accessed.clear()
+            self._counts = None
+
+    def _evict(self, server):
+        """Supprime les dossiers les moins récemment consultés au-delà des limites."""
+        total = self.db.execute("SELECT COALESCE(SUM(count), 0) FROM listings WHERE server=?",
+                                (server,)).fetchone()[0]
+        if total > CACHE_MAX_ENTRIES_PER_SERVER:
+            self._drop_oldest("WHERE server=?", (server,), "count", total - CACHE_MAX_ENTRIES_PER_SERVER)
+        size = self.db.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM listings").fetchone()[0]
+        if size > CACHE_MAX_BYTES:
+            self._drop_oldest("", (), "LENGTH(data)", size - CACHE_MAX_BYTES)
+
+    def _drop_oldest(self, where, params, measure, excess):
+        rows = self.db.execute(f"SELECT server, path, {measure} FROM listings {where} ORDER BY accessed",
+                               params).fetchall()
+        doomed = []
+        for server, path, amount in rows:
+            if excess <= 0:
+                break
+            doomed.append((server, path))
+            excess -= amount
+        self.db.executemany("DELETE FROM listings WHERE server=? AND path=?", doomed)
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self.db.commit()
+            self.db.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Instance partagée du cache (None si la base ne peut pas être ouverte)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ListingCache()
+            except sqlite3.Error:
+                return None
+        return _cache
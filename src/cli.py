@@ -0,0 +1,216 @@
+# cli.py
+# Mode ligne de commande (sans interface graphique) pour les scripts, cron et CI.
+# N'importe jamais tkinter : seuls logic, servers, sync et workspace sont utilisés.
+#
+# Exemples :
+#   python cli.py hosts
+#   python cli.py -H web1 ls /var/www
+#   python cli.py --all --json put ./app.conf /etc/app/app.conf --only-changed
+#   python cli.py -H web1 -H web2 get /var/log/syslog ./logs/{host}.log
+#   python cli.py -H web1 sync ./site /var/www/site
+#   python cli.py -H web1 rm /tmp/build -r
+import os
+import sys
+import json
+import argparse
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+
+# Codes de sortie
+EXIT_OK, EXIT_FAILED, EXIT_USAGE = 0, 1, 2
+
+
+class UsageError(Exception):
+    """Erreur d'utilisation (arguments, serveurs introuvables)."""
+
+
+# ===================== SÉLECTION DES SERVEURS =====================
+
+def select_entries(entries, patterns, select_all):
+    """Filtre les entrées sauvegardées par index, hôte ou utilisateur@hôte."""
+    if not entries:
+        # Aussi le cas d'un fichier de configuration illisible (déchiffrement)
+        raise UsageError("Aucun serveur enregistré (ou configuration illisible)")
+    if select_all:
+        return list(entries)
+    if not patterns:
+        if len(entries) == 1:
+            return list(entries)
+        raise UsageError("Plusieurs serveurs enregistrés : précisez -H/--host ou --all")
+
+    from logic import entry_display
+    chosen = []
+    for pat in patterns:
+        matches = [e for i, e in enumerate(entries)
+                   if pat in (str(i), e.get("user_host"), entry_display(e))]
+        if not matches:
+            raise UsageError(f"Serveur introuvable : {pat}")
+        chosen += [m for m in matches if m not in chosen]
+    return chosen
+
+
+# ===================== OPÉRATIONS =====================
+
+def op_ls(ssh, host, args):
+    return [
+        {"name": a.filename, "dir": ssh.is_dir_attr(a), "size": a.st_size, "mtime": a.st_mtime}
+        for a in sorted(ssh.listdir_attr(args.remote), key=lambda a: a.filename)
+    ]
+
+
+def op_get(ssh, host, args):
+    local = args.local.replace("{host}", host)
+    if os.path.isdir(local):
+        local = os.path.join(local, posixpath.basename(args.remote))
+    ssh.download_to(args.remote, local)
+    return {"local": local, "size": os.path.getsize(local)}
+
+
+def op_put(ssh, host, args):
+    if os.path.isdir(args.local):
+        sent, skipped = ssh.upload_tree(args.local, args.remote, only_changed=args.only_changed)
+        return {"sent": sent, "skipped": skipped}
+    sent = ssh.upload_from(args.local, args.remote, only_changed=args.only_changed)
+    return {"sent": int(sent), "skipped": int(not sent)}
+
+
+def op_sync(ssh, host, args):
+    import sync
+    local = args.local.replace("{host}", host)
+    report = sync.sync_dirs(ssh, local, args.remote, propagate_deletes=not args.no_delete)
+    result = {k: len(report[k]) for k in ("upload", "download", "delete_local", "delete_remote", "unchanged",
+                                               "identical")}
+    result["conflicts"] = [{"path": p, "reason": r} for p, r in report["conflicts"]]
+    result["errors"] = [{"path": p, "error": m} for p, m in report["errors"]]
+    return result
+
+
+def op_rm(ssh, host, args):
+    attr = ssh.stat(args.remote)
+    if ssh.is_dir_attr(attr):
+        if not args.recursive:
+            raise IsADirectoryError(f"{args.remote} est un dossier (utilisez -r)")
+        ssh.remove_tree(args.remote)
+    else:
+        ssh.remove_file(args.remote)
+    return {"removed": args.remote}
+
+
+def run_on_host(entry, args):
+    """Connecte, exécute l'opération et retourne un dict résultat (jamais d'exception)."""
+    from logic import SSHClient, config_from_entry, entry_display
+    host = entry_display(entry)
+    # Pas de mesure du lien (16 Mo lus) pour une commande ponctuelle
+    ssh = SSHClient(dict(config_from_entry(entry), auto_tune=False))
+    try:
+        ssh.connect()
+        result = args.func(ssh, host, args)
+        # Une synchronisation partielle (erreurs de transfert) compte comme un échec
+        ok = not (isinstance(result, dict) and result.get("errors"))
+        return {"host": host, "ok": ok, "result": result}
+    except Exception as e:
+        return {"host": host, "ok": False, "error": str(e)}
+    finally:
+        ssh.close()
+
+
+# ===================== SORTIE =====================
+
+def print_human(res, out=sys.stdout):
+    if "error" in res:
+        print(f"[{res['host']}] ÉCHEC : {res['error']}", file=out)
+        return
+    result = res["result"]
+    if isinstance(result, list):
+        for item in result:
+            kind = "d" if item["dir"] else "-"
+            print(f"[{res['host']}] {kind} {item['size']:>12} {item['name']}", file=out)
+    else:
+        status = "OK" if res["ok"] else "ÉCHEC"
+        print(f"[{res['host']}] {status} {json.dumps(result, ensure_ascii=False)}", file=out)
+
+
+# ===================== ARGUMENTS =====================
+
+def build_parser():
+    p = argparse.ArgumentParser(prog="cli.py", description="Explorateur distant — mode ligne de commande")
+    p.add_argument("-H", "--host", action="append", default=[],
+                   help="serveur cible : index, hôte ou utilisateur@hôte (répétable)")
+    p.add_argument("--all", action="store_true", help="tous les serveurs enregistrés")
+    p.add_argument("-j", "--parallel", type=int, default=8, help="serveurs traités en parallèle")
+    p.add_argument("--json", action="store_true", help="sortie JSON (une ligne par serveur)")
+    p.add_argument("--stats", metavar="FICHIER", help="écrit les temps d'opération (JSON) dans FICHIER")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("hosts", help="liste les serveurs enregistrés")
+
+    s = sub.add_parser("ls", help="liste un dossier distant")
+    s.add_argument("remote")
+    s.set_defaults(func=op_ls)
+
+    s = sub.add_parser("get", help="télécharge un fichier ({host} est remplacé dans LOCAL)")
+    s.add_argument("remote")
+    s.add_argument("local")
+    s.set_defaults(func=op_get)
+
+    s = sub.add_parser("put", help="envoie un fichier ou un dossier")
+    s.add_argument("local")
+    s.add_argument("remote")
+    s.add_argument("--only-changed", action="store_true", help="ignore les fichiers identiques")
+    s.set_defaults(func=op_put)
+
+    s = sub.add_parser("sync", help="synchronise un dossier local et un dossier distant")
+    s.add_argument("local")
+    s.add_argument("remote")
+    s.add_argument("--no-delete", action="store_true", help="ne propage pas les suppressions")
+    s.set_defaults(func=op_sync)
+
+    s = sub.add_parser("rm", help="supprime un fichier ou un dossier distant")
+    s.add_argument("remote")
+    s.add_argument("-r", "--recursive", action="store_true")
+    s.set_defaults(func=op_rm)
+    return p
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from servers import load_entries
+    entries = load_entries()
+
+    if args.command == "hosts":
+        from logic import entry_display
+        for i, e in enumerate(entries):
+            row = {"index": i, "host": entry_display(e), "port": e.get("user_port", 22),
+                   "start_path": e.get("user_start_path", "/")}
+            print(json.dumps(row, ensure_ascii=False) if args.json
+                  else f"{i}\t{row['host']}:{row['port']}\t{row['start_path']}")
+        return EXIT_OK
+
+    try:
+        targets = select_entries(entries, args.host, args.all)
+        if not targets:
+            raise UsageError("Aucun serveur sélectionné")
+        if len(targets) > 1 and args.command in ("get", "sync") and "{host}" not in args.local:
+            raise UsageError("Plusieurs serveurs : LOCAL doit contenir {host}")
+    except UsageError as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return EXIT_USAGE
+
+    if args.stats:
+        import stats, logic
+        stats.enable()
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as ex:
+        results = list(ex.map(lambda e: run_on_host(e, args), targets))
+    if args.stats:
+        stats.dump_json(args.stats)
+
+    for res in results:
+        if args.json:
+            print(json.dumps(res, ensure_ascii=False))
+        else:
+            print_human(res)
+    return EXIT_OK if all(r["ok"] for r in results) else EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
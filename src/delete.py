@@ -1,15 +1,10 @@
 # delete.py
-import os, tempfile, shutil
+import workspace
 
 def clean_temp():
-    temp_dir = tempfile.gettempdir()
-    for f in os.listdir(temp_dir):
-        path = os.path.join(temp_dir, f)
-        try:
-            if f.endswith(".tmp") or f.startswith("tmp"):
-                if os.path.isfile(path):
-                    os.remove(path)
-                elif os.path.isdir(path):
-                    shutil.rmtree(path, ignore_errors=True)
-        except:
-            pass
\ No newline at end of file
+    """Nettoie uniquement les fichiers temporaires créés par l'application.
+
+    Le nettoyage s'appuie sur le manifeste de `workspace` (et non plus sur un
+    parcours du dossier temporaire système) et s'exécute en arrière-plan.
+    """
+    return workspace.clean_in_background()
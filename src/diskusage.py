@@ -0,0 +1,174 @@
+# diskusage.py
+# Taille des dossiers distants et répartition par sous-dossier.
+# `du` est exécuté à basse priorité côté serveur quand c'est possible : un seul
+# canal, sortie en flux, chaque sous-dossier étant annoncé dès que son parcours
+# est terminé. À défaut, parcours SFTP parallèle sur plusieurs sessions.
+# `du` mesure l'espace disque occupé (blocs) ; le parcours SFTP additionne les
+# tailles apparentes des fichiers.
+#
+# Les résultats sont gardés par dossier dans le cache local (cache.py), avec la
+# mtime du dossier comme validateur : elle change quand une entrée directe est
+# ajoutée, supprimée ou renommée, pas quand un fichier plus profond grossit
+# (d'où le bouton « Recalculer » de la vue).
+import time
+import shlex
+import threading
+import posixpath
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import cache
+from logic import OperationCancelled
+
+USAGE_WORKERS = 4
+# Profondeur conservée : le dossier, ses sous-dossiers et les leurs, de sorte
+# qu'ouvrir un sous-dossier dans la vue soit immédiat.
+USAGE_DEPTH = 2
+
+
+def format_size(n):
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def _prefixes(rel):
+    """Ancêtres de `rel` (lui compris) jusqu'à USAGE_DEPTH : "a/b/c" -> ["a", "a/b"]."""
+    if not rel:
+        return []
+    parts = rel.split("/")
+    return ["/".join(parts[:i]) for i in range(1, min(len(parts), USAGE_DEPTH) + 1)]
+
+
+# ===================== CALCUL =====================
+
+def _du(ssh, path, cancel):
+    """Produit (chemin relatif, octets) pour chaque dossier dont `du` a fini le parcours."""
+    command = "nice -n 19 du -x -k -d {} -- {} 2>/dev/null".format(USAGE_DEPTH, shlex.quote(path))
+    for line in ssh.exec_lines(command, cancel=cancel):
+        size, _, full = line.decode("utf-8", "replace").partition("\t")
+        if not full or not size.isdigit():
+            continue
+        rel = posixpath.relpath(full, path)
+        yield ("" if rel == "." else rel), int(size) * 1024
+
+
+def _walk(ssh, path, cancel):
+    """Comme _du, par un parcours SFTP réparti sur USAGE_WORKERS sessions."""
+    local = threading.local()
+    channels = []
+    lock = threading.Lock()
+
+    def listing(rel):
+        sftp = getattr(local, "sftp", None)
+        if sftp is None:
+            sftp = local.sftp = ssh.open_sftp_channel()
+            with lock:
+                channels.append(sftp)
+        try:
+            return rel, sftp.listdir_attr(posixpath.join(path, rel) if rel else path)
+        except IOError:
+            return rel, []  # dossier illisible : compté vide
+
+    totals = Counter()
+    pending = Counter()  # dossiers encore à lister sous chaque préfixe
+    pool = ThreadPoolExecutor(USAGE_WORKERS)
+    try:
+        futures = {pool.submit(listing, "")}
+        while futures:
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled("Opération annulée")
+            done, futures = wait(futures, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                rel, entries = future.result()
+                keys = _prefixes(rel)
+                for a in entries:
+                    if ssh.is_dir_attr(a):
+                        child = posixpath.join(rel, a.filename) if rel else a.filename
+                        for k in _prefixes(child):
+                            pending[k] += 1
+                        futures.add(pool.submit(listing, child))
+                    else:
+                        size = a.st_size or 0
+                        totals[""] += size
+                        for k in keys:
+                            totals[k] += size
+                # Du plus profond au moins profond, comme du
+                for k in reversed(keys):
+                    pending[k] -= 1
+                    if not pending[k]:
+                        yield k, totals[k]
+        yield "", totals[""]
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        with lock:
+            for sftp in channels:
+                sftp.close()
+
+
+def compute(ssh, path, on_subdir=None, cancel=None):
+    """Calcule la taille de `path` et de ses sous-dossiers, et l'enregistre.
+
+    `on_subdir(nom, octets)` est appelé (depuis ce thread) dès qu'un
+    sous-dossier direct est entièrement parcouru. Retourne l'entrée du cache :
+    {"mtime", "total", "subdirs": {nom: octets}, "method", "computed"}.
+    """
+    path = posixpath.normpath(path)
+    mtime = ssh.stat(path).st_mtime
+    subdir_mtimes = {a.filename: a.st_mtime for a in ssh.listdir_attr(path) if ssh.is_dir_attr(a)}
+    totals = {}
+
+    def collect(events):
+        for rel, size in events:
+            totals[rel] = size
+            if on_subdir and rel and "/" not in rel:
+                on_subdir(rel, size)
+
+    method = "du"
+    if ssh.cfg.get("allow_exec", True):
+        try:
+            collect(_du(ssh, path, cancel))
+        except OperationCancelled:
+            raise
+        except Exception:
+            pass
+    if "" not in totals:
+        # du absent, refusé ou interrompu : on repart de zéro en SFTP
+        method = "sftp"
+        totals.clear()
+        collect(_walk(ssh, path, cancel))
+
+    def children(prefix):
+        return {rel[len(prefix):]: size for rel, size in totals.items()
+                if rel.startswith(prefix) and "/" not in rel[len(prefix):] and rel != prefix}
+
+    entries = [(path, mtime, totals[""], children(""), method)]
+    for name, sub_mtime in subdir_mtimes.items():
+        if name in totals:
+            entries.append((posixpath.join(path, name), sub_mtime, totals[name],
+                            children(name + "/"), method))
+    listings = cache.get_cache()
+    if listings:
+        listings.put_usage(cache.server_key(ssh.cfg), entries)
+    _, _, total, subdirs, _ = entries[0]
+    return {"mtime": mtime, "total": total, "subdirs": subdirs, "method": method, "computed": time.time()}
+
+
+def cached(ssh, path, mtime=None):
+    """Entrée du cache pour `path` si la mtime du dossier n'a pas changé, sinon None.
+
+    `mtime` : mtime actuelle du dossier si elle est déjà connue (sinon un stat
+    est fait, à appeler alors depuis un thread de travail).
+    """
+    listings = cache.get_cache()
+    if listings is None:
+        return None
+    path = posixpath.normpath(path)
+    entry = listings.get_usage(cache.server_key(ssh.cfg), path)
+    if entry is None:
+        return None
+    if mtime is None:
+        mtime = ssh.stat(path).st_mtime
+    return entry if entry["mtime"] == mtime else None
@@ -0,0 +1,78 @@
+# fanout.py
+# Envoi d'un même fichier vers plusieurs serveurs de la liste en parallèle.
+# Le fichier est lu une seule fois ; chaque serveur reçoit une vue du même
+# tampon mémoire, écrite atomiquement (voir SSHClient.write_bytes).
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from logic import SSHClient, config_from_entry
+from warmup import entry_key
+
+FANOUT_PARALLEL = 8
+
+# États possibles d'un serveur
+PENDING, CONNECTING, SENDING, DONE, FAILED = "en attente", "connexion", "envoi", "ok", "échec"
+
+
+def read_shared(local_path):
+    """Lit le fichier une fois ; le résultat (bytes) est partagé entre tous les envois."""
+    with open(local_path, "rb") as f:
+        return f.read()
+
+
+def remote_target(entry, remote_path, local_name):
+    """Chemin distant : `remote_path` s'il est donné, sinon dossier de départ du serveur."""
+    if remote_path:
+        return remote_path
+    return posixpath.join(entry.get("user_start_path") or "/", local_name)
+
+
+def push_one(entry, data, remote_path, on_status=None):
+    """Connecte, écrit `data` dans `remote_path` puis ferme. Lève en cas d'échec."""
+    name = entry_key(entry)
+    ssh = SSHClient(dict(config_from_entry(entry), auto_tune=False))
+    try:
+        if on_status:
+            on_status(name, CONNECTING, "")
+        ssh.connect()
+        if on_status:
+            on_status(name, SENDING, "")
+        ssh.write_bytes(remote_path, data)
+    finally:
+        ssh.close()
+
+
+def fan_out(entries, data, remote_path, local_name, parallel=FANOUT_PARALLEL,
+            on_status=None, cancel=None):
+    """Envoie `data` vers chaque serveur de `entries`, au plus `parallel` à la fois.
+
+    `on_status(nom, état, détail)` est appelé à chaque changement d'état (depuis
+    les threads de travail), `nom` étant warmup.entry_key (utilisateur@hôte:port).
+    Retourne {nom: (état, détail)}.
+    """
+    results = {}
+    lock = threading.Lock()
+
+    def status(name, state, detail):
+        with lock:
+            results[name] = (state, detail)
+        if on_status:
+            on_status(name, state, detail)
+
+    def job(entry):
+        name = entry_key(entry)
+        if cancel is not None and cancel.is_set():
+            status(name, FAILED, "annulé")
+            return
+        try:
+            push_one(entry, data, remote_target(entry, remote_path, local_name), status)
+            status(name, DONE, f"{len(data)} octets")
+        except Exception as e:
+            status(name, FAILED, str(e))
+
+    for entry in entries:
+        status(entry_key(entry), PENDING, "")
+    with ThreadPoolExecutor(max_workers=max(1, parallel)) as ex:
+        list(ex.map(job, entries))
+    return results
@@ -0,0 +1,332 @@
+# indexer.py
+# Index local des noms de fichiers d'un serveur, pour « Aller au fichier ».
+# Les chemins sont gardés triés (recherche par préfixe avec bisect) ; un index
+# de trigrammes sur les noms (array d'entiers 32 bits par trigramme) répond aux
+# requêtes approximatives sans parcourir tous les chemins.
+import os
+import zlib
+import bisect
+import hashlib
+import posixpath
+import threading
+from array import array
+from collections import Counter
+
+from servers import get_path
+
+INDEX_DIR = get_path("index")
+# Pause entre deux dossiers lors d'un parcours SFTP (priorité basse)
+INDEX_THROTTLE = 0.005
+# Au-delà de cette proportion de chemins ajoutés depuis la construction,
+# l'index est reconstruit (les ajouts sont sinon parcourus linéairement).
+INDEX_REBUILD_RATIO = 0.1
+# Nombre maximal d'occurrences comptées par la recherche approximative : les
+# trigrammes les plus fréquents (peu discriminants) sont ignorés au-delà.
+FUZZY_BUDGET = 300000
+# Systèmes de fichiers virtuels jamais indexés. Les autres points de montage
+# (/home, /srv, volumes de données...) sont parcourus comme le reste.
+PSEUDO_FS = ("/proc", "/sys", "/dev", "/run")
+
+_EMPTY = array("I")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _basename(path):
+    return path.rstrip("/").rsplit("/", 1)[-1].lower()
+
+
+def _prefix_end(prefix):
+    """Plus petite chaîne supérieure à toutes celles commençant par `prefix` (qui finit par « / »)."""
+    return prefix[:-1] + "0"  # « 0 » suit « / » dans l'ordre des caractères
+
+
+class FileIndex:
+    """Chemins d'un serveur (dossiers suffixés de « / ») et leur index de trigrammes."""
+
+    def __init__(self, paths=()):
+        self.lock = threading.Lock()
+        self.dirty = False
+        self._build(sorted(set(paths)))
+
+    def _build(self, paths):
+        grams = {}
+        for i, p in enumerate(paths):
+            for g in _trigrams(_basename(p)):
+                posting = grams.get(g)
+                if posting is None:
+                    posting = grams[g] = array("I")
+                posting.append(i)
+        self.paths = paths
+        self.grams = grams
+        self.dead = set()    # identifiants supprimés depuis la construction
+        self.extra = set()   # chemins ajoutés depuis la construction
+
+    def __len__(self):
+        return len(self.paths) - len(self.dead) + len(self.extra)
+
+    def all_paths(self):
+        alive = (p for i, p in enumerate(self.paths) if i not in self.dead)
+        return sorted(set(alive) | self.extra)
+
+    # ===================== MISE À JOUR INCRÉMENTALE =====================
+
+    def _range(self, prefix):
+        lo = bisect.bisect_left(self.paths, prefix)
+        return lo, bisect.bisect_left(self.paths, _prefix_end(prefix), lo)
+
+    def update_dir(self, folder, children):
+        """Applique un listing : `children` = [(nom, est_dossier)] directement sous `folder`.
+
+        Seuls les enfants directs sont visités : le sous-arbre de chaque
+        dossier est sauté par bisection (lister « / » ne parcourt pas l'index).
+        """
+        prefix = folder.rstrip("/") + "/"
+        wanted = {prefix + name + ("/" if is_dir else "") for name, is_dir in children}
+        with self.lock:
+            lo, hi = self._range(prefix)
+            present = set()
+            removed = False
+            i = lo
+            while i < hi:
+                path = self.paths[i]
+                name, sep, _ = path[len(prefix):].partition("/")
+                if name and path == prefix + name + sep and i not in self.dead:
+                    if path in wanted:
+                        present.add(path)
+                    else:
+                        self._remove(i)
+                        removed = True
+                if sep:
+                    i = bisect.bisect_left(self.paths, _prefix_end(prefix + name + "/"), i + 1, hi)
+                else:
+                    i += 1
+            for p in list(self.extra):
+                rest = p[len(prefix):].rstrip("/") if p.startswith(prefix) else None
+                if rest and "/" not in rest and p not in wanted:
+                    self._remove_extra(p)
+                    removed = True
+            added = wanted - present - self.extra
+            self.extra |= added
+            if added or removed:
+                self.dirty = True
+            if len(self.extra) > max(1000, len(self.paths) * INDEX_REBUILD_RATIO):
+                self._build(self.all_paths())
+
+    def _remove(self, i):
+        """Supprime un chemin (et, pour un dossier, tout son contenu)."""
+        self.dead.add(i)
+        if self.paths[i].endswith("/"):
+            lo, hi = self._range(self.paths[i])
+            self.dead.update(range(lo, hi))
+            for p in [p for p in self.extra if p.startswith(self.paths[i])]:
+                self.extra.discard(p)
+
+    def _remove_extra(self, path):
+        self.extra.discard(path)
+        if path.endswith("/"):
+            for p in [p for p in self.extra if p.startswith(path)]:
+                self.extra.discard(p)
+
+    # ===================== RECHERCHE =====================
+
+    def search(self, query, limit=50):
+        """Chemins correspondant approximativement à `query`, les meilleurs d'abord.
+
+        Le dernier mot de la requête est cherché dans les noms via les
+        trigrammes (correspondance exacte, puis partielle si trop peu de
+        résultats) ; les précédents doivent apparaître dans le chemin complet
+        (« srv conf » : les noms contenant conf sous un chemin contenant srv).
+        """
+        words = query.lower().replace("\\", "/").replace("/", " ").split()
+        if not words:
+            return []
+        anchor, others = words[-1], words[:-1]
+
+        with self.lock:
+            candidates = self._candidates(anchor, limit)
+            found = [(self.paths[i], hits) for i, hits in candidates if i not in self.dead]
+            found += [(p, len(_trigrams(anchor))) for p in self.extra if anchor in _basename(p)]
+
+        results = []
+        for path, hits in found:
+            low = path.lower()
+            if any(w not in low for w in others):
+                continue
+            name = _basename(path)
+            results.append(((name != anchor, not name.startswith(anchor), anchor not in name,
+                             -hits, len(path)), path))
+        results.sort()
+        return [p for _, p in results[:limit]]
+
+    def _candidates(self, anchor, limit):
+        """[(identifiant, trigrammes communs)] des chemins proches de `anchor`."""
+        grams = _trigrams(anchor)
+        if not grams:
+            # Requête trop courte pour les trigrammes : parcours linéaire borné
+            out = []
+            for i, p in enumerate(self.paths):
+                if anchor in _basename(p):
+                    out.append((i, 0))
+                    if len(out) >= limit * 20:
+                        break
+            return out
+
+        postings = sorted((self.grams.get(g, _EMPTY) for g in grams), key=len)
+        exact = set(postings[0])
+        for posting in postings[1:]:
+            if not exact:
+                break
+            exact.intersection_update(posting)
+        out = [(i, len(grams)) for i in exact if anchor in _basename(self.paths[i])]
+        if len(out) >= limit:
+            return out
+
+        # Correspondance approximative : au moins la moitié des trigrammes communs
+        rare, budget = [], FUZZY_BUDGET
+        for posting in postings:
+            if posting and (not rare or len(posting) <= budget):
+                rare.append(posting)
+                budget -= len(posting)
+        counts = Counter()
+        for posting in rare:
+            counts.update(posting)
+        threshold = max(1, (len(rare) + 1) // 2)
+        seen = {i for i, _ in out}
+        out += [(i, n) for i, n in counts.most_common(limit * 20) if n >= threshold and i not in seen]
+        return out
+
+    # ===================== PERSISTANCE =====================
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self.lock:
+            data = "\n".join(self.all_paths()).encode("utf-8")
+            self.dirty = False
+        tmp = path + ".new"
+        with open(tmp, "wb") as f:
+            f.write(zlib.compress(data, 6))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = zlib.decompress(f.read()).decode("utf-8")
+        return cls(data.split("\n") if data else ())
+
+
+# ===================== PARCOURS DU SERVEUR =====================
+
+def crawl(ssh, root="/", progress=None, cancel=None):
+    """Liste tous les chemins sous `root` (dossiers suffixés de « / »).
+
+    Utilise `find` à basse priorité (nice) sur un canal exec, en flux ; à
+    défaut, un parcours SFTP en largeur sur une session dédiée, ralenti entre
+    chaque dossier pour ne pas gêner la navigation. Les deux traversent les
+    points de montage et écartent les mêmes dossiers (PSEUDO_FS).
+    """
+    paths = []
+
+    def add(p):
+        paths.append(p)
+        if progress and len(paths) % 10000 == 0:
+            progress(len(paths))
+
+    import shlex
+    root = root.rstrip("/") or "/"
+    prune = " -o ".join(f"-path {shlex.quote(p)}" for p in PSEUDO_FS)
+    command = ("nice -n 19 find {} -mindepth 1 \\( {} \\) -prune"
+               " -o \\( -type d -printf '%p/\\n' \\) -o -printf '%p\\n'"
+               " 2>/dev/null").format(shlex.quote(root), prune)
+    try:
+        for line in ssh.exec_lines(command, cancel=cancel):
+            if line:
+                add(line.decode("utf-8", "replace"))
+    except RuntimeError:
+        if cancel is not None and cancel.is_set():
+            raise
+        paths = []
+    except Exception:
+        paths = []
+    if paths:
+        return paths
+
+    sftp = ssh.open_sftp_channel()
+    try:
+        pending = [root]
+        while pending:
+            if cancel is not None and cancel.is_set():
+                from logic import OperationCancelled
+                raise OperationCancelled("Opération annulée")
+            folder = pending.pop()
+            try:
+                entries = sftp.listdir_attr(folder)
+            except IOError:
+                continue
+            for a in entries:
+                full = posixpath.join(folder, a.filename)
+                if full in PSEUDO_FS:
+                    continue
+                if ssh.is_dir_attr(a):
+                    pending.append(full)
+                    add(full + "/")
+                else:
+                    add(full)
+            if cancel is not None:
+                cancel.wait(INDEX_THROTTLE)
+    finally:
+        sftp.close()
+    return paths
+
+
+# ===================== INDEX PAR SERVEUR =====================
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def index_path(server):
+    return os.path.join(INDEX_DIR, hashlib.sha1(server.encode("utf-8")).hexdigest() + ".idx")
+
+
+def get_index(server, load=True):
+    """Index en mémoire de `server` ; chargé depuis le disque s'il existe (sinon None)."""
+    with _indexes_lock:
+        if server in _indexes or not load:
+            return _indexes.get(server)
+    try:
+        index = FileIndex.load(index_path(server))
+    except (OSError, ValueError, zlib.error):
+        return None
+    with _indexes_lock:
+        return _indexes.setdefault(server, index)
+
+
+def build_index(ssh, server, root="/", progress=None, cancel=None):
+    """Parcourt le serveur, remplace son index et l'enregistre."""
+    index = FileIndex(crawl(ssh, root, progress, cancel))
+    index.save(index_path(server))
+    with _indexes_lock:
+        _indexes[server] = index
+    return index
+
+
+def note_listing(server, folder, attrs, is_dir):
+    """Met à jour l'index chargé de `server` avec un listing reçu par ailleurs."""
+    index = get_index(server, load=False)
+    if index is not None:
+        index.update_dir(folder, [(a.filename, is_dir(a)) for a in attrs])
+
+
+def save_dirty():
+    """Enregistre les index modifiés depuis leur dernier enregistrement."""
+    with _indexes_lock:
+        items = list(_indexes.items())
+    for server, index in items:
+        if index.dirty:
+            try:
+                index.save(index_path(server))
+            except OSError:
+                pass
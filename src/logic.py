@@ -1,11 +1,586 @@
 # logic.py
 import paramiko
+from paramiko import sftp_client
+from paramiko.sftp import int64
+from paramiko.sftp_attr import SFTPAttributes
 import stat
+import time
+import threading
 import warnings
 import os
+import io
+import uuid
+import re
+import shlex
+import hashlib
+import posixpath
+import workspace
+import tuning
 
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 
+# Enregistrement différentiel : taille des blocs comparés, et taille minimale
+# en dessous de laquelle un envoi complet est plus simple et aussi rapide.
+DELTA_BLOCK_SIZE = 64 * 1024
+DELTA_MIN_SIZE = 1024 * 1024
+
+# Script exécuté côté serveur pour hacher un fichier bloc par bloc
+_REMOTE_BLOCK_HASH = (
+    "import sys,hashlib\n"
+    "f=open(sys.argv[1],'rb');n=int(sys.argv[2])\n"
+    "for c in iter(lambda:f.read(n),b''):print(hashlib.sha1(c).hexdigest())\n"
+)
+
+
+# Nombre maximal de requêtes SFTP en vol dans un pipeline
+PIPELINE_WINDOW = 64
+
+# Opérations acceptées par SSHClient.pipeline : nom -> code de requête SFTP
+_PIPELINE_OPS = {
+    "stat": sftp_client.CMD_STAT,
+    "lstat": sftp_client.CMD_LSTAT,
+    "readlink": sftp_client.CMD_READLINK,
+    "remove": sftp_client.CMD_REMOVE,
+    "rmdir": sftp_client.CMD_RMDIR,
+    "mkdir": sftp_client.CMD_MKDIR,
+    "rename": sftp_client.CMD_RENAME,
+    "chmod": sftp_client.CMD_SETSTAT,
+}
+
+
+class RemoteChangedError(RuntimeError):
+    """Le fichier distant a changé depuis son ouverture (taille ou mtime)."""
+
+
+class DestinationExistsError(IOError):
+    """La destination d'une copie ou d'un déplacement existe déjà."""
+
+
+class OperationCancelled(RuntimeError):
+    """L'opération a été annulée par l'utilisateur."""
+
+
+class _Replies:
+    """Reçoit les réponses des requêtes envoyées en rafale (cf. SFTPFile.prefetch)."""
+
+    def __init__(self):
+        self.received = {}
+
+    def _async_response(self, t, msg, num):
+        self.received[num] = (t, msg)
+
+
+class SFTPChannelPool:
+    """Une session SFTP par thread de travail, ouvertes sur la même connexion SSH."""
+
+    def __init__(self, ssh):
+        self.ssh = ssh
+        self.local = threading.local()
+        self.channels = []
+        self.lock = threading.Lock()
+        self.made_dirs = set()
+
+    def get(self):
+        chan = getattr(self.local, "sftp", None)
+        if chan is None:
+            chan = self.ssh.open_sftp_channel()
+            self.local.sftp = chan
+            with self.lock:
+                self.channels.append(chan)
+        return chan
+
+    def makedirs(self, sftp, folder):
+        parts = [p for p in folder.split("/") if p]
+        cur = "/" if folder.startswith("/") else ""
+        for p in parts:
+            cur = posixpath.join(cur, p) if cur else p
+            with self.lock:
+                if cur in self.made_dirs:
+                    continue
+            try:
+                sftp.mkdir(cur)
+            except IOError:
+                pass  # existe déjà
+            with self.lock:
+                self.made_dirs.add(cur)
+
+    def close(self):
+        for chan in self.channels:
+            try:
+                chan.close()
+            except Exception:
+                pass
+
+
+_key_cache = {}
+_key_cache_lock = threading.Lock()
+
+
+def load_private_key(key_path):
+    """Charge une clé privée (Ed25519, RSA puis ECDSA), ou None si illisible.
+
+    Le résultat est mis en cache par (chemin, mtime) : le fichier n'est analysé
+    qu'une fois par session, même pour des connexions répétées ou parallèles.
+    """
+    try:
+        cache_key = (os.path.abspath(key_path), os.path.getmtime(key_path))
+    except OSError:
+        return None
+    with _key_cache_lock:
+        if cache_key in _key_cache:
+            return _key_cache[cache_key]
+    for key_cls in (paramiko.Ed25519Key, paramiko.RSAKey, paramiko.ECDSAKey):
+        try:
+            pkey = key_cls.from_private_key_file(key_path)
+        except Exception:
+            continue
+        with _key_cache_lock:
+            _key_cache[cache_key] = pkey
+        return pkey
+    return None
+
+
+def config_from_entry(entry):
+    """Construit la config attendue par SSHClient à partir d'une entrée sauvegardée."""
+    try:
+        port = int(entry.get("user_port", 22))
+    except (ValueError, TypeError):
+        port = 22
+    if entry.get("key_path"):
+        auth = {"type": "key", "key_path": entry["key_path"]}
+    else:
+        auth = {"type": "password", "password": entry.get("password")}
+    return {
+        "host": entry["user_host"],
+        "port": port,
+        "username": entry["user_serveur"],
+        "auth": auth,
+        "start_path": entry.get("user_start_path", "/")
+    }
+
+
+def entry_display(entry):
+    """Nom affiché d'un serveur : utilisateur@hôte."""
+    return f"{entry.get('user_serveur')}@{entry.get('user_host')}"
+
+
+def attr_signature(attr):
+    """Signature (taille, mtime) d'un SFTPAttributes, pour les préconditions."""
+    return (attr.st_size, attr.st_mtime)
+
+
+def block_hashes(data, block_size=DELTA_BLOCK_SIZE):
+    """Liste des empreintes SHA-1 de `data` découpé en blocs de `block_size`."""
+    view = memoryview(data)
+    return [hashlib.sha1(view[i:i + block_size]).hexdigest()
+            for i in range(0, len(data), block_size)]
+
+
+def file_sha256(path):
+    """SHA-256 d'un fichier local (fonction de module : utilisable en sous-processus)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def hash_local_files(paths):
+    """Retourne {chemin: sha256} en répartissant le hachage sur plusieurs cœurs."""
+    paths = list(paths)
+    if len(paths) < 4:
+        return {p: file_sha256(p) for p in paths}
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor() as pool:
+        return dict(zip(paths, pool.map(file_sha256, paths, chunksize=8)))
+
+
+# Longueur maximale des arguments d'un `sha256sum` distant (ARG_MAX vaut au
+# moins 128 Ko sous Linux, bien plus en pratique)
+SHA256_BATCH_BYTES = 64 * 1024
+
+
+def _parse_sha256sum(out):
+    """{nom: empreinte} d'une sortie de sha256sum.
+
+    Un nom contenant « \\ » ou un saut de ligne est échappé par sha256sum
+    (« \\n », « \\\\ ») et sa ligne commence alors par « \\ ».
+    """
+    digests = {}
+    for line in out.decode("utf-8", "surrogateescape").split("\n"):
+        escaped = line.startswith("\\")
+        if escaped:
+            line = line[1:]
+        digest, _, name = line.partition(" ")
+        if not name:
+            continue
+        name = name[1:]  # second séparateur : espace (mode texte) ou « * » (mode binaire)
+        if escaped:
+            name = re.sub(r"\\(.)", lambda m: {"n": "\n", "r": "\r"}.get(m.group(1), m.group(1)), name)
+        digests[name] = digest
+    return digests
+
+
+# Transfert direct serveur -> serveur : taille d'une requête de lecture, nombre
+# de requêtes envoyées ensemble, et mémoire maximale en transit.
+STREAM_CHUNK = 32 * 1024
+STREAM_WINDOW = 16
+STREAM_BUFFER = 8 * 1024 * 1024
+
+
+def transfer_between(src, src_path, dst, dst_path, progress=None, cancel=None):
+    """Copie `src_path` (fichier ou dossier) de `src` vers `dst_path` sur `dst`.
+
+    Les données passent en mémoire d'une connexion SSH à l'autre, sans
+    jamais toucher le disque local : lectures par plages en rafale d'un côté,
+    écritures en pipeline de l'autre, avec au plus STREAM_BUFFER octets en
+    transit. `progress(octets, total)` ; `cancel` : threading.Event.
+    Une destination existante n'est jamais écrasée (DestinationExistsError).
+    """
+    rsftp = src.open_sftp_channel()
+    wsftp = dst.open_sftp_channel()
+    try:
+        dst._check_free(dst_path, wsftp)
+        root_attr = rsftp.stat(src_path)
+        if stat.S_ISDIR(root_attr.st_mode):
+            files, dirs = src.walk_tree(src_path, cancel=cancel)
+            # walk_tree inclut la racine et liste les parents avant leurs enfants
+            for d in dirs:
+                wsftp.mkdir(_rebase(d, src_path, dst_path))
+            jobs = [(f, _rebase(f, src_path, dst_path)) for f in files]
+        else:
+            jobs = [(src_path, dst_path)]
+
+        sizes = [rsftp.stat(s).st_size for s, _ in jobs]
+        total = sum(sizes)
+        sent = 0
+
+        def advance(n):
+            nonlocal sent
+            sent += n
+            if progress:
+                progress(sent, total)
+
+        for (s, d), size in zip(jobs, sizes):
+            _stream_file(rsftp, s, wsftp, d, size, advance, cancel,
+                         chunk=src.tuned("chunk_size", STREAM_CHUNK),
+                         window=src.tuned("pipeline_depth", STREAM_WINDOW))
+    finally:
+        rsftp.close()
+        wsftp.close()
+
+
+def _rebase(path, src_root, dst_root):
+    """Chemin de `path` (sous `src_root`) une fois recopié sous `dst_root`."""
+    rel = posixpath.relpath(path, src_root)
+    return dst_root if rel == "." else posixpath.join(dst_root, rel)
+
+
+def _stream_file(rsftp, src_path, wsftp, dst_path, size, advance, cancel,
+                 chunk=STREAM_CHUNK, window=STREAM_WINDOW):
+    import queue
+
+    chunks = queue.Queue(maxsize=max(1, STREAM_BUFFER // (chunk * window)))
+    failure = []
+    stop = threading.Event()
+
+    def reader():
+        try:
+            with rsftp.open(src_path, "rb") as fin:
+                for start in range(0, size, chunk * window):
+                    if stop.is_set() or (cancel is not None and cancel.is_set()):
+                        break
+                    ranges = [(off, min(chunk, size - off))
+                              for off in range(start, min(size, start + chunk * window), chunk)]
+                    chunks.put(b"".join(fin.readv(ranges)))
+        except Exception as e:
+            failure.append(e)
+        finally:
+            chunks.put(None)
+
+    folder, base = posixpath.split(dst_path)
+    tmp_path = posixpath.join(folder, f".{base}.{uuid.uuid4().hex[:8]}.tmp")
+    t = threading.Thread(target=reader, daemon=True)
+    t.start()
+    try:
+        with wsftp.open(tmp_path, "wb") as fout:
+            fout.set_pipelined(True)
+            while True:
+                data = chunks.get()
+                if data is None:
+                    break
+                fout.write(data)
+                advance(len(data))
+        if failure:
+            raise failure[0]
+        if cancel is not None and cancel.is_set():
+            raise OperationCancelled("Opération annulée")
+        mode = stat.S_IMODE(rsftp.stat(src_path).st_mode)
+        wsftp.chmod(tmp_path, mode)
+        # rename et non posix_rename : un fichier apparu entre-temps n'est pas écrasé
+        wsftp.rename(tmp_path, dst_path)
+    except Exception:
+        stop.set()  # arrête le lecteur s'il tourne encore
+        while t.is_alive():
+            try:
+                chunks.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        try:
+            wsftp.remove(tmp_path)
+        except IOError:
+            pass
+        raise
+
+
+# Suivi de fichier (tail) : octets affichés à l'ouverture, lecture maximale par
+# interrogation, et intervalle d'interrogation (court après des données, puis
+# allongé progressivement tant que le fichier ne bouge pas).
+TAIL_INITIAL_BYTES = 64 * 1024
+TAIL_MAX_READ = 1024 * 1024
+TAIL_MIN_INTERVAL = 0.25
+TAIL_MAX_INTERVAL = 2.0
+
+
+class RemoteTail:
+    """Suit un fichier distant en ne lisant que les octets ajoutés.
+
+    Le fichier reste ouvert sur une session SFTP dédiée ; chaque interrogation
+    compare la taille du handle à la position de lecture :
+    - taille < position : fichier tronqué, on reprend au début ;
+    - handle arrêté à la fin mais le chemin désigne un autre contenu (taille
+      ou mtime différents) : fichier remplacé par rotation, on rouvre le chemin.
+    SFTP n'expose pas d'inode : la rotation n'est déclarée que si l'ancien
+    fichier n'a pas grossi depuis l'interrogation précédente, pour ne pas
+    confondre un simple ajout entre deux stat avec un remplacement.
+    """
+
+    def __init__(self, ssh, path, initial=TAIL_INITIAL_BYTES):
+        import codecs
+        self.path = path
+        self.sftp = ssh.open_sftp_channel()
+        self._decoder_cls = codecs.getincrementaldecoder("utf-8")
+        self._file = None
+        self._open(initial)
+
+    def _open(self, initial=None):
+        """Ouvre le chemin ; `initial` : octets de fin à reprendre (None = depuis le début)."""
+        if self._file is not None:
+            try:
+                self._file.close()
+            except Exception:
+                pass
+        self._file = self.sftp.open(self.path, "rb")
+        size = self._file.stat().st_size
+        self.offset = 0 if initial is None else max(0, size - initial)
+        self._last_size = size
+        self._decoder = self._decoder_cls(errors="replace")
+
+    def poll(self):
+        """Lit les nouveaux octets. Retourne (texte, événement).
+
+        `événement` vaut None, "truncated", "rotated" ou "missing" (chemin
+        absent pendant la rotation : on réessaie à l'interrogation suivante).
+        """
+        event = None
+        if self._file is None:
+            try:
+                self._open()
+            except IOError:
+                return "", "missing"
+            event = "rotated"
+
+        size = self._file.stat().st_size
+        if size < self.offset:
+            self.offset = 0
+            self._decoder.reset()
+            event = "truncated"
+
+        if size > self.offset:
+            self._file.seek(self.offset)
+            data = self._file.read(min(size - self.offset, TAIL_MAX_READ))
+            self.offset += len(data)
+            self._last_size = size
+            return self._decoder.decode(data), event
+
+        if size == self._last_size:
+            try:
+                current = self.sftp.stat(self.path)
+            except IOError:
+                self._file.close()
+                self._file = None
+                return "", "missing"
+            handle = self._file.stat()
+            if attr_signature(current) != attr_signature(handle):
+                self._open()
+                return "", "rotated"
+        self._last_size = size
+        return "", event
+
+    def follow(self, on_data, stop):
+        """Boucle d'interrogation jusqu'à `stop` (threading.Event).
+
+        `on_data(texte, événement)` est appelé depuis ce thread à chaque
+        nouveauté. L'intervalle double à chaque interrogation vide.
+        """
+        interval = TAIL_MIN_INTERVAL
+        try:
+            while not stop.is_set():
+                text, event = self.poll()
+                if text or event:
+                    on_data(text, event)
+                if text:
+                    interval = TAIL_MIN_INTERVAL
+                    continue  # lecture partielle possible : on relit aussitôt
+                interval = min(interval * 2, TAIL_MAX_INTERVAL)
+                stop.wait(interval)
+        finally:
+            self.close()
+
+    def close(self):
+        try:
+            if self._file is not None:
+                self._file.close()
+        except Exception:
+            pass
+        try:
+            self.sftp.close()
+        except Exception:
+            pass
+
+
+# Surveillance d'un dossier : regroupement des événements inotify, intervalles
+# d'interrogation (allongés tant que rien ne change) et période de relecture
+# complète (une modification de contenu ne change pas la mtime du dossier).
+WATCH_DEBOUNCE = 0.3
+WATCH_MIN_INTERVAL = 1.0
+WATCH_MAX_INTERVAL = 10.0
+WATCH_FULL_EVERY = 30.0
+# Au-delà de ce nombre de noms modifiés d'un coup, une relecture du dossier
+# coûte moins cher qu'un stat par nom.
+WATCH_MAX_STATS = 200
+
+
+def diff_listings(old, new):
+    """Compare deux listings {nom: SFTPAttributes}.
+
+    Retourne {"added": [attr], "removed": [nom], "modified": [attr]}.
+    """
+    def sig(a):
+        return (a.st_size, a.st_mtime, a.st_mode)
+    return {
+        "added": [a for n, a in new.items() if n not in old],
+        "removed": [n for n in old if n not in new],
+        "modified": [a for n, a in new.items() if n in old and sig(old[n]) != sig(a)],
+    }
+
+
+class DirWatcher:
+    """Signale les ajouts, suppressions et modifications dans un dossier distant.
+
+    Utilise `inotifywait -m` sur un canal exec quand il est disponible : seuls
+    les noms signalés sont relus. Sinon, interroge la mtime du dossier à
+    intervalle adaptatif et ne relit le listing que si elle a changé (ou toutes
+    les WATCH_FULL_EVERY secondes).
+    """
+
+    def __init__(self, ssh, path):
+        self.ssh = ssh
+        self.path = path
+        self.mode = None  # "inotify" | "poll"
+
+    def run(self, on_change, stop):
+        """Surveille jusqu'à `stop`. `on_change(changements)` : voir diff_listings."""
+        sftp = self.ssh.open_sftp_channel()
+        try:
+            snapshot = self._listing(sftp)
+            if self.ssh._exec_ok("command -v inotifywait >/dev/null", timeout=10):
+                self.mode = "inotify"
+                snapshot = self._run_inotify(sftp, snapshot, on_change, stop)
+            if not stop.is_set():
+                # inotifywait absent, ou arrêté (dossier supprimé, limite atteinte)
+                self.mode = "poll"
+                self._run_poll(sftp, snapshot, on_change, stop)
+        finally:
+            sftp.close()
+
+    def _listing(self, sftp):
+        return {a.filename: a for a in sftp.listdir_attr(self.path)}
+
+    def _run_inotify(self, sftp, snapshot, on_change, stop):
+        chan = self.ssh.ssh.get_transport().open_session()
+        try:
+            # pty : l'arrêt du canal termine aussi inotifywait côté serveur
+            chan.get_pty()
+            chan.exec_command(
+                "exec inotifywait -m -q -e create,delete,modify,attrib,move --format %f "
+                + shlex.quote(self.path)
+            )
+            buf = b""
+            pending = set()
+            deadline = None
+            while not stop.is_set():
+                if chan.recv_ready():
+                    buf += chan.recv(65536)
+                    *lines, buf = buf.split(b"\n")
+                    for line in lines:
+                        name = line.rstrip(b"\r").decode("utf-8", "replace")
+                        if name:
+                            pending.add(name)
+                    if pending and deadline is None:
+                        deadline = time.monotonic() + WATCH_DEBOUNCE
+                elif chan.exit_status_ready():
+                    break
+                else:
+                    stop.wait(0.05)
+                if deadline is not None and time.monotonic() >= deadline:
+                    if len(pending) > WATCH_MAX_STATS:
+                        new = self._listing(sftp)
+                        changes = diff_listings(snapshot, new)
+                        snapshot = new
+                    else:
+                        changes = self._stat_names(sftp, pending, snapshot)
+                    pending.clear()
+                    deadline = None
+                    if any(changes.values()):
+                        on_change(changes)
+            return snapshot
+        finally:
+            chan.close()
+
+    def _stat_names(self, sftp, names, snapshot):
+        """Relit uniquement `names` et met `snapshot` à jour."""
+        old = {n: snapshot[n] for n in names if n in snapshot}
+        new = {}
+        for name in names:
+            try:
+                attr = sftp.lstat(posixpath.join(self.path, name))
+            except IOError:
+                snapshot.pop(name, None)
+                continue
+            attr.filename = name
+            new[name] = snapshot[name] = attr
+        return diff_listings(old, new)
+
+    def _run_poll(self, sftp, snapshot, on_change, stop):
+        interval = WATCH_MIN_INTERVAL
+        last_mtime = sftp.stat(self.path).st_mtime
+        last_full = time.monotonic()
+        while not stop.wait(interval):
+            mtime = sftp.stat(self.path).st_mtime
+            if mtime == last_mtime and time.monotonic() - last_full < WATCH_FULL_EVERY:
+                interval = min(interval * 1.5, WATCH_MAX_INTERVAL)
+                continue
+            new = self._listing(sftp)
+            changes = diff_listings(snapshot, new)
+            snapshot, last_mtime, last_full = new, mtime, time.monotonic()
+            if any(changes.values()):
+                on_change(changes)
+                interval = WATCH_MIN_INTERVAL
+            else:
+                interval = min(interval * 1.5, WATCH_MAX_INTERVAL)
+
+
 class SSHClient:
     def __init__(self, config):
         if isinstance(config, str):
@@ -17,6 +592,13 @@ class SSHClient:
 
         self.ssh = None
         self.sftp = None
+        # Session SFTP dédiée aux requêtes en rafale (voir pipeline)
+        self._batch_sftp = None
+        self._batch_lock = threading.Lock()
+        # Support de l'extension SFTP copy-data : None = pas encore testé
+        self._copy_data = None
+        # Paramètres de transfert adaptés au lien (voir tuning.py)
+        self.tuning = None
 
     # ===================== CONNECT =====================
 
@@ -37,16 +619,50 @@ class SSHClient:
             else:
                 raise RuntimeError("Type d'authentification inconnu")
 
+            # Réglages mémorisés pour cet hôte : appliqués avant d'ouvrir la
+            # session SFTP principale ; sinon mesure en arrière-plan
+            transport = self.ssh.get_transport()
+            self.tuning = tuning.load(cfg)
+            if self.tuning:
+                self.apply_tuning(self.tuning)
+            elif cfg.get("auto_tune", True) and tuning.claim(cfg):
+                threading.Thread(target=self._autotune, daemon=True).start()
+
             self.sftp = self.ssh.open_sftp()
 
             # AJOUT : Maintient la connexion active toutes les 30 secondes
-            transport = self.ssh.get_transport()
             if transport: transport.set_keepalive(30)
 
         except Exception as e:
             self.close()
             raise RuntimeError(f"Connexion SSH échouée : {e}")
 
+    # ===================== RÉGLAGE DU LIEN =====================
+
+    def tuned(self, name, default=None):
+        """Valeur réglée pour ce lien (voir tuning.choose), ou `default`."""
+        return self.tuning.get(name, default) if self.tuning else default
+
+    def apply_tuning(self, params):
+        """Applique fenêtre et taille de paquet aux canaux ouverts à partir de maintenant."""
+        transport = self.ssh.get_transport()
+        transport.default_window_size = params["window_size"]
+        transport.default_max_packet_size = params["max_packet_size"]
+        self.tuning = params
+
+    def _autotune(self):
+        try:
+            self.measure_link()
+        except Exception:
+            pass  # réglages par défaut de paramiko
+
+    def measure_link(self):
+        """Mesure le lien, applique et mémorise les réglages choisis. Retourne ces réglages."""
+        params = tuning.measure(self)
+        self.apply_tuning(params)
+        tuning.save(self.cfg, params)
+        return params
+
     # ===================== AUTH METHODS =====================
 
     def _connect_with_key(self, cfg, auth):
@@ -54,19 +670,7 @@ class SSHClient:
         if not key_path or not os.path.exists(key_path):
             raise FileNotFoundError("Clé SSH introuvable")
 
-        pkey = None
-        errors = []
-
-        for key_cls in (
-            paramiko.Ed25519Key,
-            paramiko.RSAKey,
-            paramiko.ECDSAKey,
-        ):
-            try:
-                pkey = key_cls.from_private_key_file(key_path)
-                break
-            except Exception as e:
-                errors.append(str(e))
+        pkey = load_private_key(key_path)
 
         if pkey:
             self.ssh.connect(
@@ -112,12 +716,22 @@ class SSHClient:
 
     # ===================== SFTP HELPERS =====================
 
+    def open_sftp_channel(self):
+        """Ouvre une session SFTP supplémentaire sur la même connexion SSH.
+
+        Permet des transferts parallèles sans interférer avec `self.sftp`.
+        """
+        return self.ssh.open_sftp()
+
     def listdir_attr(self, path):
         return self.sftp.listdir_attr(path)
 
     def is_dir_attr(self, attr):
         return stat.S_ISDIR(attr.st_mode)
 
+    def is_link_attr(self, attr):
+        return attr.st_mode is not None and stat.S_ISLNK(attr.st_mode)
+
     def stat(self, path):
         return self.sftp.stat(path)
 
@@ -134,18 +748,868 @@ class SSHClient:
         self.sftp.rename(old, new)
 
     def download_to(self, remote_path, local_path):
-        self.sftp.get(remote_path, local_path)
+        # Le transfert s'écrit dans un fichier partiel inscrit au manifeste de
+        # l'espace de travail, puis remplace la destination une fois complet.
+        part = workspace.partial_path(local_path)
+        try:
+            self.sftp.get(remote_path, part,
+                          max_concurrent_prefetch_requests=self.tuned("pipeline_depth"))
+        except Exception:
+            workspace.release(part)
+            raise
+        workspace.commit_partial(part, local_path)
+
+    def upload_from(self, local_path, remote_path, only_changed=False):
+        """Envoie un fichier. Avec `only_changed`, ne l'envoie que s'il diffère.
+
+        Retourne True si le fichier a été envoyé, False s'il était identique.
+        """
+        if only_changed:
+            try:
+                remote_attr = self.sftp.stat(remote_path)
+            except FileNotFoundError:
+                remote_attr = None
+            if remote_attr is not None:
+                st = os.stat(local_path)
+                if self._same_size_mtime(st, remote_attr):
+                    return False
+                if st.st_size == remote_attr.st_size:
+                    digest = self.remote_sha256(remote_path)
+                    if digest is not None and digest == file_sha256(local_path):
+                        return False
+
+        self._put_keep_mtime(local_path, remote_path)
+        return True
+
+    def upload_tree(self, local_dir, remote_dir, only_changed=False, progress=None):
+        """Envoie récursivement un dossier local vers `remote_dir`.
 
-    def upload_from(self, local_path, remote_path):
+        Avec `only_changed`, les fichiers de même taille et même mtime sont
+        ignorés ; ceux de même taille mais de mtime différent sont comparés par
+        SHA-256 (un seul `sha256sum` exécuté par dossier distant, hachage local
+        réparti sur un pool de processus).
+
+        `progress(done, total)` est appelé après chaque fichier traité.
+        Retourne (nombre envoyés, nombre ignorés).
+        """
+        plan = []       # (local, remote) à envoyer
+        to_hash = {}    # dossier distant -> {nom: chemin local}
+        seen = 0
+
+        for root, dirs, files in os.walk(local_dir):
+            rel = os.path.relpath(root, local_dir)
+            rdir = remote_dir if rel == "." else posixpath.join(remote_dir, *rel.split(os.sep))
+
+            existing = {}
+            try:
+                existing = {a.filename: a for a in self.sftp.listdir_attr(rdir)}
+            except FileNotFoundError:
+                self.sftp.mkdir(rdir)
+
+            for name in files:
+                seen += 1
+                local = os.path.join(root, name)
+                attr = existing.get(name) if only_changed else None
+                if attr is None:
+                    plan.append((local, posixpath.join(rdir, name)))
+                    continue
+                st = os.stat(local)
+                if self._same_size_mtime(st, attr):
+                    continue
+                if st.st_size == attr.st_size:
+                    to_hash.setdefault(rdir, {})[name] = local
+                else:
+                    plan.append((local, posixpath.join(rdir, name)))
+
+        if to_hash:
+            local_digests = hash_local_files(
+                p for names in to_hash.values() for p in names.values()
+            )
+            for rdir, names in to_hash.items():
+                remote_digests = self.remote_sha256_many(rdir, list(names)) or {}
+                for name, local in names.items():
+                    if remote_digests.get(name) != local_digests[local]:
+                        plan.append((local, posixpath.join(rdir, name)))
+
+        total = len(plan)
+        for done, (local, remote) in enumerate(plan, 1):
+            self._put_keep_mtime(local, remote)
+            if progress:
+                progress(done, total)
+        return total, seen - total
+
+    def remote_sha256_many(self, remote_dir, names):
+        """{nom: sha256} pour plusieurs fichiers d'un même dossier (chemins relatifs admis).
+
+        Un `sha256sum` par lot d'au plus SHA256_BATCH_BYTES d'arguments, pour
+        rester loin de la limite de longueur de ligne de commande (ARG_MAX).
+        Retourne None si l'exécution de commandes n'est pas disponible.
+        """
+        if not self.cfg.get("allow_exec", True):
+            return None
+        digests = {}
+        batch, size = [], 0
+        for name in list(names) + [None]:
+            quoted = shlex.quote(name) if name is not None else ""
+            if batch and (name is None or size + len(quoted) > SHA256_BATCH_BYTES):
+                cmd = "cd {} && sha256sum -- {}".format(shlex.quote(remote_dir), " ".join(batch))
+                try:
+                    _, out, _ = self.exec_command(cmd, timeout=300)
+                except Exception:
+                    return None
+                digests.update(_parse_sha256sum(out))
+                batch, size = [], 0
+            if name is not None:
+                batch.append(quoted)
+                size += len(quoted) + 1
+        return digests
+
+    def _same_size_mtime(self, local_stat, remote_attr):
+        return (local_stat.st_size == remote_attr.st_size
+                and int(local_stat.st_mtime) == remote_attr.st_mtime)
+
+    def _put_keep_mtime(self, local_path, remote_path):
+        # mtime distante = mtime locale, pour que la comparaison rapide
+        # (taille + mtime) suffise lors des envois suivants.
         self.sftp.put(local_path, remote_path)
+        st = os.stat(local_path)
+        self.sftp.utime(remote_path, (int(st.st_atime), int(st.st_mtime)))
 
     def open_file_readbytes(self, remote_path):
         with self.sftp.open(remote_path, "rb") as f:
             return f.read()
 
+    def read_range(self, remote_path, offset, length, size=None):
+        """Lit au plus `length` octets à partir de `offset` (négatif : depuis la fin).
+
+        Les blocs sont demandés en parallèle (readv) : un aller-retour quelle
+        que soit la longueur. `size` évite un stat si la taille est connue.
+        """
+        with self.sftp.open(remote_path, "rb") as f:
+            if size is None:
+                size = f.stat().st_size
+            if offset < 0:
+                offset = max(0, size + offset)
+            end = min(size, offset + length)
+            if end <= offset:
+                return b""
+            ranges = [(o, min(STREAM_CHUNK, end - o)) for o in range(offset, end, STREAM_CHUNK)]
+            return b"".join(f.readv(ranges))
+
+    # ===================== ÉCRITURE ATOMIQUE =====================
+
+    def write_bytes(self, remote_path, data, expected=None):
+        """Écrit `data` (bytes) dans `remote_path` sans fichier local temporaire.
+
+        Le contenu est envoyé depuis un tampon mémoire vers un nom temporaire
+        dans le même dossier, puis renommé atomiquement à la place de la cible :
+        une coupure réseau ne laisse jamais de fichier distant tronqué.
+        Un lien symbolique est suivi (c'est sa cible qui est remplacée). Le
+        fichier est réécrit sur place, sans renommage, quand le remplacer
+        casserait quelque chose : lien cassé, liens physiques multiples, ou
+        propriétaire/groupe impossible à conserver.
+
+        `expected` : signature (taille, mtime) relevée à l'ouverture ; si le
+        fichier distant ne correspond plus, lève RemoteChangedError.
+        """
+        target = self._resolve_link(remote_path)
+        current = None
+        try:
+            current = self.sftp.stat(remote_path)
+        except FileNotFoundError:
+            pass
+
+        if expected is not None:
+            found = attr_signature(current) if current else None
+            if found != tuple(expected):
+                raise RemoteChangedError(
+                    f"{remote_path} a été modifié sur le serveur depuis son ouverture"
+                )
+
+        if target is None or (current is not None and self._link_count(target) > 1):
+            return self._write_in_place(remote_path, data)
+
+        folder, base = posixpath.split(target)
+        tmp_path = posixpath.join(folder, f".{base}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            tmp = self.sftp.putfo(io.BytesIO(data), tmp_path, file_size=len(data), confirm=True)
+            if current is not None:
+                # Conserver les permissions et, si possible, le propriétaire
+                self.sftp.chmod(tmp_path, stat.S_IMODE(current.st_mode))
+                if (tmp.st_uid, tmp.st_gid) != (current.st_uid, current.st_gid):
+                    try:
+                        self.sftp.chown(tmp_path, current.st_uid, current.st_gid)
+                    except IOError:
+                        self.sftp.remove(tmp_path)
+                        return self._write_in_place(target, data)
+            self._replace(tmp_path, target)
+        except Exception:
+            try:
+                self.sftp.remove(tmp_path)
+            except Exception:
+                pass
+            raise
+        return self.sftp.stat(target)
+
+    def _write_in_place(self, remote_path, data):
+        """Réécrit le fichier existant (même inode) : non atomique, en dernier recours."""
+        self.sftp.putfo(io.BytesIO(data), remote_path, file_size=len(data), confirm=True)
+        return self.sftp.stat(remote_path)
+
+    def _resolve_link(self, path):
+        """Chemin réel de `path` en suivant ses liens symboliques.
+
+        `path` lui-même s'il n'est pas un lien (ou n'existe pas encore), None
+        si la chaîne de liens est cassée ou boucle.
+        """
+        for depth in range(40):
+            try:
+                attr = self.sftp.lstat(path)
+            except FileNotFoundError:
+                return path if depth == 0 else None
+            if not stat.S_ISLNK(attr.st_mode):
+                return path
+            link = self.sftp.readlink(path)
+            path = posixpath.normpath(posixpath.join(posixpath.dirname(path), link))
+        return None
+
+    def _link_count(self, path):
+        """Nombre de liens physiques de `path` (1 si exec indisponible).
+
+        SFTP v3 ne transmet pas st_nlink : on le demande à `stat` (GNU, puis BSD).
+        """
+        if not self.cfg.get("allow_exec", True):
+            return 1
+        quoted = shlex.quote(path)
+        try:
+            code, out, _ = self.exec_command(
+                f"stat -c %h -- {quoted} 2>/dev/null || stat -f %l -- {quoted}", timeout=10)
+        except Exception:
+            return 1
+        out = out.strip()
+        return int(out) if code == 0 and out.isdigit() else 1
+
+    def _replace(self, src, dst):
+        """Renommage écrasant la destination (posix-rename si disponible)."""
+        try:
+            self.sftp.posix_rename(src, dst)
+        except IOError:
+            # Serveur sans l'extension posix-rename@openssh.com
+            try:
+                self.sftp.remove(dst)
+            except FileNotFoundError:
+                pass
+            self.sftp.rename(src, dst)
+
+    # ===================== PIPELINE SFTP =====================
+
+    def pipeline(self, requests, window=PIPELINE_WINDOW, cancel=None):
+        """Envoie une série de requêtes SFTP sans attendre chaque réponse.
+
+        `requests` : itérable de tuples (op, chemin, *arguments) avec op parmi
+        stat, lstat, readlink, remove, rmdir, mkdir, rename (nouveau chemin) et
+        chmod (mode). Jusqu'à `window` requêtes sont en vol à la fois : N
+        opérations coûtent environ N / window allers-retours au lieu de N.
+
+        Retourne la liste des résultats dans l'ordre des requêtes : un
+        SFTPAttributes (stat/lstat), une cible (readlink), None (succès) ou
+        l'exception levée pour cette requête. `cancel` (threading.Event)
+        interrompt l'envoi et lève OperationCancelled.
+        """
+        requests = list(requests)
+        results = [None] * len(requests)
+        if not requests:
+            return results
+
+        with self._batch_lock:
+            if self._batch_sftp is None:
+                self._batch_sftp = self.open_sftp_channel()
+            sftp = self._batch_sftp
+            replies = _Replies()
+            pending = {}
+            sent = 0
+
+            while sent < len(requests) or pending:
+                while sent < len(requests) and len(pending) < window:
+                    if cancel is not None and cancel.is_set():
+                        break
+                    num = self._send_request(sftp, replies, requests[sent])
+                    pending[num] = sent
+                    sent += 1
+                if not pending:
+                    raise OperationCancelled("Opération annulée")
+                while not replies.received:
+                    sftp._read_response()
+                for num, (t, msg) in list(replies.received.items()):
+                    idx = pending.pop(num, None)
+                    if idx is not None:
+                        results[idx] = self._parse_reply(sftp, requests[idx][0], t, msg)
+                replies.received.clear()
+
+        if sent < len(requests):
+            raise OperationCancelled("Opération annulée")
+        return results
+
+    def stat_many(self, paths, follow=True, cancel=None):
+        """stat (lstat si `follow` est faux) de plusieurs chemins en un pipeline.
+
+        Retourne un SFTPAttributes ou l'exception levée, dans l'ordre de `paths`.
+        """
+        op = "stat" if follow else "lstat"
+        return self.pipeline([(op, p) for p in paths], cancel=cancel)
+
+    def resolve_links(self, path, attrs, cancel=None):
+        """Résout les liens symboliques d'un listing de `path` (attributs lstat).
+
+        Le stat et le readlink de tous les liens partent dans un même pipeline :
+        un aller-retour pour tout le dossier au lieu de deux par lien. Chaque
+        SFTPAttributes de lien reçoit `link_target` (cible telle qu'écrite, ou
+        None) et `target_attr` (attributs de la cible, None si le lien est
+        cassé ou la cible inaccessible). Retourne `attrs`.
+        """
+        links = [a for a in attrs if self.is_link_attr(a)]
+        if not links:
+            return attrs
+        requests = []
+        for a in links:
+            full = posixpath.join(path, a.filename)
+            requests += [("stat", full), ("readlink", full)]
+        results = self.pipeline(requests, cancel=cancel)
+        for a, target, dest in zip(links, results[0::2], results[1::2]):
+            a.target_attr = None if isinstance(target, Exception) else target
+            a.link_target = None if isinstance(dest, Exception) else dest
+        return attrs
+
+    def _send_request(self, sftp, replies, request):
+        op, path, *extra = request
+        code = _PIPELINE_OPS[op]
+        args = [sftp._adjust_cwd(path)]
+        if op == "rename":
+            args.append(sftp._adjust_cwd(extra[0]))
+        elif op == "chmod":
+            attr = SFTPAttributes()
+            attr.st_mode = extra[0]
+            args.append(attr)
+        elif op == "mkdir":
+            attr = SFTPAttributes()
+            attr.st_mode = extra[0] if extra else 0o777
+            args.append(attr)
+        return sftp._async_request(replies, code, *args)
+
+    def _parse_reply(self, sftp, op, t, msg):
+        try:
+            if t == sftp_client.CMD_STATUS:
+                sftp._convert_status(msg)
+                return None
+            if t == sftp_client.CMD_ATTRS:
+                return SFTPAttributes._from_msg(msg)
+            if t == sftp_client.CMD_NAME and op == "readlink":
+                if msg.get_int() != 1:
+                    return None
+                return sftp_client._to_unicode(msg.get_string())
+            raise IOError(f"Réponse SFTP inattendue ({t}) pour {op}")
+        except Exception as e:
+            return e
+
+    # ===================== SUPPRESSION RÉCURSIVE =====================
+
+    def remove_tree(self, remote_path, allow_exec=True, progress=None, cancel=None):
+        """Supprime un dossier et tout son contenu.
+
+        Essaie d'abord un `rm -rf` exécuté côté serveur (un seul canal). Si
+        l'exécution n'est pas autorisée ou échoue, parcourt l'arborescence puis
+        supprime en rafale (pipeline) les fichiers, puis les dossiers du plus
+        profond au moins profond.
+
+        `progress(done, total)` : total vaut None tant qu'il est inconnu.
+        `cancel` : threading.Event ; lève OperationCancelled si activé.
+        """
+        path = posixpath.normpath(remote_path)
+        if path in ("/", ".", ""):
+            raise ValueError(f"Refus de supprimer {remote_path!r}")
+
+        if allow_exec:
+            if progress:
+                progress(0, None)
+            if self._exec_ok(f"rm -rf -- {shlex.quote(path)}", cancel=cancel):
+                if progress:
+                    progress(1, 1)
+                return
+
+        files, dirs = self.walk_tree(path, cancel=cancel)
+        total = len(files) + len(dirs)
+        done = 0
+
+        def step(batch, op):
+            nonlocal done
+            for i in range(0, len(batch), PIPELINE_WINDOW * 4):
+                chunk = batch[i:i + PIPELINE_WINDOW * 4]
+                for p, res in zip(chunk, self.pipeline(((op, p) for p in chunk), cancel=cancel)):
+                    if isinstance(res, Exception) and not isinstance(res, FileNotFoundError):
+                        raise IOError(f"{p} : {res}")
+                done += len(chunk)
+                if progress:
+                    progress(done, total)
+
+        step(files, "remove")
+        # Dossiers regroupés par profondeur : les plus profonds d'abord
+        by_depth = {}
+        for d in dirs:
+            by_depth.setdefault(d.count("/"), []).append(d)
+        for depth in sorted(by_depth, reverse=True):
+            step(by_depth[depth], "rmdir")
+
+    def walk_tree(self, remote_path, cancel=None):
+        """Retourne (fichiers, dossiers) sous `remote_path` (dossier racine inclus)."""
+        files, dirs = [], []
+        stack = [remote_path]
+        while stack:
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled("Opération annulée")
+            folder = stack.pop()
+            dirs.append(folder)
+            for attr in self.listdir_attr(folder):
+                child = posixpath.join(folder, attr.filename)
+                if stat.S_ISDIR(attr.st_mode):
+                    stack.append(child)
+                else:
+                    files.append(child)
+        return files, dirs
+
+    # ===================== OPÉRATIONS PAR LOT =====================
+
+    def batch(self, requests, cancel=None):
+        """Exécute un lot de requêtes (voir `pipeline`) et en fait le résumé.
+
+        Retourne {"done": nombre de succès, "errors": [(chemin, message)]}.
+        """
+        requests = list(requests)
+        results = self.pipeline(requests, cancel=cancel)
+        errors = [(req[1], str(res)) for req, res in zip(requests, results)
+                  if isinstance(res, Exception)]
+        return {"done": len(requests) - len(errors), "errors": errors}
+
+    def delete_many(self, files, dirs=(), progress=None, cancel=None):
+        """Supprime des fichiers (en une rafale) puis des dossiers (récursivement)."""
+        total = len(files) + len(dirs)
+        summary = self.batch((("remove", p) for p in files), cancel=cancel)
+        if progress:
+            progress(len(files), total)
+        for i, d in enumerate(dirs, 1):
+            try:
+                self.remove_tree(d, cancel=cancel)
+                summary["done"] += 1
+            except OperationCancelled:
+                raise
+            except Exception as e:
+                summary["errors"].append((d, str(e)))
+            if progress:
+                progress(len(files) + i, total)
+        return summary
+
+    def download_many(self, pairs, workers=4, progress=None, cancel=None):
+        """Télécharge [(chemin distant, chemin local)] sur plusieurs sessions SFTP.
+
+        Retourne {"done": nombre de succès, "errors": [(chemin, message)]}.
+        """
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        pool = SFTPChannelPool(self)
+        summary = {"done": 0, "errors": []}
+
+        def fetch(remote, local):
+            if cancel is not None and cancel.is_set():
+                raise OperationCancelled("Opération annulée")
+            part = workspace.partial_path(local)
+            try:
+                pool.get().get(remote, part)
+            except Exception:
+                workspace.release(part)
+                raise
+            workspace.commit_partial(part, local)
+
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+                futures = {ex.submit(fetch, r, l): r for r, l in pairs}
+                for done, fut in enumerate(as_completed(futures), 1):
+                    try:
+                        fut.result()
+                        summary["done"] += 1
+                    except OperationCancelled:
+                        pass
+                    except Exception as e:
+                        summary["errors"].append((futures[fut], str(e)))
+                    if progress:
+                        progress(done, len(futures))
+        finally:
+            pool.close()
+        if cancel is not None and cancel.is_set():
+            raise OperationCancelled("Opération annulée")
+        return summary
+
+    # ===================== COPIE / DÉPLACEMENT CÔTÉ SERVEUR =====================
+
+    def copy(self, src, dst):
+        """Copie `src` (fichier ou dossier) vers `dst` sans que les données quittent le serveur.
+
+        Fichier : extension SFTP `copy-data` si le serveur la gère, sinon `cp`
+        exécuté à distance. Dossier : `cp -a` exécuté à distance, sinon copie
+        fichier par fichier via `copy-data`. Une destination existante n'est
+        jamais écrasée (DestinationExistsError).
+        """
+        self._check_free(dst)
+        if stat.S_ISDIR(self.sftp.stat(src).st_mode):
+            if self._exec_ok(f"cp -a -- {shlex.quote(src)} {shlex.quote(dst)}"):
+                return
+            files, dirs = self.walk_tree(src)
+            for d in dirs:  # walk_tree inclut la racine et liste les parents avant leurs enfants
+                self.sftp.mkdir(_rebase(d, src, dst))
+            for f in files:
+                self.copy_file(f, _rebase(f, src, dst), allow_exec=False)
+            return
+        self.copy_file(src, dst)
+
+    def copy_file(self, src, dst, allow_exec=True):
+        """Copie un fichier distant côté serveur (copy-data, puis `cp -p`)."""
+        if self._copy_data is not False:
+            try:
+                self._copy_data_file(src, dst)
+                self._copy_data = True
+                return
+            except IOError as e:
+                if "unsupported" in str(e).lower():
+                    self._copy_data = False
+                elif not allow_exec:
+                    raise
+        if allow_exec and self._exec_ok(f"cp -p -- {shlex.quote(src)} {shlex.quote(dst)}"):
+            return
+        raise IOError(f"Copie côté serveur impossible pour {src} "
+                      "(ni extension copy-data ni exécution de commandes)")
+
+    def _check_free(self, dst, sftp=None):
+        """Lève DestinationExistsError si `dst` existe (lien compris)."""
+        try:
+            (sftp or self.sftp).lstat(dst)
+        except FileNotFoundError:
+            return
+        raise DestinationExistsError(f"{dst} existe déjà")
+
+    def _copy_data_file(self, src, dst):
+        # Extension "copy-data" : le serveur recopie lui-même de handle à handle.
+        # Ouverture exclusive : échoue plutôt que d'écraser un fichier existant.
+        mode = stat.S_IMODE(self.sftp.stat(src).st_mode)
+        with self.sftp.open(src, "rb") as fin:
+            fout = self.sftp.open(dst, "wxb")
+            try:
+                with fout:
+                    self.sftp._request(sftp_client.CMD_EXTENDED, "copy-data",
+                                       fin.handle, int64(0), int64(0), fout.handle, int64(0))
+            except Exception:
+                # Ne pas laisser de fichier vide là où il n'y avait rien
+                try:
+                    self.sftp.remove(dst)
+                except IOError:
+                    pass
+                raise
+        self.sftp.chmod(dst, mode)
+
+    def move(self, src, dst):
+        """Déplace `src` vers `dst` : rename SFTP, sinon `mv` distant, sinon copie + suppression.
+
+        Une destination existante n'est jamais écrasée (DestinationExistsError) :
+        `mv` la remplacerait, ou déplacerait `src` dedans s'il s'agit d'un dossier.
+        """
+        try:
+            self.sftp.rename(src, dst)
+            return
+        except IOError:
+            pass  # autre système de fichiers, ou destination existante
+        self._check_free(dst)
+        if self._exec_ok(f"mv -- {shlex.quote(src)} {shlex.quote(dst)}"):
+            return
+        self.copy(src, dst)
+        if stat.S_ISDIR(self.sftp.stat(src).st_mode):
+            self.remove_tree(src, allow_exec=False)
+        else:
+            self.sftp.remove(src)
+
+    def move_many(self, pairs, progress=None, cancel=None):
+        """Déplace [(src, dst)] : renames en rafale, puis repli `move` pour les échecs."""
+        pairs = list(pairs)
+        results = self.pipeline((("rename", s, d) for s, d in pairs), cancel=cancel)
+        summary = {"done": 0, "errors": []}
+        for i, ((s, d), res) in enumerate(zip(pairs, results), 1):
+            try:
+                if isinstance(res, Exception):
+                    self.move(s, d)
+                summary["done"] += 1
+            except Exception as e:
+                summary["errors"].append((s, str(e)))
+            if progress:
+                progress(i, len(pairs))
+        return summary
+
+    def _exec_ok(self, command, timeout=None, cancel=None):
+        """True si `command` s'exécute avec succès (False si exec indisponible)."""
+        if not self.cfg.get("allow_exec", True):
+            return False
+        try:
+            code, _, _ = self.exec_command(command, timeout=timeout, cancel=cancel)
+        except OperationCancelled:
+            raise
+        except Exception:
+            return False
+        return code == 0
+
+    # ===================== EXEC =====================
+
+    def exec_command(self, command, timeout=30, cancel=None):
+        """Exécute `command` sur le serveur. Retourne (code, stdout, stderr) en bytes.
+
+        `cancel` (threading.Event) ferme le canal et lève OperationCancelled.
+        """
+        chan = self.ssh.get_transport().open_session()
+        try:
+            chan.exec_command(command)
+            chan.shutdown_write()
+            out, err = bytearray(), bytearray()
+            start = time.monotonic()
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled("Opération annulée")
+                if timeout is not None and time.monotonic() - start > timeout:
+                    raise TimeoutError(f"Commande trop longue : {command}")
+                if chan.recv_ready():
+                    out += chan.recv(65536)
+                elif chan.recv_stderr_ready():
+                    err += chan.recv_stderr(65536)
+                elif chan.exit_status_ready():
+                    break
+                else:
+                    time.sleep(0.01)
+            # Vider ce qui reste après la fin du processus
+            while chan.recv_ready():
+                out += chan.recv(65536)
+            while chan.recv_stderr_ready():
+                err += chan.recv_stderr(65536)
+            return chan.recv_exit_status(), bytes(out), bytes(err)
+        finally:
+            chan.close()
+
+    def exec_lines(self, command, cancel=None):
+        """Exécute `command` et produit sa sortie standard ligne par ligne (bytes).
+
+        Contrairement à exec_command, la sortie n'est jamais entièrement gardée
+        en mémoire : adapté aux commandes très bavardes (find sur tout un disque).
+        """
+        buf = b""
+        for data in self.exec_chunks(command, cancel):
+            buf += data
+            *lines, buf = buf.split(b"\n")
+            yield from lines
+        if buf:
+            yield buf
+
+    def exec_chunks(self, command, cancel=None, status=None):
+        """Exécute `command` et produit sa sortie standard par blocs (bytes), en flux.
+
+        La sortie d'erreur est ignorée. `status` (liste) reçoit le code de
+        retour une fois la commande terminée.
+        """
+        if not self.cfg.get("allow_exec", True):
+            raise RuntimeError("Exécution de commandes désactivée pour ce serveur")
+        chan = self.ssh.get_transport().open_session()
+        try:
+            chan.exec_command(command)
+            chan.shutdown_write()
+            while True:
+                if cancel is not None and cancel.is_set():
+                    raise OperationCancelled("Opération annulée")
+                if chan.recv_ready():
+                    yield chan.recv(65536)
+                elif chan.recv_stderr_ready():
+                    chan.recv_stderr(65536)  # ignoré (permissions refusées, etc.)
+                elif chan.exit_status_ready() and not chan.recv_ready():
+                    break
+                else:
+                    time.sleep(0.01)
+            if status is not None:
+                status.append(chan.recv_exit_status())
+        finally:
+            chan.close()
+
+    def remote_sha256(self, remote_path, allow_exec=True):
+        """SHA-256 du fichier calculé côté serveur, ou None si indisponible.
+
+        None aussi si l'exécution de commandes n'est pas permise (`allow_exec`
+        ou réglage du serveur) : l'appelant se rabat alors sur un envoi complet.
+        """
+        if not allow_exec or not self.cfg.get("allow_exec", True):
+            return None
+        try:
+            code, out, _ = self.exec_command(f"sha256sum -- {shlex.quote(remote_path)}")
+        except Exception:
+            return None
+        if code != 0 or not out:
+            return None
+        return out.split()[0].decode("ascii", "ignore")
+
+    def remote_block_hashes(self, remote_path, block_size=DELTA_BLOCK_SIZE):
+        """Empreintes par bloc calculées côté serveur (python3), ou None."""
+        if not self.cfg.get("allow_exec", True):
+            return None
+        cmd = "python3 -c {} {} {}".format(
+            shlex.quote(_REMOTE_BLOCK_HASH), shlex.quote(remote_path), int(block_size)
+        )
+        try:
+            code, out, _ = self.exec_command(cmd, timeout=120)
+        except Exception:
+            return None
+        if code != 0:
+            return None
+        return out.decode("ascii", "ignore").split()
+
+    # ===================== ÉCRITURE DIFFÉRENTIELLE =====================
+
+    def write_delta(self, remote_path, data, base=None, expected=None,
+                    block_size=DELTA_BLOCK_SIZE):
+        """Enregistre `data` en n'envoyant que les blocs modifiés.
+
+        Les empreintes de l'ancien contenu viennent de `base` (copie locale
+        lue à l'ouverture) ou, à défaut, d'un hachage exécuté sur le serveur.
+        Le fichier est d'abord copié côté serveur vers un nom temporaire ; les
+        blocs différents y sont écrits par écritures à offset, le SHA-256 de la
+        copie est vérifié, puis elle est renommée à la place de la cible : une
+        coupure ne laisse jamais un fichier mi-ancien mi-nouveau. Si trop de
+        blocs changent, si les empreintes sont indisponibles, si la copie côté
+        serveur est impossible ou si la vérification échoue, on se rabat sur
+        `write_bytes` (envoi complet atomique).
+
+        Retourne (SFTPAttributes, octets envoyés, vérifié) ; `vérifié` vaut
+        False si les blocs ont été envoyés sans contrôle SHA-256 (sha256sum
+        indisponible sur le serveur).
+        """
+        current = self.sftp.stat(remote_path)
+        if expected is not None and attr_signature(current) != tuple(expected):
+            raise RemoteChangedError(
+                f"{remote_path} a été modifié sur le serveur depuis son ouverture"
+            )
+
+        if base is not None and len(base) == current.st_size:
+            old = block_hashes(base, block_size)
+        else:
+            old = self.remote_block_hashes(remote_path, block_size)
+        if old is None:
+            return self.write_bytes(remote_path, data), len(data), True
+
+        new = block_hashes(data, block_size)
+        changed = [i for i, h in enumerate(new) if i >= len(old) or old[i] != h]
+        if len(changed) * 2 > len(new):
+            # Modification trop étendue (ex. insertion en début de fichier)
+            return self.write_bytes(remote_path, data), len(data), True
+
+        # Mêmes cas que write_bytes où le renommage casserait quelque chose
+        target = self._resolve_link(remote_path)
+        if target is None or self._link_count(target) > 1:
+            return self.write_bytes(remote_path, data), len(data), True
+
+        folder, name = posixpath.split(target)
+        tmp_path = posixpath.join(folder, f".{name}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            self.copy_file(target, tmp_path)
+        except IOError:
+            # copy-data a pu créer la destination avant d'être refusé
+            try:
+                self.sftp.remove(tmp_path)
+            except IOError:
+                pass
+            return self.write_bytes(remote_path, data), len(data), True
+
+        try:
+            tmp = self.sftp.stat(tmp_path)
+            if (tmp.st_uid, tmp.st_gid) != (current.st_uid, current.st_gid):
+                try:
+                    self.sftp.chown(tmp_path, current.st_uid, current.st_gid)
+                except IOError:
+                    # Propriétaire impossible à conserver : write_bytes réécrit sur place
+                    self.sftp.remove(tmp_path)
+                    return self.write_bytes(remote_path, data), len(data), True
+
+            sent = 0
+            with self.sftp.open(tmp_path, "r+b") as f:
+                f.set_pipelined(True)
+                for i in changed:
+                    chunk = data[i * block_size:(i + 1) * block_size]
+                    f.seek(i * block_size)
+                    f.write(chunk)
+                    sent += len(chunk)
+                if len(data) < current.st_size:
+                    f.truncate(len(data))
+
+            digest = self.remote_sha256(tmp_path)
+            if digest is not None and digest != hashlib.sha256(data).hexdigest():
+                self.sftp.remove(tmp_path)
+                return self.write_bytes(remote_path, data), len(data), True
+            self._replace(tmp_path, target)
+        except Exception:
+            try:
+                self.sftp.remove(tmp_path)
+            except Exception:
+                pass
+            raise
+        return self.sftp.stat(target), sent, digest is not None
+
+    # ===================== ÉTAT DE LA SESSION =====================
+
+    def is_connected(self):
+        transport = self.ssh.get_transport() if self.ssh else None
+        return transport is not None and transport.is_active()
+
+    def session_info(self):
+        """État de la connexion (vue des sessions) : canaux, requêtes, tampons, socket."""
+        transport = self.ssh.get_transport() if self.ssh else None
+        if transport is None or not transport.is_active():
+            return {"connected": False}
+        channels = list(transport._channels.values())
+        info = {
+            "connected": True,
+            "channels": len(channels),
+            # Nombre de requêtes envoyées sur les sessions SFTP principales
+            "requests": sum(s.request_number for s in (self.sftp, self._batch_sftp) if s is not None),
+            # Données reçues mais pas encore lues par l'application
+            "buffered": sum(len(c.in_buffer) + len(c.in_stderr_buffer) for c in channels),
+            "local": None,
+            "peer": None,
+        }
+        try:
+            info["local"] = "{}:{}".format(*transport.sock.getsockname()[:2])
+            info["peer"] = "{}:{}".format(*transport.getpeername()[:2])
+        except (OSError, TypeError):
+            pass
+        return info
+
+    def is_busy(self):
+        """True si un canal autre que les sessions SFTP principales est ouvert.
+
+        Transferts parallèles, commandes exec, suivi de fichier, surveillance de
+        dossier : tous passent par un canal dédié.
+        """
+        info = self.session_info()
+        if not info["connected"]:
+            return False
+        baseline = sum(1 for s in (self.sftp, self._batch_sftp) if s is not None)
+        return info["channels"] > baseline
+
     # ===================== CLOSE =====================
 
     def close(self):
+        try:
+            if self._batch_sftp:
+                self._batch_sftp.close()
+        except Exception:
+            pass
+        # Une reconnexion (connect) rouvrira une session de rafale neuve
+        self._batch_sftp = None
         try:
             if self.sftp:
                 self.sftp.close()
@@ -7,8 +7,11 @@ from logic import SSHClient
 from config import get_data
 from ui import ExplorerUI, ServerManagerUI
 import delete
+import stats
+import profiling
 import requests
 import threading
+import multiprocessing
 import subprocess # Ajout nécessaire pour exécuter l'updater
 
 version = "V1.0.4"
@@ -32,6 +35,8 @@ class MainExplorerUI(ExplorerUI):
         self.ssh = ssh_client
         self.current = start_path or "/"
         self.config_callback = config_callback
+        self.all_rows = []
+        self.clipboard = None
 
         self.title("Explorateur distant")
         self.geometry("1200x700")
@@ -42,7 +47,7 @@ class MainExplorerUI(ExplorerUI):
             self.iconbitmap(icon_path)
 
         self._build_ui()
-        self.refresh()
+        self.refresh(cached=True)
 # Fin MainExplorerUI
 
 
@@ -130,14 +135,24 @@ def check_for_updates():
 
 
 def main():
+    # Nettoyage de l'espace temporaire de l'application (en arrière-plan)
     delete.clean_temp()
 
+    # Mesure des temps d'opération dès le démarrage (sinon : bouton Stats)
+    if os.environ.get("EXPLORATEUR_STATS"):
+        stats.enable()
+
+    # Profilage : lancer avec --profile (ou EXPLORATEUR_PROFILE=1) ; le profil
+    # est écrit dans logs/ à la fermeture
+    if "--profile" in sys.argv or os.environ.get("EXPLORATEUR_PROFILE"):
+        import atexit
+        profiling.start()
+        atexit.register(profiling.stop)
+
     # **********************************************
     # AJOUTER LA VÉRIFICATION DE MISE À JOUR ICI
     check_for_updates()
     # **********************************************
-    
-    delete.clean_temp()
 
     import config as cfgmod
 
@@ -229,7 +244,8 @@ def main():
     )
 
     def on_close():
-        try: ssh.close()
+        # app.ssh : la connexion a pu être remplacée par edit_config
+        try: app.ssh.close()
         except: pass
         try: app.destroy()
         except: pass
@@ -240,4 +256,6 @@ def main():
 
 if __name__ == "__main__":
     # ... (reste du code CLI inchangé) ...
+    # Requis par le pool de processus de hachage dans l'exécutable PyInstaller
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
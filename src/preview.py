@@ -0,0 +1,335 @@
+# preview.py
+# Aperçu des fichiers distants sans les télécharger en entier.
+# Seuls les octets utiles sont lus : l'en-tête (type, dimensions, version),
+# les premières lignes d'un texte ou d'un CSV, la fin d'un PDF pour son nombre
+# de pages. Les images sont réduites localement (avec Pillow si installé,
+# sinon PNG/GIF seulement, réduits par Tk à l'affichage).
+#
+# Les aperçus sont gardés dans un cache disque LRU borné en taille (SQLite),
+# indexé par serveur, chemin, taille et mtime : un fichier modifié n'est
+# jamais servi depuis un aperçu périmé.
+import io
+import re
+import csv
+import json
+import time
+import struct
+import sqlite3
+import hashlib
+import threading
+
+from servers import get_path
+
+try:
+    from PIL import Image
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
+PREVIEW_CACHE_FILE = get_path("previews.db")
+PREVIEW_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+PREVIEW_HEAD_BYTES = 64 * 1024
+PREVIEW_TAIL_BYTES = 64 * 1024
+PREVIEW_LINES = 200
+PREVIEW_CELL_WIDTH = 24
+PREVIEW_HEX_BYTES = 512
+THUMBNAIL_SIZE = 320
+# Au-delà, une image n'est pas téléchargée pour être réduite
+PREVIEW_IMAGE_MAX_BYTES = 32 * 1024 * 1024
+# Sans Pillow, l'image d'origine est conservée telle quelle : limite plus basse
+PREVIEW_RAW_IMAGE_MAX_BYTES = 4 * 1024 * 1024
+
+_MAGIC = [
+    (b"\x89PNG\r\n\x1a\n", "png", "Image PNG"),
+    (b"GIF87a", "gif", "Image GIF"),
+    (b"GIF89a", "gif", "Image GIF"),
+    (b"\xff\xd8\xff", "jpeg", "Image JPEG"),
+    (b"%PDF-", "pdf", "Document PDF"),
+    (b"PK\x03\x04", "zip", "Archive ZIP"),
+    (b"\x1f\x8b", "gzip", "Archive gzip"),
+    (b"BZh", "bzip2", "Archive bzip2"),
+    (b"\xfd7zXZ\x00", "xz", "Archive xz"),
+    (b"7z\xbc\xaf\x27\x1c", "7z", "Archive 7-Zip"),
+    (b"\x7fELF", "elf", "Exécutable ELF"),
+    (b"SQLite format 3\x00", "sqlite", "Base SQLite"),
+]
+
+
+def sniff(head):
+    """(code, libellé) du type reconnu par ses premiers octets, ou (None, None)."""
+    for magic, code, label in _MAGIC:
+        if head.startswith(magic):
+            return code, label
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp", "Image WebP"
+    return None, None
+
+
+def image_size(kind, head):
+    """(largeur, hauteur) lues dans l'en-tête d'une image, ou None."""
+    try:
+        if kind == "png" and head[12:16] == b"IHDR":
+            return struct.unpack(">II", head[16:24])
+        if kind == "gif":
+            return struct.unpack("<HH", head[6:10])
+        if kind == "jpeg":
+            i = 2
+            while i + 9 < len(head):
+                if head[i] != 0xFF:
+                    return None
+                marker = head[i + 1]
+                length = struct.unpack(">H", head[i + 2:i + 4])[0]
+                # SOF0..SOF15 sauf DHT (C4), JPG (C8) et DAC (CC)
+                if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                    h, w = struct.unpack(">HH", head[i + 5:i + 9])
+                    return w, h
+                i += 2 + length
+    except struct.error:
+        pass
+    return None
+
+
+# ===================== CONSTRUCTION DES APERÇUS =====================
+# Un aperçu est un dict : {"kind": "text" | "image" | "info", "title": résumé,
+# "text": contenu affiché, "image": octets, "format": "png" | "gif",
+# "width", "height"}.
+
+def _text_preview(head, name, truncated):
+    text = head.decode("utf-8", errors="replace")
+    lines = text.splitlines()
+    if truncated and lines:
+        lines.pop()  # dernière ligne probablement coupée
+    cut = truncated or len(lines) > PREVIEW_LINES
+    lines = lines[:PREVIEW_LINES]
+    title = f"Texte — {len(lines)} première(s) ligne(s)" if cut else f"Texte — {len(lines)} ligne(s)"
+    if name.lower().endswith((".csv", ".tsv")) and lines:
+        try:
+            dialect = csv.Sniffer().sniff("\n".join(lines[:20]), delimiters=",;\t|")
+            rows = list(csv.reader(lines, dialect))
+            width = max(len(r) for r in rows)
+            cells = [[c if len(c) <= PREVIEW_CELL_WIDTH else c[:PREVIEW_CELL_WIDTH - 1] + "…" for c in r]
+                     for r in rows]
+            widths = [max((len(r[i]) for r in cells if i < len(r)), default=0) for i in range(width)]
+            lines = ["  ".join(c.ljust(w) for c, w in zip(r, widths)).rstrip() for r in cells]
+            title = f"CSV — {width} colonne(s), {len(rows)}{' première(s)' if cut else ''} ligne(s)"
+        except csv.Error:
+            pass
+    return {"kind": "text", "title": title, "text": "\n".join(lines)}
+
+
+def _hexdump(data):
+    out = []
+    for off in range(0, len(data), 16):
+        chunk = data[off:off + 16]
+        hexa = " ".join(f"{b:02x}" for b in chunk)
+        ascii_ = "".join(chr(b) if 32 <= b < 127 else "." for b in chunk)
+        out.append(f"{off:08x}  {hexa:<47}  {ascii_}")
+    return "\n".join(out)
+
+
+def _pdf_preview(ssh, path, size, head):
+    version = head[5:8].decode("ascii", "replace")
+    pages = None
+    m = re.search(rb"/Linearized.{0,200}?/N\s+(\d+)", head, re.S)
+    if m:
+        pages = int(m.group(1))
+    else:
+        tail = ssh.read_range(path, -PREVIEW_TAIL_BYTES, PREVIEW_TAIL_BYTES, size=size) \
+            if size > PREVIEW_HEAD_BYTES else b""
+        counts = [int(c) for c in re.findall(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)", head + tail)]
+        counts += [int(c) for c in re.findall(rb"/Count\s+(\d+)[^>]*?/Type\s*/Pages\b", head + tail)]
+        if counts:
+            pages = max(counts)  # le nœud racine contient toutes les pages
+    title = f"Document PDF {version}" + (f" — {pages} page(s)" if pages is not None else "")
+    return {"kind": "info", "title": title, "text": _hexdump(head[:PREVIEW_HEX_BYTES])}
+
+
+def _exif_thumbnail(head):
+    """Miniature JPEG incluse dans le bloc EXIF (APP1), si elle tient dans `head`."""
+    if head[2:4] != b"\xff\xe1":
+        return None
+    length = struct.unpack(">H", head[4:6])[0]
+    segment = head[4:4 + length]
+    start = segment.find(b"\xff\xd8\xff", 2)
+    end = segment.find(b"\xff\xd9", start) if start >= 0 else -1
+    return segment[start:end + 2] if end > start else None
+
+
+def _thumbnail(data, kind):
+    """Miniature PNG (octets) calculée avec Pillow."""
+    img = Image.open(io.BytesIO(data))
+    if kind == "jpeg":
+        img.draft("RGB", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))  # décodage réduit, bien plus rapide
+    img.thumbnail((THUMBNAIL_SIZE, THUMBNAIL_SIZE))
+    if img.mode not in ("RGB", "RGBA", "L", "P"):
+        img = img.convert("RGB")
+    out = io.BytesIO()
+    img.save(out, "PNG")
+    return out.getvalue()
+
+
+def _image_preview(ssh, path, size, head, kind, label):
+    dims = image_size(kind, head)
+    title = label + (f" — {dims[0]} × {dims[1]}" if dims else "")
+    info = {"kind": "info", "title": title, "text": _hexdump(head[:PREVIEW_HEX_BYTES])}
+    if HAS_PIL:
+        if kind == "jpeg":
+            embedded = _exif_thumbnail(head)
+            if embedded:
+                try:
+                    return {"kind": "image", "title": title, "format": "png",
+                            "image": _thumbnail(embedded, kind)}
+                except Exception:
+                    pass
+        if size > PREVIEW_IMAGE_MAX_BYTES:
+            return info
+        data = head if size <= len(head) else ssh.read_range(path, 0, size, size=size)
+        try:
+            return {"kind": "image", "title": title, "format": "png", "image": _thumbnail(data, kind)}
+        except Exception:
+            return info
+    if kind in ("png", "gif") and size <= PREVIEW_RAW_IMAGE_MAX_BYTES:
+        data = head if size <= len(head) else ssh.read_range(path, 0, size, size=size)
+        preview = {"kind": "image", "title": title, "format": kind, "image": data}
+        if dims:
+            preview["width"], preview["height"] = dims
+        return preview
+    return info
+
+
+def build(ssh, path, size):
+    """Construit l'aperçu de `path` (taille `size`) en lisant le moins possible."""
+    head = ssh.read_range(path, 0, PREVIEW_HEAD_BYTES, size=size)
+    truncated = size > len(head)
+    kind, label = sniff(head)
+    if kind in ("png", "gif", "jpeg", "webp"):
+        return _image_preview(ssh, path, size, head, kind, label)
+    if kind == "pdf":
+        return _pdf_preview(ssh, path, size, head)
+    if kind is None and b"\x00" not in head:
+        return _text_preview(head, path, truncated)
+    return {"kind": "info", "title": label or "Fichier binaire", "text": _hexdump(head[:PREVIEW_HEX_BYTES])}
+
+
+# ===================== CACHE DES APERÇUS =====================
+
+def preview_key(server, path, size, mtime):
+    return hashlib.sha1(f"{server}\0{path}\0{size}\0{mtime}".encode("utf-8")).hexdigest()
+
+
+class PreviewCache:
+    """Aperçus {clé: aperçu} dans SQLite, les moins récemment vus évincés au-delà de `max_bytes`.
+
+    Comme pour cache.ListingCache, une lecture n'écrit rien : les dates
+    d'accès sont gardées en mémoire et enregistrées avec l'écriture suivante,
+    et le total des octets est tenu à jour en mémoire.
+    """
+
+    def __init__(self, path=PREVIEW_CACHE_FILE, max_bytes=PREVIEW_CACHE_MAX_BYTES):
+        self._lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS previews (
+                key      TEXT PRIMARY KEY,
+                meta     TEXT NOT NULL,
+                data     BLOB NOT NULL,
+                accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS previews_lru ON previews (accessed);
+        """)
+        self._accessed = {}   # clé -> date d'accès pas encore enregistrée
+        self._bytes = None    # octets en cache (calculé à la demande)
+
+    def get(self, key):
+        with self._lock:
+            row = self.db.execute("SELECT meta, data FROM previews WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+        preview = json.loads(row[0])
+        if preview["kind"] == "image":
+            preview["image"] = bytes(row[1])
+        else:
+            preview["text"] = bytes(row[1]).decode("utf-8")
+        return preview
+
+    def put(self, key, preview):
+        meta = {k: v for k, v in preview.items() if k not in ("image", "text")}
+        data = preview["image"] if preview["kind"] == "image" else preview.get("text", "").encode("utf-8")
+        with self._lock:
+            self._accessed.pop(key, None)
+            self._flush_accessed()
+            if self._bytes is None:
+                self._bytes = self.db.execute(
+                    "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM previews").fetchone()[0]
+            old = self.db.execute("SELECT LENGTH(data) FROM previews WHERE key=?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO previews VALUES (?, ?, ?, ?)",
+                            (key, json.dumps(meta, ensure_ascii=False), data, time.time()))
+            self._bytes += len(data) - (old[0] if old else 0)
+            if self._bytes > self.max_bytes:
+                self._evict()
+            self.db.commit()
+
+    def _flush_accessed(self):
+        """Enregistre les dates d'accès accumulées par get (appelé verrou pris)."""
+        if self._accessed:
+            self.db.executemany("UPDATE previews SET accessed=? WHERE key=?",
+                                [(t, k) for k, t in self._accessed.items()])
+            self._accessed.clear()
+
+    def _evict(self):
+        """Supprime les aperçus les moins récemment vus jusqu'à repasser sous `max_bytes`."""
+        total = self._bytes
+        doomed = []
+        for key, amount in self.db.execute("SELECT key, LENGTH(data) FROM previews ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            total -= amount
+        self.db.executemany("DELETE FROM previews WHERE key=?", doomed)
+        self._bytes = total
+
+    def clear(self):
+        with self._lock:
+            self.db.execute("DELETE FROM previews")
+            self.db.commit()
+            self.db.execute("VACUUM")
+            self._accessed.clear()
+            self._bytes = 0
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self.db.commit()
+            self.db.close()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Instance partagée du cache d'aperçus (None si la base ne peut pas être ouverte)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = PreviewCache()
+            except sqlite3.Error:
+                return None
+        return _cache
+
+
+def get_preview(ssh, server, path, attr):
+    """Aperçu de `path` (SFTPAttributes `attr`), depuis le cache ou construit puis mis en cache."""
+    key = preview_key(server, path, attr.st_size, attr.st_mtime)
+    previews = get_cache()
+    preview = previews.get(key) if previews else None
+    if preview is None:
+        preview = build(ssh, path, attr.st_size or 0)
+        if previews:
+            previews.put(key, preview)
+    return preview
@@ -0,0 +1,174 @@
+# profiling.py
+# Mode profilage pour le diagnostic sur le terrain :
+# - échantillonnage des piles de tous les threads (thread Tk et threads de
+#   travail), écrit au format « piles repliées » (compatible flamegraph) ;
+# - journal des opérations lentes (appel distant ou mise à jour de l'interface
+#   au-delà d'un seuil) avec chemin, taille et pile, en JSON par ligne ;
+# - détection des blocages du thread Tk de plus de 100 ms, avec la pile
+#   responsable.
+# Les fichiers vont dans logs/ (journal tournant), à joindre aux tickets.
+import os
+import sys
+import json
+import time
+import logging
+import threading
+import traceback
+import collections
+import logging.handlers
+
+import stats
+from servers import get_path
+
+LOG_DIR = get_path("logs")
+SLOW_LOG_FILE = os.path.join(LOG_DIR, "slow_ops.log")
+SLOW_LOG_MAX_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 5
+
+SAMPLE_INTERVAL = 0.01
+SLOW_OP_THRESHOLD = 0.5
+STALL_THRESHOLD = 0.1
+STACK_DEPTH = 12
+
+# Fonctions de tkinter dans lesquelles le thread principal attend l'utilisateur :
+# ce n'est pas un blocage.
+_TK_IDLE = {"mainloop", "wait_window", "wait_variable", "show", "_show"}
+_TK_DIR = os.sep + "tkinter" + os.sep
+
+_logger = None
+_sampler = None
+
+
+def _slow_logger():
+    global _logger
+    if _logger is None:
+        os.makedirs(LOG_DIR, exist_ok=True)
+        _logger = logging.getLogger("explorateur.slow")
+        _logger.setLevel(logging.INFO)
+        _logger.propagate = False
+        handler = logging.handlers.RotatingFileHandler(
+            SLOW_LOG_FILE, maxBytes=SLOW_LOG_MAX_BYTES, backupCount=SLOW_LOG_BACKUPS, encoding="utf-8")
+        _logger.addHandler(handler)
+    return _logger
+
+
+def log_event(kind, **fields):
+    """Écrit une ligne JSON dans le journal tournant des opérations lentes."""
+    fields = dict(type=kind, time=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                  thread=threading.current_thread().name, **fields)
+    _slow_logger().info(json.dumps(fields, ensure_ascii=False, default=str))
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+def _stack(frame, depth=STACK_DEPTH):
+    """Pile (la plus externe d'abord) à partir de `frame`."""
+    out = []
+    while frame is not None and len(out) < depth:
+        out.append(_frame_label(frame))
+        frame = frame.f_back
+    return out[::-1]
+
+
+def _on_operation(name, seconds, args, nbytes, failed):
+    """Observateur de stats : consigne les opérations au-delà du seuil."""
+    if seconds < SLOW_OP_THRESHOLD:
+        return
+    path = next((a for a in args if isinstance(a, str)), None)
+    log_event("slow_op", operation=name, duration_ms=round(seconds * 1000, 1), path=path,
+              bytes=nbytes, failed=failed,
+              stack=[line.strip() for line in traceback.format_stack(limit=STACK_DEPTH)[:-2]])
+
+
+class _Sampler(threading.Thread):
+    """Échantillonne toutes les piles et surveille les blocages du thread principal."""
+
+    def __init__(self):
+        super().__init__(name="profiling-sampler", daemon=True)
+        self.stop_event = threading.Event()
+        self.samples = collections.Counter()
+        self.started = time.time()
+        self.main_id = threading.main_thread().ident
+        self._stall_start = None
+        self._stall_stacks = collections.Counter()
+
+    def _main_idle(self, frame):
+        if frame is None:
+            return True
+        code = frame.f_code
+        return code.co_name in _TK_IDLE and _TK_DIR in code.co_filename
+
+    def run(self):
+        me = threading.get_ident()
+        while not self.stop_event.wait(SAMPLE_INTERVAL):
+            now = time.monotonic()
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                stack = _stack(frame, depth=64)
+                self.samples[";".join([names.get(ident, str(ident))] + stack)] += 1
+                if ident == self.main_id:
+                    self._watch_main(frame, stack, now)
+        # Blocage encore en cours à l'arrêt : on le consigne quand même
+        self._watch_main(None, [], time.monotonic())
+
+    def _watch_main(self, frame, stack, now):
+        if not self._main_idle(frame):
+            if self._stall_start is None:
+                self._stall_start = now
+            self._stall_stacks[tuple(stack[-STACK_DEPTH:])] += 1
+            return
+        if self._stall_start is not None:
+            duration = now - self._stall_start
+            if duration >= STALL_THRESHOLD:
+                cause, hits = self._stall_stacks.most_common(1)[0]
+                log_event("tk_stall", duration_ms=round(duration * 1000, 1),
+                          samples=sum(self._stall_stacks.values()), cause=list(cause), cause_samples=hits)
+            self._stall_start = None
+            self._stall_stacks.clear()
+
+    def write_profile(self):
+        """Écrit les piles repliées (« thread;f1;f2 N ») et retourne le chemin du fichier."""
+        os.makedirs(LOG_DIR, exist_ok=True)
+        path = os.path.join(LOG_DIR, time.strftime("profile_%Y%m%d_%H%M%S.txt", time.localtime(self.started)))
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+
+def is_running():
+    return _sampler is not None
+
+
+def start():
+    """Active l'échantillonnage, le journal des opérations lentes et la détection de blocages."""
+    global _sampler
+    if _sampler is not None:
+        return
+    stats.enable()
+    if _on_operation not in stats.observers:
+        stats.observers.append(_on_operation)
+    _sampler = _Sampler()
+    _sampler.start()
+    log_event("profiling_started", interval_ms=SAMPLE_INTERVAL * 1000,
+              slow_op_ms=SLOW_OP_THRESHOLD * 1000, stall_ms=STALL_THRESHOLD * 1000)
+
+
+def stop():
+    """Arrête le profilage et retourne le chemin du profil échantillonné."""
+    global _sampler
+    if _sampler is None:
+        return None
+    sampler, _sampler = _sampler, None
+    sampler.stop_event.set()
+    sampler.join()
+    if _on_operation in stats.observers:
+        stats.observers.remove(_on_operation)
+    path = sampler.write_profile()
+    log_event("profiling_stopped", profile=path, samples=sum(sampler.samples.values()))
+    return path
@@ -0,0 +1,42 @@
+# servers.py
+# Stockage chiffré de la liste des serveurs (data.bin).
+# Ce module n'importe pas tkinter : il est partagé entre l'interface et cli.py.
+import json
+import os
+
+
+def get_path(name: str):
+    """Retourne le chemin correct, compatible PyInstaller."""
+    # ici on force dossier courant
+    base_path = os.getcwd()
+    return os.path.join(base_path, name)
+
+# DATA BIN toujours dans le dossier courant
+CONFIG_FILE = get_path("data.bin")
+
+
+def load_entries():
+    """Retourne la liste d'entrées stockées (ou [] si aucune)."""
+    if not os.path.exists(CONFIG_FILE):
+        return []
+    with open(CONFIG_FILE, "r") as f:
+        encrypted_data = f.read()
+    try:
+        from get_data import decrypt
+        decrypted = decrypt(source_type="content", data=encrypted_data, is_binary=False, bits=True)
+        loaded = json.loads(decrypted.decode())
+    except Exception:
+        return []
+    if isinstance(loaded, dict):
+        return [loaded]
+    if isinstance(loaded, list):
+        return loaded
+    return []
+
+
+def save_entries(entries):
+    """Sauvegarde la liste d'entrées (écrase)."""
+    from get_data import encrypt
+    encrypted = encrypt(source_type="content", data=json.dumps(entries), is_binary=False, bits=True)
+    with open(CONFIG_FILE, "w") as f:
+        f.write(encrypted.decode())
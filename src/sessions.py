@@ -0,0 +1,100 @@
+# sessions.py
+# Cycle de vie des sessions SSH des fenêtres d'exploration.
+# Registre des fenêtres ouvertes (vue « Sessions ») et délai d'inactivité
+# au-delà duquel une fenêtre ferme sa connexion : elle est rouverte au premier
+# clic, le listing revenant du cache local. Une session qui transfère, suit un
+# fichier ou surveille un dossier n'est jamais considérée inactive.
+import os
+import sys
+import json
+import threading
+
+from servers import get_path
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+SESSIONS_FILE = get_path("sessions.json")
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+# Période de vérification de l'inactivité, en millisecondes (timer Tk)
+IDLE_CHECK_INTERVAL_MS = 30 * 1000
+# Lignes mesurées pour estimer la mémoire d'un listing
+MEMORY_SAMPLE = 1000
+
+_lock = threading.Lock()
+_windows = []
+
+
+def register(window):
+    with _lock:
+        if window not in _windows:
+            _windows.append(window)
+
+
+def unregister(window):
+    with _lock:
+        if window in _windows:
+            _windows.remove(window)
+
+
+def windows():
+    """Fenêtres d'exploration ouvertes, dans l'ordre d'ouverture."""
+    with _lock:
+        return list(_windows)
+
+
+# ===================== RÉGLAGES =====================
+
+def _load():
+    try:
+        with open(SESSIONS_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def idle_timeout():
+    """Délai d'inactivité en secondes avant fermeture d'une session (0 : jamais)."""
+    value = os.environ.get("EXPLORATEUR_IDLE_TIMEOUT")
+    if value is None:
+        value = _load().get("idle_timeout", DEFAULT_IDLE_TIMEOUT)
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return DEFAULT_IDLE_TIMEOUT
+
+
+def set_idle_timeout(seconds):
+    data = _load()
+    data["idle_timeout"] = max(0, int(seconds))
+    tmp = SESSIONS_FILE + ".new"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, SESSIONS_FILE)
+
+
+# ===================== MÉMOIRE =====================
+
+def rows_memory(rows):
+    """Estimation (octets) de la mémoire d'une liste de lignes (tuples de chaînes)."""
+    if not rows:
+        return 0
+    step = max(1, len(rows) // MEMORY_SAMPLE)
+    sample = rows[::step]
+    per_row = sum(sys.getsizeof(r) + sum(sys.getsizeof(v) for v in r) for r in sample) / len(sample)
+    return int(sys.getsizeof(rows) + per_row * len(rows))
+
+
+def process_memory():
+    """Mémoire résidente du processus en octets, ou None si indisponible."""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
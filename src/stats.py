@@ -0,0 +1,220 @@
+# stats.py
+# Mesure des temps d'opération : un histogramme (échelle logarithmique) par
+# opération, avec nombre d'appels, percentiles et octets transférés.
+#
+# Coût nul à l'arrêt : les fonctions mesurées ne sont enveloppées qu'au moment
+# de enable(), et disable() remet les originales en place.
+import os
+import sys
+import json
+import math
+import time
+import threading
+import functools
+
+# Buckets : de 1 µs à ~1000 s, quatre par puissance de 2 (précision ~19 %)
+_BASE = 2 ** 0.25
+_MIN = 1e-6
+_BUCKETS = 128
+
+
+def _written(args, kwargs, result):
+    data = args[1] if len(args) > 1 else kwargs.get("data", b"")
+    return len(data)
+
+
+def _local_size(index):
+    def size(args, kwargs, result):
+        try:
+            return os.path.getsize(args[index])
+        except (OSError, IndexError, TypeError):
+            return 0
+    return size
+
+
+# Fonctions mesurées : (module, classe ou None, {nom: extracteur d'octets ou None}).
+# Les octets sont calculés à partir de (args sans self, kwargs, résultat).
+TARGETS = [
+    ("logic", "SSHClient", {
+        "connect": None,
+        "listdir_attr": None,
+        "stat": None,
+        "mkdir": None,
+        "remove_file": None,
+        "remove_dir": None,
+        "rename": None,
+        "open_file_readbytes": lambda a, k, r: len(r),
+        "read_range": lambda a, k, r: len(r),
+        "write_bytes": _written,
+        "write_delta": lambda a, k, r: r[1],
+        "download_to": _local_size(1),
+        "upload_from": lambda a, k, r: os.path.getsize(a[0]) if r else 0,
+        "upload_tree": None,
+        "download_many": None,
+        "pipeline": None,
+        "walk_tree": None,
+        "remove_tree": None,
+        "copy": None,
+        "move": None,
+        "exec_command": lambda a, k, r: len(r[1]) + len(r[2]),
+        "remote_sha256": None,
+    }),
+    ("get_data", None, {"process_with_server": None}),
+    ("diskusage", None, {"compute": None}),
+    ("preview", None, {"get_preview": None}),
+    ("ui", "ExplorerUI", {"refresh_worker": None, "populate": None}),
+]
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max", "bytes", "errors")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.bytes = 0
+        self.errors = 0
+
+    def add(self, seconds, nbytes=0, failed=False):
+        i = 0 if seconds <= _MIN else min(_BUCKETS - 1, int(math.log(seconds / _MIN, _BASE)) + 1)
+        self.counts[i] += 1
+        self.count += 1
+        self.total += seconds
+        self.bytes += nbytes
+        self.errors += failed
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Borne haute du bucket contenant le q-ième centile (en secondes)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self.max, _MIN * _BASE ** i)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+            "max_ms": self.max * 1000,
+            "bytes": self.bytes,
+        }
+
+
+_lock = threading.Lock()
+_histograms = {}
+_originals = []  # [(objet, nom, fonction d'origine)]
+# Fonctions appelées après chaque mesure : f(nom, secondes, args, octets, échec).
+# Appelées dans le thread de l'opération (voir profiling.py).
+observers = []
+
+
+def is_enabled():
+    return bool(_originals)
+
+
+def record(name, seconds, nbytes=0, failed=False, args=()):
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = Histogram()
+        h.add(seconds, nbytes, failed)
+    for observer in observers:
+        observer(name, seconds, args, nbytes, failed)
+
+
+def _wrap(name, func, size):
+    @functools.wraps(func)
+    def timed(self_or_first, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(self_or_first, *args, **kwargs)
+        except BaseException:
+            record(name, time.perf_counter() - start, failed=True, args=args)
+            raise
+        elapsed = time.perf_counter() - start
+        nbytes = 0
+        if size is not None:
+            try:
+                nbytes = size(args, kwargs, result)
+            except Exception:
+                pass
+        record(name, elapsed, nbytes, args=args)
+        return result
+    return timed
+
+
+def _wrap_function(name, func, size):
+    @functools.wraps(func)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException:
+            record(name, time.perf_counter() - start, failed=True, args=args)
+            raise
+        nbytes = len(result) if isinstance(result, (bytes, bytearray)) else 0
+        record(name, time.perf_counter() - start, nbytes, args=args)
+        return result
+    return timed
+
+
+def enable():
+    """Installe les mesures sur les modules déjà importés (ui n'est jamais importé ici)."""
+    with _lock:
+        if _originals:
+            return
+        for module_name, class_name, functions in TARGETS:
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            owner = getattr(module, class_name) if class_name else module
+            prefix = f"{class_name}." if class_name else f"{module_name}."
+            for attr, size in functions.items():
+                func = owner.__dict__.get(attr) if class_name else getattr(owner, attr, None)
+                if func is None:
+                    continue
+                if class_name:
+                    wrapped = _wrap(prefix + attr, func, size)
+                else:
+                    wrapped = _wrap_function(prefix + attr, func, size)
+                _originals.append((owner, attr, func))
+                setattr(owner, attr, wrapped)
+
+
+def disable():
+    with _lock:
+        while _originals:
+            owner, attr, func = _originals.pop()
+            setattr(owner, attr, func)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+def snapshot():
+    """{opération: résumé} trié par temps total décroissant."""
+    with _lock:
+        items = [(name, h.total, h.summary()) for name, h in _histograms.items()]
+    items.sort(key=lambda x: -x[1])
+    return {name: s for name, _, s in items}
+
+
+def dump_json(path):
+    data = {"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "enabled": is_enabled(),
+            "operations": snapshot()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,332 @@
+# sync.py
+# Synchronisation bidirectionnelle entre un dossier local et un dossier distant.
+# Un manifeste persistant (chemin, taille, mtime, sha256) mémorise l'état de la
+# dernière synchronisation : chaque exécution ne traite que les différences.
+# Les fichiers modifiés des deux côtés sont départagés par leur contenu
+# (sha256 local, `sha256sum` distant) avant d'être déclarés en conflit.
+# Le plan est calculé sans rien modifier (prepare_sync), puis exécuté (run_sync).
+import os
+import json
+import shlex
+import hashlib
+import posixpath
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import workspace
+from logic import hash_local_files, SFTPChannelPool
+
+SYNC_DIR = os.path.join(os.getcwd(), "sync")
+SYNC_WORKERS = 4
+
+
+# ===================== MANIFESTE =====================
+
+def manifest_path(cfg, remote_root, local_root):
+    """Fichier manifeste propre au couple (serveur, dossier distant, dossier local)."""
+    key = "{}@{}:{}|{}|{}".format(cfg.get("username"), cfg.get("host"), cfg.get("port", 22),
+                                 remote_root, os.path.abspath(local_root))
+    return os.path.join(SYNC_DIR, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+
+def load_manifest(path):
+    """{chemin relatif: [taille, mtime, sha256]} de la dernière synchronisation."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(path, files):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".new"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": 1, "files": files}, f, separators=(",", ":"))
+    os.replace(tmp, path)
+
+
+# ===================== INVENTAIRES =====================
+
+def scan_local(local_root):
+    """{chemin relatif POSIX: (taille, mtime)} pour tous les fichiers locaux."""
+    found = {}
+    stack = [("", local_root)]
+    while stack:
+        rel, folder = stack.pop()
+        with os.scandir(folder) as it:
+            for e in it:
+                r = f"{rel}/{e.name}" if rel else e.name
+                if e.is_dir(follow_symlinks=False):
+                    stack.append((r, e.path))
+                elif e.is_file(follow_symlinks=False):
+                    st = e.stat(follow_symlinks=False)
+                    found[r] = (st.st_size, int(st.st_mtime))
+    return found
+
+
+def scan_remote(ssh, remote_root):
+    """{chemin relatif: (taille, mtime)} côté serveur.
+
+    Un seul `find -printf` exécuté à distance quand c'est possible ; sinon
+    parcours SFTP dossier par dossier.
+    """
+    cmd = "find {} -mindepth 1 -type f -printf '%s\\t%T@\\t%P\\n'".format(shlex.quote(remote_root))
+    try:
+        code, out, _ = ssh.exec_command(cmd, timeout=600)
+    except Exception:
+        code = None
+    if code == 0:
+        found = {}
+        for line in out.decode("utf-8", "surrogateescape").splitlines():
+            parts = line.split("\t", 2)
+            if len(parts) == 3:
+                found[parts[2]] = (int(parts[0]), int(float(parts[1])))
+        return found
+
+    found = {}
+    stack = [""]
+    while stack:
+        rel = stack.pop()
+        folder = posixpath.join(remote_root, rel) if rel else remote_root
+        try:
+            entries = ssh.listdir_attr(folder)
+        except FileNotFoundError:
+            if rel:
+                raise
+            break  # dossier distant pas encore créé
+        for attr in entries:
+            r = f"{rel}/{attr.filename}" if rel else attr.filename
+            if ssh.is_dir_attr(attr):
+                stack.append(r)
+            else:
+                found[r] = (attr.st_size, int(attr.st_mtime))
+    return found
+
+
+# ===================== PLAN =====================
+
+def plan_sync(local, remote, manifest, propagate_deletes=True, settled=None):
+    """Compare les deux inventaires au manifeste et retourne le plan d'actions.
+
+    Clés : upload, download, delete_local, delete_remote, unchanged, identical
+    (listes de chemins relatifs) et conflicts (liste de (chemin, raison)).
+    `settled` : {chemin: "identical" | "upload" | "download"} pour les fichiers
+    modifiés des deux côtés déjà départagés par leur contenu (settle_by_content).
+    """
+    plan = {"upload": [], "download": [], "delete_local": [], "delete_remote": [],
+            "unchanged": [], "identical": [], "conflicts": []}
+    settled = settled or {}
+
+    for rel in set(local) | set(remote) | set(manifest):
+        l, r, m = local.get(rel), remote.get(rel), manifest.get(rel)
+        base = tuple(m[:2]) if m else None
+        l_changed = l != base
+        r_changed = r != base
+
+        if not l_changed and not r_changed:
+            if l is not None:
+                plan["unchanged"].append(rel)
+        elif l is not None and r is not None and l == r:
+            # Même taille et même mtime des deux côtés : déjà synchronisé
+            plan["unchanged"].append(rel)
+        elif l_changed and not r_changed:
+            if l is not None:
+                plan["upload"].append(rel)
+            elif propagate_deletes:
+                plan["delete_remote"].append(rel)
+        elif r_changed and not l_changed:
+            if r is not None:
+                plan["download"].append(rel)
+            elif propagate_deletes:
+                plan["delete_local"].append(rel)
+        elif l is None and r is None:
+            pass  # supprimé des deux côtés
+        elif rel in settled:
+            plan[settled[rel]].append(rel)
+        elif l is None:
+            plan["conflicts"].append((rel, "supprimé localement, modifié sur le serveur"))
+        elif r is None:
+            plan["conflicts"].append((rel, "supprimé sur le serveur, modifié localement"))
+        elif m is None:
+            plan["conflicts"].append((rel, "contenus différents, aucune synchronisation précédente"))
+        else:
+            plan["conflicts"].append((rel, "modifié des deux côtés"))
+    return plan
+
+
+def settle_by_content(ssh, local_root, remote_root, plan, manifest):
+    """Départage les conflits dont le fichier existe des deux côtés par leur sha256.
+
+    Contenus identiques : "identical". Sinon, un côté dont le contenu est
+    celui de la dernière synchronisation (empreinte du manifeste) n'a pas
+    vraiment changé : on transfère l'autre. Retourne (settled, digests) où
+    digests donne l'empreinte des fichiers identiques. Sans exécution de
+    commandes sur le serveur, rien n'est départagé.
+    """
+    candidates = [rel for rel, _ in plan["conflicts"]]
+    local_paths = {rel: os.path.join(local_root, *rel.split("/")) for rel in candidates}
+    candidates = [rel for rel in candidates if os.path.isfile(local_paths[rel])]
+    if not candidates:
+        return {}, {}
+    remote_digests = ssh.remote_sha256_many(remote_root, candidates)
+    if not remote_digests:
+        return {}, {}
+    local_digests = hash_local_files(local_paths[rel] for rel in candidates)
+
+    settled, digests = {}, {}
+    for rel in candidates:
+        ld, rd = local_digests.get(local_paths[rel]), remote_digests.get(rel)
+        if ld is None or rd is None:
+            continue
+        m = manifest.get(rel)
+        base = m[2] if m and len(m) > 2 else None
+        if ld == rd:
+            settled[rel] = "identical"
+            digests[rel] = ld
+        elif base and ld == base:
+            settled[rel] = "download"
+        elif base and rd == base:
+            settled[rel] = "upload"
+    return settled, digests
+
+
+# ===================== EXÉCUTION =====================
+
+def prepare_sync(ssh, local_root, remote_root, propagate_deletes=True):
+    """Inventorie les deux côtés et calcule le plan, sans rien modifier.
+
+    Le résultat (plan compris, clé "plan") est à passer à run_sync, après un
+    éventuel aperçu ; ses listes peuvent être vidées pour renoncer à une action.
+    """
+    mpath = manifest_path(ssh.cfg, remote_root, local_root)
+    manifest = load_manifest(mpath)
+    local = scan_local(local_root)
+    remote = scan_remote(ssh, remote_root)
+    plan = plan_sync(local, remote, manifest, propagate_deletes)
+    digests = {}
+    if plan["conflicts"]:
+        settled, digests = settle_by_content(ssh, local_root, remote_root, plan, manifest)
+        if settled:
+            plan = plan_sync(local, remote, manifest, propagate_deletes, settled)
+    return {"local_root": local_root, "remote_root": remote_root, "manifest_path": mpath,
+            "manifest": manifest, "local": local, "remote": remote, "digests": digests,
+            "plan": plan}
+
+
+def sync_dirs(ssh, local_root, remote_root, propagate_deletes=True,
+              workers=SYNC_WORKERS, progress=None):
+    """Synchronise `local_root` et `remote_root` dans les deux sens (sans aperçu).
+
+    Voir prepare_sync et run_sync.
+    """
+    return run_sync(ssh, prepare_sync(ssh, local_root, remote_root, propagate_deletes),
+                    workers=workers, progress=progress)
+
+
+def run_sync(ssh, prepared, workers=SYNC_WORKERS, progress=None):
+    """Exécute un plan calculé par prepare_sync.
+
+    Les transferts passent par `workers` canaux SFTP parallèles. Les conflits
+    ne sont jamais résolus automatiquement : ils sont rapportés et laissés tels
+    quels. `progress(done, total)` est appelé après chaque action.
+
+    Retourne le plan exécuté, complété d'une clé `errors` [(chemin, message)].
+    """
+    local_root, remote_root = prepared["local_root"], prepared["remote_root"]
+    manifest, local, remote = prepared["manifest"], prepared["local"], prepared["remote"]
+    digests = prepared["digests"]
+    plan = prepared["plan"]
+    plan["errors"] = []
+
+    new_manifest = {}
+    for rel in plan["unchanged"]:
+        old = manifest.get(rel)
+        l = local[rel]
+        new_manifest[rel] = [l[0], l[1], old[2] if old and tuple(old[:2]) == l else None]
+    for rel, _ in plan["conflicts"]:
+        if rel in manifest:
+            new_manifest[rel] = manifest[rel]
+
+    pool = SFTPChannelPool(ssh)
+
+    def to_local(rel):
+        return os.path.join(local_root, *rel.split("/"))
+
+    def to_remote(rel):
+        return posixpath.join(remote_root, rel)
+
+    def do_upload(rel):
+        sftp = pool.get()
+        src, dst = to_local(rel), to_remote(rel)
+        pool.makedirs(sftp, posixpath.dirname(dst))
+        sftp.put(src, dst)
+        st = os.stat(src)
+        sftp.utime(dst, (int(st.st_atime), int(st.st_mtime)))
+        return rel, (st.st_size, int(st.st_mtime))
+
+    def do_download(rel):
+        sftp = pool.get()
+        src, dst = to_remote(rel), to_local(rel)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        size, mtime = remote[rel]
+        part = workspace.partial_path(dst)
+        try:
+            sftp.get(src, part)
+        except Exception:
+            workspace.release(part)
+            raise
+        os.utime(part, (mtime, mtime))
+        workspace.commit_partial(part, dst)
+        return rel, (size, mtime)
+
+    def do_align(rel):
+        # Même contenu des deux côtés : la mtime locale est reportée sur le
+        # serveur pour que la comparaison rapide (taille + mtime) suffise ensuite
+        size, mtime = local[rel]
+        pool.get().utime(to_remote(rel), (mtime, mtime))
+        return rel, (size, mtime)
+
+    def do_delete_local(rel):
+        os.remove(to_local(rel))
+        return rel, None
+
+    def do_delete_remote(rel):
+        pool.get().remove(to_remote(rel))
+        return rel, None
+
+    jobs = ([(do_upload, r) for r in plan["upload"]]
+            + [(do_download, r) for r in plan["download"]]
+            + [(do_align, r) for r in plan["identical"]]
+            + [(do_delete_local, r) for r in plan["delete_local"]]
+            + [(do_delete_remote, r) for r in plan["delete_remote"]])
+    total = len(jobs)
+    transferred = []
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as ex:
+            futures = {ex.submit(fn, rel): rel for fn, rel in jobs}
+            for done, fut in enumerate(as_completed(futures), 1):
+                rel = futures[fut]
+                try:
+                    _, state = fut.result()
+                    if state is not None:
+                        new_manifest[rel] = [state[0], state[1], digests.get(rel)]
+                        if rel not in digests:
+                            transferred.append(rel)
+                except Exception as e:
+                    plan["errors"].append((rel, str(e)))
+                    if rel in manifest:
+                        new_manifest[rel] = manifest[rel]
+                if progress:
+                    progress(done, total)
+    finally:
+        pool.close()
+
+    # Empreintes des fichiers transférés (hachage local réparti sur plusieurs cœurs)
+    if transferred:
+        digests = hash_local_files(to_local(rel) for rel in transferred)
+        for rel in transferred:
+            new_manifest[rel][2] = digests.get(to_local(rel))
+
+    save_manifest(prepared["manifest_path"], new_manifest)
+    return plan
@@ -0,0 +1,153 @@
+# tuning.py
+# Réglage automatique des paramètres de transfert selon le lien.
+# Juste après la première connexion à un hôte, on mesure la latence (RTT) et le
+# débit, puis on en déduit la fenêtre SSH, la taille des paquets, la taille
+# des requêtes de lecture et la profondeur du pipeline. Le choix est mémorisé
+# par hôte dans tuning.json.
+# La mesure automatique n'a lieu qu'une fois par hôte et par processus, et
+# seulement pour les connexions interactives : CLI, envoi multi-serveurs et
+# connexions préchauffées la désactivent (cfg["auto_tune"] = False).
+import os
+import json
+import math
+import time
+import statistics
+import threading
+
+from servers import get_path
+
+TUNING_FILE = get_path("tuning.json")
+# Mesure refaite au-delà de cet âge (le lien a pu changer)
+TUNING_MAX_AGE = 30 * 24 * 3600
+
+RTT_PROBES = 7
+# Sonde de débit : lecture de /dev/zero, d'abord courte pour estimer le débit,
+# puis calibrée pour durer environ BANDWIDTH_PROBE_SECONDS.
+BANDWIDTH_FIRST_PROBE = 256 * 1024
+BANDWIDTH_MAX_PROBE = 16 * 1024 * 1024
+BANDWIDTH_PROBE_SECONDS = 1.0
+
+MIN_WINDOW = 2 * 1024 * 1024        # valeur par défaut de paramiko
+MAX_WINDOW = 64 * 1024 * 1024
+MIN_DEPTH, MAX_DEPTH = 8, 256
+# Taille de requête acceptée par tous les serveurs SFTP courants
+CHUNK_SIZE = 32 * 1024
+
+_lock = threading.Lock()
+_claimed = set()
+
+
+def host_key(cfg):
+    return "{}:{}".format(cfg.get("host"), cfg.get("port", 22))
+
+
+def claim(cfg):
+    """True la première fois seulement : un hôte n'est mesuré automatiquement
+    qu'une fois par processus (les reconnexions ne relancent pas la sonde)."""
+    key = host_key(cfg)
+    with _lock:
+        if key in _claimed:
+            return False
+        _claimed.add(key)
+        return True
+
+
+# ===================== MÉMOIRE PAR HÔTE =====================
+
+def _load_all():
+    try:
+        with open(TUNING_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def load(cfg):
+    """Réglages mémorisés pour l'hôte de `cfg`, ou None s'ils sont absents ou périmés."""
+    with _lock:
+        params = _load_all().get(host_key(cfg))
+    if not params or time.time() - params.get("measured", 0) > TUNING_MAX_AGE:
+        return None
+    return params
+
+
+def save(cfg, params):
+    with _lock:
+        data = _load_all()
+        data[host_key(cfg)] = params
+        tmp = TUNING_FILE + ".new"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, TUNING_FILE)
+
+
+# ===================== MESURE =====================
+
+def choose(rtt, bandwidth):
+    """Paramètres de transfert pour un RTT (s) et un débit (octets/s, ou None).
+
+    Le pipeline doit couvrir deux fois le produit débit × délai pour ne jamais
+    attendre une réponse ; la fenêtre SSH doit contenir tout ce qui est en vol.
+    """
+    chunk = CHUNK_SIZE
+    if bandwidth and bandwidth < 125000:
+        chunk //= 2  # lien < 1 Mbit/s : requêtes plus petites, annulation plus réactive
+    bdp = bandwidth * rtt if bandwidth else None
+    if bdp is not None:
+        depth = math.ceil(2 * bdp / chunk)
+    else:
+        depth = 64 if rtt > 0.05 else 16
+    depth = max(MIN_DEPTH, min(MAX_DEPTH, depth))
+    window = max(MIN_WINDOW, min(MAX_WINDOW, 2 * max(bdp or 0, depth * chunk)))
+    return {
+        "rtt_ms": round(rtt * 1000, 2),
+        "bandwidth_mbps": round(bandwidth * 8 / 1e6, 2) if bandwidth else None,
+        "window_size": int(window),
+        # Une réponse de lecture (chunk + en-tête SFTP) tient dans un seul paquet
+        "max_packet_size": chunk + 4096,
+        "chunk_size": chunk,
+        "pipeline_depth": depth,
+        "measured": time.time(),
+    }
+
+
+def _read_zero(sftp, nbytes, chunk):
+    """Octets/s obtenus en lisant `nbytes` de /dev/zero par requêtes parallèles."""
+    ranges = [(off, min(chunk, nbytes - off)) for off in range(0, nbytes, chunk)]
+    with sftp.open("/dev/zero", "rb") as f:
+        start = time.perf_counter()
+        total = sum(len(block) for block in f.readv(ranges))
+        elapsed = time.perf_counter() - start
+    return total / elapsed if elapsed > 0 else None
+
+
+def measure(ssh):
+    """Mesure RTT et débit sur une session SFTP dédiée à grande fenêtre.
+
+    Retourne les paramètres choisis (voir choose). Le débit vaut None si le
+    serveur ne permet pas de lire /dev/zero (Windows, chroot).
+    """
+    import paramiko
+    transport = ssh.ssh.get_transport()
+    sftp = paramiko.SFTPClient.from_transport(transport, window_size=MAX_WINDOW,
+                                              max_packet_size=CHUNK_SIZE + 4096)
+    try:
+        samples = []
+        for _ in range(RTT_PROBES):
+            start = time.perf_counter()
+            sftp.normalize(".")
+            samples.append(time.perf_counter() - start)
+        rtt = statistics.median(samples)
+
+        try:
+            bandwidth = _read_zero(sftp, BANDWIDTH_FIRST_PROBE, CHUNK_SIZE)
+            if bandwidth:
+                size = int(min(BANDWIDTH_MAX_PROBE, max(BANDWIDTH_FIRST_PROBE,
+                                                        bandwidth * BANDWIDTH_PROBE_SECONDS)))
+                bandwidth = _read_zero(sftp, size, CHUNK_SIZE)
+        except IOError:
+            bandwidth = None
+    finally:
+        sftp.close()
+    return choose(rtt, bandwidth)
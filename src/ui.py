@@ -2,10 +2,23 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import threading
+import time
 import os
+import math
+import base64
 import posixpath
-import tempfile
-from logic import SSHClient
+import cache
+import indexer
+import stats
+import profiling
+import warmup
+import diskusage
+import preview
+import archives
+import sessions
+from logic import (SSHClient, RemoteChangedError, OperationCancelled, attr_signature,
+                   transfer_between, config_from_entry, entry_display, DELTA_MIN_SIZE,
+                   RemoteTail, DirWatcher)
 
 # --- GESTION DRAG & DROP ---
 try:
@@ -14,6 +27,49 @@ try:
 except ImportError:
     HAS_DND = False
 
+# Types affichés pour les liens symboliques (voir SSHClient.resolve_links).
+# Un lien vers un dossier s'ouvre comme un dossier, mais se supprime comme un
+# fichier : on retire le lien, jamais le contenu de sa cible.
+LINK_DIR = "Lien → dossier"
+LINK_FILE = "Lien → fichier"
+LINK_BROKEN = "Lien cassé"
+DIR_TYPES = ("Dossier", LINK_DIR)
+FILE_TYPES = ("Fichier", LINK_FILE)
+
+
+class ProgressDialog(tk.Toplevel):
+    """Petite fenêtre de progression avec bouton Annuler, pour les opérations longues.
+
+    `report(done, total)` peut être appelé depuis n'importe quel thread ; le
+    thread de travail surveille `cancel` (threading.Event).
+    """
+    def __init__(self, parent, title):
+        super().__init__(parent)
+        self.title(title)
+        self.geometry("420x120")
+        self.configure(bg="#0A3D62")
+        self.transient(parent)
+        self.cancel = threading.Event()
+
+        self.label = tk.Label(self, text="Préparation...", bg="#0A3D62", fg="#A1D6E2")
+        self.label.pack(fill="x", padx=10, pady=(10, 4))
+        self.bar = ttk.Progressbar(self, orient="horizontal", mode="indeterminate")
+        self.bar.pack(fill="x", padx=10)
+        self.bar.start(15)
+        tk.Button(self, text="Annuler", bg="#8B0000", fg="white", command=self.cancel.set).pack(pady=8)
+        self.protocol("WM_DELETE_WINDOW", self.cancel.set)
+
+    def report(self, done, total):
+        self.after(0, lambda: self._update(done, total))
+
+    def _update(self, done, total):
+        if total is None:
+            self.label.configure(text=f"{done} élément(s) traité(s)...")
+            return
+        self.bar.stop()
+        self.bar.configure(mode="determinate", maximum=max(total, 1), value=done)
+        self.label.configure(text=f"{done} / {total}")
+
 class ExplorerUI(tk.Toplevel):
     def __init__(self, parent, ssh_client, start_path="/", config_callback=None):
         super().__init__(parent)
@@ -21,6 +77,7 @@ class ExplorerUI(tk.Toplevel):
         self.current = start_path or "/"
         self.config_callback = config_callback
         self.all_rows = []  # Cache pour le filtrage local
+        self.clipboard = None  # ("copy" | "cut", [chemins distants])
 
         self.title("Explorateur distant")
         self.geometry("1200x700")
@@ -32,7 +89,7 @@ class ExplorerUI(tk.Toplevel):
             self.tree.drop_target_register(DND_FILES)
             self.tree.dnd_bind('<<Drop>>', self._on_drop)
             
-        self.refresh()
+        self.refresh(cached=True)
 
     def _build_ui(self):
         # --- Barre de Navigation ---
@@ -41,6 +98,19 @@ class ExplorerUI(tk.Toplevel):
         
         tk.Button(nav, text="← Parent", bg="#0E4F95", fg="white", command=self.go_parent).pack(side="left", padx=2)
         tk.Button(nav, text="Modifier infos", bg="#0E4F95", fg="white", command=self.change_config).pack(side="right", padx=2)
+        tk.Button(nav, text="Synchroniser...", bg="#0E4F95", fg="white", command=self.sync_folder).pack(side="right", padx=2)
+        tk.Button(nav, text="Aller au fichier...", bg="#0E4F95", fg="white", command=self.go_to_file).pack(side="right", padx=2)
+        self.bind("<Control-p>", lambda e: self.go_to_file())
+        tk.Button(nav, text="Stats", bg="#0E4F95", fg="white", command=lambda: StatsWindow(self)).pack(side="right", padx=2)
+        tk.Button(nav, text="Espace disque", bg="#0E4F95", fg="white",
+                  command=lambda: UsageWindow(self, self.current)).pack(side="right", padx=2)
+        tk.Button(nav, text="Tester le lien", bg="#0E4F95", fg="white", command=self.benchmark_link).pack(side="right", padx=2)
+        self._pending_select = None  # nom à sélectionner au prochain affichage
+
+        # Envoi uniquement des fichiers modifiés (taille/mtime puis SHA-256)
+        self.only_changed = tk.BooleanVar(value=False)
+        tk.Checkbutton(nav, text="Envoyer uniquement si modifié", variable=self.only_changed,
+                       bg="#0A3D62", fg="#A1D6E2", selectcolor="#0A3D62").pack(side="right", padx=6)
 
         # --- Barre de Chemin ---
         path_frame = tk.Frame(self, bg="#0A3D62")
@@ -49,10 +119,22 @@ class ExplorerUI(tk.Toplevel):
         self.path_edit = tk.Entry(path_frame, bg="#333333", fg="#A1D6E2")
         self.path_edit.pack(side="left", fill="x", expand=True)
         self.path_edit.insert(0, self.current)
-        self.path_edit.bind("<Return>", lambda e: self.refresh())
+        self.path_edit.bind("<Return>", lambda e: self.refresh(cached=True))
         
         tk.Button(path_frame, text="Actualiser", bg="#0E4F95", fg="white", command=self.refresh).pack(side="left", padx=2)
 
+        # Surveillance du dossier courant (inotifywait ou interrogation)
+        self.watch_var = tk.BooleanVar(value=False)
+        self._watch_stop = None
+        self._watch_path = None
+        tk.Checkbutton(path_frame, text="Surveiller", variable=self.watch_var, command=self._restart_watch,
+                       bg="#0A3D62", fg="#A1D6E2", selectcolor="#0A3D62").pack(side="left", padx=4)
+
+        # Panneau d'aperçu du fichier sélectionné (voir preview.py)
+        self.preview_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(path_frame, text="Aperçu", variable=self.preview_var, command=self._toggle_preview,
+                       bg="#0A3D62", fg="#A1D6E2", selectcolor="#0A3D62").pack(side="left", padx=4)
+
         # --- Barre de Recherche (Filtre) ---
         search_frame = tk.Frame(self, bg="#0A3D62")
         search_frame.pack(fill="x", padx=5, pady=2)
@@ -67,23 +149,62 @@ class ExplorerUI(tk.Toplevel):
         style.configure("Treeview", background="#333333", foreground="#A1D6E2", fieldbackground="#333333")
         style.map("Treeview", background=[("selected", "#0E4F95")])
 
-        # --- Treeview ---
-        self.tree = ttk.Treeview(self, columns=("type", "size"), selectmode="browse")
+        # --- Treeview et panneau d'aperçu ---
+        body = tk.Frame(self, bg="#0A3D62")
+        body.pack(fill="both", expand=True)
+        self.tree = ttk.Treeview(body, columns=("type", "size"), selectmode="extended")
         self.tree.heading("#0", text="Nom")
         self.tree.heading("type", text="Type")
         self.tree.heading("size", text="Taille")
         self.tree.column("#0", width=600)
         self.tree.column("type", width=100)
         self.tree.column("size", width=100)
-        self.tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.tree.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+
+        self.preview_pane = tk.Frame(body, bg="#0A3D62", width=420)
+        self.preview_pane.pack_propagate(False)
+        self.preview_title = tk.Label(self.preview_pane, text="", bg="#0A3D62", fg="white",
+                                      anchor="w", justify="left", wraplength=400)
+        self.preview_title.pack(fill="x", pady=(5, 2))
+        self.preview_image = tk.Label(self.preview_pane, bg="#0A3D62")
+        self.preview_image.pack()
+        self.preview_text = tk.Text(self.preview_pane, bg="#333333", fg="#A1D6E2", wrap="none",
+                                    font=("Courier", 9), state="disabled")
+        self.preview_text.pack(fill="both", expand=True)
+        self._preview_photo = None   # référence gardée : Tk n'en garde pas
+        self._preview_job = None
+        self._preview_token = 0
+        self.tree.bind("<<TreeviewSelect>>", lambda e: self._schedule_preview(), add="+")
 
         self.tree.bind("<Double-1>", lambda e: self.on_double_click())
         self.tree.bind("<Button-3>", self.show_menu)
+        self.tree.bind("<Delete>", lambda e: self.delete_selection())
+        self.tree.bind("<Control-c>", lambda e: self.copy_selection())
+        self.tree.bind("<Control-x>", lambda e: self.copy_selection(cut=True))
+        self.tree.bind("<Control-v>", lambda e: self.paste())
+
+        # --- Glisser-déposer entre deux fenêtres d'explorateur ---
+        self._dragging = False
+        self.tree.bind("<B1-Motion>", self._on_drag_motion, add="+")
+        self.tree.bind("<ButtonRelease-1>", self._on_drag_release, add="+")
 
         # --- Barre de Progrès ---
         self.progress = ttk.Progressbar(self, orient="horizontal", mode="determinate")
         self.progress.pack(fill="x", side="bottom", padx=5, pady=2)
 
+        # --- Cycle de vie de la session (voir sessions.py) ---
+        self.suspended = False
+        self._resuming = False
+        self._session_lock = threading.Lock()  # ferme/rouvre la connexion dans l'ordre
+        self._base_title = None
+        self.last_activity = time.monotonic()
+        self._activity_marker = None
+        self.bind("<Button>", self._touch, add="+")
+        self.bind("<KeyPress>", self._touch, add="+")
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        sessions.register(self)
+        self.after(sessions.IDLE_CHECK_INTERVAL_MS, self._check_idle)
+
     # ===================== LOGIQUE DE FILTRE =====================
     def _filter_tree(self):
         query = self.search_var.get().lower()
@@ -95,37 +216,166 @@ class ExplorerUI(tk.Toplevel):
     # ===================== DRAG & DROP =====================
     def _on_drop(self, event):
         files = self.tk.splitlist(event.data)
+        only_changed = self.only_changed.get()  # variable Tk : lue ici, pas dans les threads
         for f in files:
-            dest_path = posixpath.join(self.current, os.path.basename(f))
-            threading.Thread(target=self._upload_worker, args=(f, dest_path), daemon=True).start()
+            dest_path = posixpath.join(self.current, os.path.basename(f.rstrip("/\\")))
+            worker = self._upload_dir_worker if os.path.isdir(f) else self._upload_worker
+            threading.Thread(target=worker, args=(f, dest_path, only_changed), daemon=True).start()
+
+    def _upload_worker(self, local_path, remote_path, only_changed=False):
+        try:
+            self.ssh.upload_from(local_path, remote_path, only_changed=only_changed)
+            self.after(0, self.refresh)
+        except Exception as e:
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Erreur Upload", msg))
 
-    def _upload_worker(self, local_path, remote_path):
+    def _upload_dir_worker(self, local_dir, remote_dir, only_changed=False):
+        def progress(done, total):
+            self.after(0, lambda: self.progress.configure(maximum=total, value=done))
         try:
-            self.ssh.upload_from(local_path, remote_path)
+            sent, skipped = self.ssh.upload_tree(local_dir, remote_dir, only_changed=only_changed,
+                                                 progress=progress)
             self.after(0, self.refresh)
+            self.after(0, lambda: messagebox.showinfo(
+                "Upload terminé", f"{sent} fichier(s) envoyé(s), {skipped} inchangé(s).", parent=self))
         except Exception as e:
-            self.after(0, lambda: messagebox.showerror("Erreur Upload", str(e)))
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Erreur Upload", msg))
+
+    def _on_drag_motion(self, event):
+        if self.tree.selection() and not self._dragging:
+            self._dragging = True
+            self.tree.configure(cursor="fleur")
+
+    def _on_drag_release(self, event):
+        if not self._dragging: return
+        self._dragging = False
+        self.tree.configure(cursor="")
+        target = self.winfo_containing(event.x_root, event.y_root)
+        if target is None: return
+        top = target.winfo_toplevel()
+        if top is self or not isinstance(top, ExplorerUI): return
+        if top.suspended:
+            # Fenêtre cible en veille : on la reconnecte, le dépôt sera à refaire
+            top.resume()
+            return
+        paths = [posixpath.join(self.current, n) for n, _ in self._selected_items()]
+        if paths:
+            top.receive_from(self, paths)
+
+    def receive_from(self, source, paths):
+        """Reçoit des éléments glissés depuis une autre fenêtre d'explorateur.
+
+        Même serveur : copie côté serveur. Autre serveur : flux direct d'une
+        connexion à l'autre, sans passer par le disque local.
+        """
+        if not messagebox.askyesno("Transfert",
+                                   f"Copier {len(paths)} élément(s) depuis « {source.title()} » vers {self.current} ?",
+                                   parent=self):
+            return
+        target_dir = self.current
+        # Deux fenêtres sur le même compte ont chacune leur connexion : on
+        # compare le serveur, pas l'objet
+        same_server = cache.server_key(source.ssh.cfg) == cache.server_key(self.ssh.cfg)
+
+        def job(progress, cancel):
+            summary = {"done": 0, "errors": []}
+            for src in paths:
+                if cancel.is_set():
+                    raise OperationCancelled("Opération annulée")
+                dst = posixpath.join(target_dir, posixpath.basename(src))
+                try:
+                    if same_server:
+                        self.ssh.copy(src, dst)
+                    else:
+                        transfer_between(source.ssh, src, self.ssh, dst, progress=progress, cancel=cancel)
+                    summary["done"] += 1
+                except OperationCancelled:
+                    raise
+                except Exception as e:
+                    summary["errors"].append((src, str(e)))
+            return summary
+        self._run_batch("Transfert entre serveurs", job)
 
     # ===================== REFRESH & POPULATE =====================
-    def refresh(self):
+    def refresh(self, cached=False):
+        """Relit le dossier courant.
+
+        Avec `cached` (navigation), le listing en cache s'affiche tout de suite
+        et n'est relu que si la mtime du dossier a changé. Sans (après une
+        opération, bouton Actualiser), le dossier est toujours relu.
+        """
+        if self.suspended:
+            self.resume()  # le dossier sera relu une fois reconnecté
+            return
         self.current = self.path_edit.get().strip() or "/"
-        threading.Thread(target=self.refresh_worker, daemon=True).start()
+        threading.Thread(target=self.refresh_worker, args=(self.current, cached), daemon=True).start()
+        if self._watch_path != self.current:
+            self._restart_watch()
 
-    def refresh_worker(self):
-        try:
-            rows = []
-            for item in self.ssh.listdir_attr(self.current):
-                typ = "Dossier" if self.ssh.is_dir_attr(item) else "Fichier"
-                size = "" if typ == "Dossier" else f"{item.st_size / 1024:.1f} KB"
-                rows.append((item.filename, typ, size))
-            
-            # Trier par type (dossiers d'abord) puis nom
-            rows.sort(key=lambda x: (x[1] != "Dossier", x[0].lower()))
-            
+    def _row_for(self, item, sizes=None):
+        """Ligne (nom, type, taille) affichée pour un SFTPAttributes.
+
+        `sizes` : tailles connues des sous-dossiers (voir diskusage.py).
+        """
+        if self.ssh.is_link_attr(item) and hasattr(item, "target_attr"):
+            target = item.target_attr
+            arrow = f"→ {item.link_target}" if item.link_target else ""
+            if target is None:
+                return (item.filename, LINK_BROKEN, arrow)
+            if self.ssh.is_dir_attr(target):
+                return (item.filename, LINK_DIR, arrow)
+            return (item.filename, LINK_FILE, f"{target.st_size / 1024:.1f} KB {arrow}".rstrip())
+        typ = "Dossier" if self.ssh.is_dir_attr(item) else "Fichier"
+        if typ == "Dossier":
+            size = diskusage.format_size(sizes[item.filename]) if sizes and item.filename in sizes else ""
+        else:
+            size = f"{item.st_size / 1024:.1f} KB"
+        return (item.filename, typ, size)
+
+    @staticmethod
+    def _row_key(row):
+        # Trier par type (dossiers d'abord) puis nom
+        return (row[1] not in DIR_TYPES, row[0].lower())
+
+    def refresh_worker(self, path=None, cached=False):
+        path = path or self.current
+        server = cache.server_key(self.ssh.cfg)
+        listings = cache.get_cache()
+        validator = None
+
+        def show(rows):
+            if path != self.current:
+                return  # l'utilisateur a déjà navigué ailleurs
             self.all_rows = rows # Mise à jour du cache
-            self.after(0, lambda: self.populate(rows))
+            self.populate(rows)
+        try:
+            # Listing en cache affiché d'abord (lecture SQLite hors du thread Tk)
+            hit = listings.get(server, path) if listings else None
+            if hit is not None:
+                usage = diskusage.cached(self.ssh, path, hit[0])
+                sizes = usage["subdirs"] if usage else None
+                rows = sorted((self._row_for(a, sizes) for a in hit[1]), key=self._row_key)
+                self.after(0, lambda: show(rows))
+                if cached:
+                    validator = hit[0]
+            dir_mtime = self.ssh.stat(path).st_mtime
+            if validator is not None and dir_mtime == validator:
+                return  # le listing en cache affiché est à jour
+            items = self.ssh.listdir_attr(path)
+            self.ssh.resolve_links(path, items)
+            if listings:
+                listings.put(server, path, dir_mtime, items)
+            indexer.note_listing(server, path, items, self.ssh.is_dir_attr)
+            usage = diskusage.cached(self.ssh, path, dir_mtime)
+            sizes = usage["subdirs"] if usage else None
+            rows = [self._row_for(item, sizes) for item in items]
+            rows.sort(key=self._row_key)
+            self.after(0, lambda: show(rows))
         except Exception as e:
-            self.after(0, lambda: messagebox.showerror("Erreur SSH", str(e), parent=self))
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Erreur SSH", msg, parent=self))
 
     def populate(self, rows):
         self.tree.delete(*self.tree.get_children())
@@ -133,27 +383,102 @@ class ExplorerUI(tk.Toplevel):
         query = self.search_var.get().lower()
         for r in rows:
             if query in r[0].lower():
-                self.tree.insert("", "end", text=r[0], values=r[1:])
+                iid = self.tree.insert("", "end", text=r[0], values=r[1:])
+                if r[0] == self._pending_select:
+                    self._pending_select = None
+                    self.tree.selection_set(iid)
+                    self.tree.see(iid)
+
+    # ===================== SURVEILLANCE DU DOSSIER =====================
+    def _restart_watch(self):
+        """(Re)lance la surveillance du dossier courant, ou l'arrête si décochée."""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+            self._watch_path = None
+        if not self.watch_var.get():
+            return
+        stop = threading.Event()
+        path = self.current
+        self._watch_stop, self._watch_path = stop, path
+        threading.Thread(target=self._watch_worker, args=(path, stop), daemon=True).start()
+
+    def _watch_worker(self, path, stop):
+        watcher = DirWatcher(self.ssh, path)
+        try:
+            watcher.run(lambda changes: self._on_watch_changes(path, changes), stop)
+        except Exception:
+            # Dossier supprimé, connexion perdue ou fenêtre fermée : on arrête sans bruit
+            if not stop.is_set():
+                self.after(0, lambda: self.watch_var.set(False))
+
+    def _on_watch_changes(self, path, changes):
+        # Thread de surveillance : on résout les nouveaux liens avant d'afficher
+        try:
+            self.ssh.resolve_links(path, changes["added"] + changes["modified"])
+        except Exception:
+            pass
+        self.after(0, lambda: self.apply_changes(path, changes))
+
+    def apply_changes(self, path, changes):
+        """Applique un diff (voir logic.diff_listings) à la vue, sans relecture complète."""
+        if path != self.current:
+            return
+        rows = {r[0]: r for r in self.all_rows}
+        for name in changes["removed"]:
+            rows.pop(name, None)
+        added = [self._row_for(a) for a in changes["added"]]
+        modified = [self._row_for(a) for a in changes["modified"]]
+        for r in added + modified:
+            rows[r[0]] = r
+        self.all_rows = sorted(rows.values(), key=self._row_key)
+
+        items = {self.tree.item(i, "text"): i for i in self.tree.get_children()}
+        for name in changes["removed"]:
+            if name in items:
+                self.tree.delete(items.pop(name))
+        for r in modified:
+            if r[0] in items:
+                self.tree.item(items[r[0]], values=r[1:])
+        query = self.search_var.get().lower()
+        visible = [r for r in self.all_rows if query in r[0].lower()]
+        position = {r[0]: i for i, r in enumerate(visible)}
+        for r in sorted(added, key=self._row_key):
+            if r[0] in position and r[0] not in items:
+                self.tree.insert("", position[r[0]], text=r[0], values=r[1:])
 
     # ===================== NAVIGATION =====================
+    def navigate(self, path, select=None):
+        """Ouvre le dossier `path` ; `select` : nom à sélectionner une fois listé."""
+        self.path_edit.delete(0, "end")
+        self.path_edit.insert(0, path)
+        self._pending_select = select
+        self.refresh(cached=True)
+
+    def go_to_file(self):
+        GoToFileDialog(self)
+
     def go_parent(self):
         if self.current != "/":
             self.current = posixpath.dirname(self.current)
             self.path_edit.delete(0, "end")
             self.path_edit.insert(0, self.current)
-            self.refresh()
+            self.refresh(cached=True)
 
     def on_double_click(self):
-        item = self.tree.selection()
-        if not item: return
+        sel = self.tree.selection()
+        if not sel: return
+        item = sel[0]
         name = self.tree.item(item, "text")
         typ = self.tree.item(item, "values")[0]
         
-        if typ == "Dossier":
+        if typ in FILE_TYPES and archives.archive_kind(name):
+            ArchiveWindow(self, posixpath.join(self.current, name))
+        elif typ in DIR_TYPES:
             self.current = posixpath.join(self.current, name)
             self.path_edit.delete(0, "end")
             self.path_edit.insert(0, self.current)
-            self.refresh()
+            self.refresh(cached=True)
         else:
             self.open_item(name)
 
@@ -161,7 +486,11 @@ class ExplorerUI(tk.Toplevel):
     def open_item(self, name):
         path = posixpath.join(self.current, name)
         try:
+            # Signature relevée à l'ouverture : sert de précondition à l'enregistrement
+            state = {"signature": attr_signature(self.ssh.stat(path))}
             data = self.ssh.open_file_readbytes(path)
+            # Copie d'origine conservée pour l'enregistrement différentiel
+            state["original"] = data
             if b"\x00" in data:
                 messagebox.showwarning("Binaire", "Fichier binaire non affichable", parent=self)
                 return
@@ -175,18 +504,38 @@ class ExplorerUI(tk.Toplevel):
             text_area.pack(fill="both", expand=True)
 
             tk.Button(dlg, text="💾 Enregistrer", bg="#0E4F95", fg="white",
-                      command=lambda: self.save_file(path, text_area.get("1.0", "end-1c"), dlg)).pack(pady=5)
+                      command=lambda: self.save_file(path, text_area.get("1.0", "end-1c"), dlg, state)).pack(pady=5)
         except Exception as e:
             messagebox.showerror("Erreur", str(e), parent=self)
 
-    def save_file(self, path, content, window):
+    def save_file(self, path, content, window, state=None):
+        data = content.encode("utf-8")
+        expected = state.get("signature") if state else None
+        base = state.get("original") if state else None
+        verified = True
         try:
-            with tempfile.NamedTemporaryFile(delete=False) as tmp:
-                tmp.write(content.encode("utf-8"))
-                tmp_path = tmp.name
-            self.ssh.upload_from(tmp_path, path)
-            os.unlink(tmp_path)
-            messagebox.showinfo("Succès", "Fichier enregistré.", parent=window)
+            try:
+                if base is not None and len(data) >= DELTA_MIN_SIZE:
+                    # Gros fichier : n'envoyer que les blocs modifiés
+                    attr, _, verified = self.ssh.write_delta(path, data, base=base, expected=expected)
+                else:
+                    attr = self.ssh.write_bytes(path, data, expected=expected)
+            except RemoteChangedError:
+                if not messagebox.askyesno("Conflit",
+                                           "Le fichier a été modifié sur le serveur depuis son ouverture.\nÉcraser quand même ?",
+                                           parent=window):
+                    return
+                attr = self.ssh.write_bytes(path, data)
+            if state is not None:
+                state["signature"] = attr_signature(attr)
+                state["original"] = data
+            if verified:
+                messagebox.showinfo("Succès", "Fichier enregistré.", parent=window)
+            else:
+                messagebox.showwarning("Enregistré sans vérification",
+                                       "Fichier enregistré, mais son contenu n'a pas pu être vérifié "
+                                       "(sha256sum indisponible sur le serveur).",
+                                       parent=window)
             self.refresh()
         except Exception as e:
             messagebox.showerror("Erreur", str(e), parent=window)
@@ -194,33 +543,194 @@ class ExplorerUI(tk.Toplevel):
     def show_menu(self, event):
         iid = self.tree.identify_row(event.y)
         if iid:
-            self.tree.selection_set(iid)
+            # Clic droit dans une sélection multiple : on la conserve
+            if iid not in self.tree.selection():
+                self.tree.selection_set(iid)
+            selected = self._selected_items()
             name = self.tree.item(iid, "text")
             typ = self.tree.item(iid, "values")[0]
             
             menu = tk.Menu(self, tearoff=0)
-            menu.add_command(label="Ouvrir", command=lambda: self.open_item(name))
-            menu.add_command(label="Renommer", command=lambda: self.rename_item(name))
-            menu.add_command(label="Supprimer", command=lambda: self.delete_item(name, typ))
-            if typ == "Fichier":
-                menu.add_command(label="Télécharger", command=lambda: self.download_item(name))
+            if len(selected) > 1:
+                menu.add_command(label=f"Supprimer ({len(selected)})", command=self.delete_selection)
+                menu.add_command(label=f"Télécharger ({len(selected)})...", command=self.download_selection)
+            else:
+                menu.add_command(label="Ouvrir", command=lambda: self.open_item(name))
+                menu.add_command(label="Renommer", command=lambda: self.rename_item(name))
+                menu.add_command(label="Supprimer", command=lambda: self.delete_item(name, typ))
+                if typ == "Dossier":
+                    menu.add_command(label="Calculer la taille", command=lambda: self.compute_size(name))
+                    menu.add_command(label="Espace disque...",
+                                     command=lambda: UsageWindow(self, posixpath.join(self.current, name)))
+                if typ in FILE_TYPES and archives.archive_kind(name):
+                    menu.add_command(label="Parcourir l'archive",
+                                     command=lambda: ArchiveWindow(self, posixpath.join(self.current, name)))
+                if typ in FILE_TYPES:
+                    menu.add_command(label="Télécharger", command=lambda: self.download_item(name))
+                    menu.add_command(label="Suivre (tail -F)", command=lambda: self.tail_item(name))
+            menu.add_command(label="Déplacer vers...", command=self.move_selection)
+            menu.add_command(label="Permissions...", command=self.chmod_selection)
+            menu.add_command(label="Copier", command=self.copy_selection)
+            menu.add_command(label="Couper", command=lambda: self.copy_selection(cut=True))
+            if self.clipboard:
+                menu.add_command(label=f"Coller ({len(self.clipboard[1])})", command=self.paste)
             
             menu.add_separator()
             menu.add_command(label="Nouveau Dossier", command=self.create_folder)
             menu.add_command(label="Nouveau Fichier", command=self.create_file)
             menu.add_command(label="Uploader...", command=self.upload)
+            menu.add_command(label="Uploader un dossier...", command=self.upload_folder)
             menu.post(event.x_root, event.y_root)
 
+    # ===================== OPÉRATIONS PAR LOT =====================
+    def _selected_items(self):
+        """[(nom, type)] des lignes sélectionnées."""
+        return [(self.tree.item(i, "text"), self.tree.item(i, "values")[0]) for i in self.tree.selection()]
+
+    def _run_batch(self, title, job):
+        """Exécute `job(progress, cancel)` en arrière-plan, puis un seul résumé et un seul refresh."""
+        dlg = ProgressDialog(self, title)
+
+        def worker():
+            try:
+                summary = job(dlg.report, dlg.cancel)
+            except OperationCancelled:
+                summary = None
+            except Exception as e:
+                summary = {"done": 0, "errors": [("", str(e))]}
+            self.after(0, dlg.destroy)
+            self.after(0, self.refresh)
+            if summary is not None:
+                self.after(0, lambda: self._show_batch_summary(title, summary))
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_batch_summary(self, title, summary):
+        lines = [f"{summary['done']} élément(s) traité(s)."]
+        if summary.get("skipped"):
+            lines.append(f"{len(summary['skipped'])} dossier(s) ignoré(s) : " + ", ".join(summary["skipped"][:10]))
+        if summary["errors"]:
+            lines.append(f"{len(summary['errors'])} erreur(s) :")
+            lines += [f"  {p} : {msg}" for p, msg in summary["errors"][:15]]
+            if len(summary["errors"]) > 15:
+                lines.append("  ...")
+            messagebox.showwarning(title, "\n".join(lines), parent=self)
+        else:
+            messagebox.showinfo(title, "\n".join(lines), parent=self)
+
+    def delete_selection(self):
+        selected = self._selected_items()
+        if not selected: return
+        if len(selected) == 1:
+            return self.delete_item(*selected[0])
+        if not messagebox.askyesno("Confirmation", f"Supprimer les {len(selected)} éléments sélectionnés (dossiers compris) ?", parent=self):
+            return
+        files = [posixpath.join(self.current, n) for n, t in selected if t != "Dossier"]
+        dirs = [posixpath.join(self.current, n) for n, t in selected if t == "Dossier"]
+        self._run_batch("Suppression", lambda progress, cancel: self.ssh.delete_many(files, dirs, progress, cancel))
+
+    def download_selection(self):
+        selected = self._selected_items()
+        if not selected: return
+        dest = filedialog.askdirectory(parent=self, title="Dossier de destination")
+        if not dest: return
+        pairs = [(posixpath.join(self.current, n), os.path.join(dest, n)) for n, t in selected if t not in DIR_TYPES]
+        skipped = [n for n, t in selected if t in DIR_TYPES]
+
+        def job(progress, cancel):
+            summary = self.ssh.download_many(pairs, progress=progress, cancel=cancel)
+            summary["skipped"] = skipped
+            return summary
+        self._run_batch("Téléchargement", job)
+
+    def move_selection(self):
+        selected = self._selected_items()
+        if not selected: return
+        dest = simpledialog.askstring("Déplacer vers", "Dossier de destination :", initialvalue=self.current, parent=self)
+        if not dest or dest.rstrip("/") == self.current.rstrip("/"): return
+        pairs = [(posixpath.join(self.current, n), posixpath.join(dest, n)) for n, _ in selected]
+        self._run_batch("Déplacement", lambda progress, cancel: self.ssh.move_many(pairs, progress, cancel))
+
+    # ===================== COPIER / COUPER / COLLER (côté serveur) =====================
+    def copy_selection(self, cut=False):
+        selected = self._selected_items()
+        if selected:
+            self.clipboard = ("cut" if cut else "copy", [posixpath.join(self.current, n) for n, _ in selected])
+
+    def paste(self):
+        if not self.clipboard: return
+        mode, sources = self.clipboard
+        target_dir = self.current
+        pairs = []
+        for src in sources:
+            name = posixpath.basename(src)
+            if mode == "copy" and posixpath.dirname(src) == target_dir:
+                # Copie dans le même dossier : "nom (copie).ext"
+                stem, ext = posixpath.splitext(name)
+                name = f"{stem} (copie){ext}"
+            dst = posixpath.join(target_dir, name)
+            if mode == "cut" and dst == src:
+                continue  # Couper-coller dans le même dossier : rien à faire
+            pairs.append((src, dst))
+
+        if mode == "cut":
+            self.clipboard = None
+            if not pairs:
+                return
+            self._run_batch("Déplacement", lambda progress, cancel: self.ssh.move_many(pairs, progress, cancel))
+            return
+
+        def job(progress, cancel):
+            summary = {"done": 0, "errors": []}
+            for i, (src, dst) in enumerate(pairs, 1):
+                if cancel.is_set():
+                    raise OperationCancelled("Opération annulée")
+                try:
+                    self.ssh.copy(src, dst)
+                    summary["done"] += 1
+                except Exception as e:
+                    summary["errors"].append((src, str(e)))
+                progress(i, len(pairs))
+            return summary
+        self._run_batch("Copie", job)
+
+    def chmod_selection(self):
+        selected = self._selected_items()
+        if not selected: return
+        mode = simpledialog.askstring("Permissions", "Mode octal (ex. 644, 755) :", parent=self)
+        if not mode: return
+        try:
+            mode = int(mode, 8)
+        except ValueError:
+            messagebox.showerror("Erreur", "Mode octal invalide.", parent=self)
+            return
+        requests = [("chmod", posixpath.join(self.current, n), mode) for n, _ in selected]
+        self._run_batch("Permissions", lambda progress, cancel: self.ssh.batch(requests, cancel=cancel))
+
     # ... [Reste des méthodes CRUD identiques à votre logique] ...
     def delete_item(self, name, typ):
+        path = posixpath.join(self.current, name)
+        if typ == "Dossier":
+            if messagebox.askyesno("Confirmation", f"Supprimer {name} et tout son contenu ?"):
+                dlg = ProgressDialog(self, f"Suppression de {name}")
+                threading.Thread(target=self._remove_tree_worker, args=(path, dlg), daemon=True).start()
+            return
         if messagebox.askyesno("Confirmation", f"Supprimer {name} ?"):
-            path = posixpath.join(self.current, name)
             try:
-                if typ == "Dossier": self.ssh.remove_dir(path)
-                else: self.ssh.remove_file(path)
+                self.ssh.remove_file(path)
                 self.refresh()
             except Exception as e: messagebox.showerror("Erreur", str(e))
 
+    def _remove_tree_worker(self, path, dlg):
+        try:
+            self.ssh.remove_tree(path, progress=dlg.report, cancel=dlg.cancel)
+        except OperationCancelled:
+            pass
+        except Exception as e:
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Erreur", msg, parent=self))
+        self.after(0, dlg.destroy)
+        self.after(0, self.refresh)
+
     def rename_item(self, name):
         new = simpledialog.askstring("Renommer", "Nouveau nom:", initialvalue=name, parent=self)
         if new:
@@ -241,26 +751,1079 @@ class ExplorerUI(tk.Toplevel):
         name = simpledialog.askstring("Nouveau fichier", "Nom:", parent=self)
         if name:
             try:
-                # Créer un fichier vide localement puis l'uploader
-                fd, path = tempfile.mkstemp()
-                os.close(fd)
-                self.ssh.upload_from(path, posixpath.join(self.current, name))
-                os.remove(path)
+                # Créer le fichier vide directement depuis la mémoire
+                self.ssh.write_bytes(posixpath.join(self.current, name), b"")
                 self.refresh()
             except Exception as e: messagebox.showerror("Erreur", str(e))
 
     def upload(self):
         f = filedialog.askopenfilename(parent=self)
-        if f: self._upload_worker(f, posixpath.join(self.current, os.path.basename(f)))
+        if f: self._upload_worker(f, posixpath.join(self.current, os.path.basename(f)), self.only_changed.get())
+
+    def upload_folder(self):
+        d = filedialog.askdirectory(parent=self)
+        if d:
+            dest = posixpath.join(self.current, os.path.basename(os.path.normpath(d)))
+            threading.Thread(target=self._upload_dir_worker, args=(d, dest, self.only_changed.get()),
+                             daemon=True).start()
+
+    def tail_item(self, name):
+        TailViewer(self, self.ssh, posixpath.join(self.current, name))
 
     def download_item(self, name):
         dest = filedialog.asksaveasfilename(initialfile=name, parent=self)
         if dest:
             threading.Thread(target=lambda: self.ssh.download_to(posixpath.join(self.current, name), dest), daemon=True).start()
 
+    # ===================== SYNCHRONISATION =====================
+    def sync_folder(self):
+        local_dir = filedialog.askdirectory(parent=self, title=f"Dossier local à synchroniser avec {self.current}")
+        if local_dir:
+            threading.Thread(target=self._sync_worker, args=(local_dir, self.current), daemon=True).start()
+
+    def _sync_worker(self, local_dir, remote_dir):
+        import sync
+        try:
+            prepared = sync.prepare_sync(self.ssh, local_dir, remote_dir)
+        except Exception as e:
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Erreur Synchronisation", msg, parent=self))
+            return
+        self.after(0, lambda: self._confirm_sync(prepared))
+
+    def _confirm_sync(self, prepared):
+        """Aperçu du plan avant toute modification ; les suppressions sont facultatives."""
+        plan = prepared["plan"]
+        local_dir, remote_dir = prepared["local_root"], prepared["remote_root"]
+        deletes = ([f"  local : {rel}" for rel in sorted(plan["delete_local"])]
+                   + [f"  serveur : {rel}" for rel in sorted(plan["delete_remote"])])
+        actions = len(plan["upload"]) + len(plan["download"]) + len(plan["identical"]) + len(deletes)
+        if not actions:
+            plan["errors"] = []
+            self._show_sync_report(local_dir, remote_dir, plan)
+            return
+        lines = [f"{local_dir}  ⇄  {remote_dir}",
+                 f"À envoyer : {len(plan['upload'])}   À recevoir : {len(plan['download'])}   "
+                 f"Conflits : {len(plan['conflicts'])}"]
+        if deletes:
+            lines.append(f"\n{len(deletes)} suppression(s) :")
+            lines += deletes[:15]
+            if len(deletes) > 15:
+                lines.append("  ...")
+            lines.append("\nOui : synchroniser avec les suppressions\n"
+                         "Non : synchroniser sans supprimer\nAnnuler : ne rien faire")
+            answer = messagebox.askyesnocancel("Synchronisation", "\n".join(lines), parent=self)
+            if answer is None:
+                return
+            if not answer:
+                plan["delete_local"], plan["delete_remote"] = [], []
+        elif not messagebox.askyesno("Synchronisation", "\n".join(lines + ["", "Lancer la synchronisation ?"]),
+                                     parent=self):
+            return
+        threading.Thread(target=self._run_sync_worker, args=(prepared,), daemon=True).start()
+
+    def _run_sync_worker(self, prepared):
+        import sync
+
+        def progress(done, total):
+            self.after(0, lambda: self.progress.configure(maximum=total, value=done))
+        try:
+            report = sync.run_sync(self.ssh, prepared, progress=progress)
+            self.after(0, lambda: self._show_sync_report(prepared["local_root"], prepared["remote_root"], report))
+            self.after(0, self.refresh)
+        except Exception as e:
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Erreur Synchronisation", msg, parent=self))
+
+    def _show_sync_report(self, local_dir, remote_dir, report):
+        dlg = tk.Toplevel(self)
+        dlg.title("Rapport de synchronisation")
+        dlg.geometry("700x450")
+        dlg.configure(bg="#0A3D62")
+
+        summary = (f"{local_dir}  ⇄  {remote_dir}\n"
+                   f"Envoyés : {len(report['upload'])}   Reçus : {len(report['download'])}   "
+                   f"Supprimés (local/serveur) : {len(report['delete_local'])}/{len(report['delete_remote'])}   "
+                   f"Inchangés : {len(report['unchanged']) + len(report['identical'])}")
+        tk.Label(dlg, text=summary, bg="#0A3D62", fg="#A1D6E2", justify="left", anchor="w").pack(fill="x", padx=8, pady=6)
+
+        text = tk.Text(dlg, bg="#333333", fg="#A1D6E2")
+        text.pack(fill="both", expand=True, padx=8, pady=(0, 8))
+        if report["conflicts"]:
+            text.insert("end", f"--- Conflits ({len(report['conflicts'])}) — non modifiés ---\n")
+            for rel, reason in sorted(report["conflicts"]):
+                text.insert("end", f"{rel} : {reason}\n")
+        if report["errors"]:
+            text.insert("end", f"\n--- Erreurs ({len(report['errors'])}) ---\n")
+            for rel, msg in sorted(report["errors"]):
+                text.insert("end", f"{rel} : {msg}\n")
+        if not report["conflicts"] and not report["errors"]:
+            text.insert("end", "Aucun conflit.")
+        text.configure(state="disabled")
+
+    # ===================== CYCLE DE VIE =====================
+    def _touch(self, event=None):
+        self.last_activity = time.monotonic()
+        if self.suspended:
+            self.resume()
+
+    def _check_idle(self):
+        """Timer Tk : ferme la connexion après sessions.idle_timeout() sans activité."""
+        if not self.winfo_exists():
+            return
+        self.after(sessions.IDLE_CHECK_INTERVAL_MS, self._check_idle)
+        if self.suspended:
+            return
+        # Une requête SFTP ou un canal ouvert depuis la dernière vérification
+        # (opération lancée en arrière-plan) compte comme de l'activité
+        info = self.ssh.session_info()
+        marker = (info.get("requests"), info.get("channels"))
+        if marker != self._activity_marker:
+            self._activity_marker = marker
+            self.last_activity = time.monotonic()
+            return
+        timeout = sessions.idle_timeout()
+        if timeout and time.monotonic() - self.last_activity >= timeout and not self.ssh.is_busy():
+            self.suspend()
+
+    def _close_session(self):
+        ssh, lock = self.ssh, self._session_lock
+
+        def worker():
+            with lock:
+                ssh.close()
+        threading.Thread(target=worker, daemon=True).start()
+
+    def suspend(self):
+        """Ferme la connexion d'une fenêtre inactive et libère son listing."""
+        if self.suspended:
+            return
+        self.suspended = True
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = self._watch_path = None
+        self.all_rows = []
+        self.tree.delete(*self.tree.get_children())
+        self._base_title = self.title()
+        self.title(f"{self._base_title} — en veille (cliquer pour reconnecter)")
+        self._close_session()
+
+    def resume(self):
+        """Rouvre la connexion d'une fenêtre en veille, puis relit le dossier courant."""
+        if not self.suspended or self._resuming:
+            return
+        self._resuming = True
+        self.title(f"{self._base_title} — reconnexion...")
+        ssh, lock = self.ssh, self._session_lock
+
+        def worker():
+            try:
+                with lock:
+                    ssh.connect()
+            except Exception as e:
+                self.after(0, lambda err=e: self._resume_failed(err))
+                return
+            self.after(0, self._resumed)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _resumed(self):
+        self.suspended = self._resuming = False
+        self.title(self._base_title)
+        self.last_activity = time.monotonic()
+        self._activity_marker = None
+        self.refresh(cached=True)
+
+    def _resume_failed(self, error):
+        self._resuming = False
+        self.title(f"{self._base_title} — en veille (cliquer pour reconnecter)")
+        messagebox.showerror("Reconnexion", str(error), parent=self)
+
+    def close(self):
+        """Ferme la fenêtre et sa session SSH."""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+        sessions.unregister(self)
+        self._close_session()
+        self.destroy()
+
+    # ===================== APERÇU =====================
+    def _toggle_preview(self):
+        if self.preview_var.get():
+            self.preview_pane.pack(side="right", fill="y", padx=5, pady=5)
+            self._schedule_preview()
+        else:
+            self.preview_pane.pack_forget()
+
+    def _schedule_preview(self):
+        # Parcours rapide au clavier : seul le dernier élément sélectionné est lu
+        if self._preview_job is not None:
+            self.after_cancel(self._preview_job)
+        self._preview_job = self.after(150, self._update_preview) if self.preview_var.get() else None
+
+    def _update_preview(self):
+        self._preview_job = None
+        self._preview_token += 1
+        token = self._preview_token
+        selected = self._selected_items()
+        if len(selected) != 1 or selected[0][1] not in FILE_TYPES:
+            self._show_preview(None)
+            return
+        path = posixpath.join(self.current, selected[0][0])
+        self.preview_title.config(text="Chargement...")
+        server = cache.server_key(self.ssh.cfg)
+
+        def worker():
+            try:
+                result = preview.get_preview(self.ssh, server, path, self.ssh.stat(path))
+            except Exception as e:
+                result = {"kind": "info", "title": f"Aperçu impossible : {e}", "text": ""}
+            self.after(0, lambda: self._show_preview(result) if token == self._preview_token else None)
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _show_preview(self, result):
+        self._preview_photo = None
+        self.preview_image.config(image="")
+        self.preview_text.config(state="normal")
+        self.preview_text.delete("1.0", "end")
+        if result is None:
+            self.preview_title.config(text="")
+            self.preview_text.config(state="disabled")
+            return
+        self.preview_title.config(text=result["title"])
+        if result["kind"] == "image":
+            try:
+                photo = tk.PhotoImage(data=base64.b64encode(result["image"]))
+                # Sans Pillow, l'image est stockée en taille réelle : réduction par Tk
+                largest = max(result.get("width", 0), result.get("height", 0))
+                factor = math.ceil(largest / preview.THUMBNAIL_SIZE) if largest else 1
+                self._preview_photo = photo.subsample(factor) if factor > 1 else photo
+                self.preview_image.config(image=self._preview_photo)
+            except tk.TclError as e:
+                self.preview_title.config(text=f"{result['title']} (affichage impossible : {e})")
+        else:
+            self.preview_text.insert("1.0", result.get("text", ""))
+        self.preview_text.config(state="disabled")
+
+    # ===================== TAILLE DES DOSSIERS =====================
+    def compute_size(self, name):
+        """Calcule la taille d'un dossier et l'affiche dans sa ligne, au fil du calcul."""
+        folder = self.current
+        path = posixpath.join(folder, name)
+        partial = {}
+
+        def show(text):
+            if self.current != folder:
+                return
+            for iid in self.tree.get_children():
+                if self.tree.item(iid, "text") == name:
+                    self.tree.set(iid, "size", text)
+            self.all_rows = [(n, t, text) if n == name else (n, t, s) for n, t, s in self.all_rows]
+
+        def on_subdir(sub, size):
+            partial[sub] = size
+            text = f"≥ {diskusage.format_size(sum(partial.values()))}..."
+            self.after(0, lambda: show(text))
+
+        def worker():
+            try:
+                usage = diskusage.cached(self.ssh, path) or diskusage.compute(self.ssh, path, on_subdir)
+            except Exception as e:
+                msg = str(e)
+                self.after(0, lambda: show(""))
+                self.after(0, lambda: messagebox.showerror("Taille", msg, parent=self))
+                return
+            self.after(0, lambda: show(diskusage.format_size(usage["total"])))
+        show("Calcul...")
+        threading.Thread(target=worker, daemon=True).start()
+
+    # ===================== RÉGLAGE DU LIEN =====================
+    def benchmark_link(self):
+        """Mesure RTT et débit, applique les réglages choisis et les affiche."""
+        def worker():
+            try:
+                p = self.ssh.measure_link()
+            except Exception as e:
+                msg = str(e)
+                self.after(0, lambda: messagebox.showerror("Test du lien", msg, parent=self))
+                return
+            bandwidth = f"{p['bandwidth_mbps']} Mbit/s" if p["bandwidth_mbps"] else "non mesurable (/dev/zero illisible)"
+            text = (f"Latence (RTT) : {p['rtt_ms']} ms\n"
+                    f"Débit : {bandwidth}\n\n"
+                    f"Fenêtre SSH : {p['window_size'] // 1024} Ko\n"
+                    f"Taille de paquet : {p['max_packet_size']} octets\n"
+                    f"Taille des requêtes : {p['chunk_size'] // 1024} Ko\n"
+                    f"Requêtes en parallèle : {p['pipeline_depth']}\n\n"
+                    "Réglages mémorisés pour cet hôte.")
+            self.after(0, lambda: messagebox.showinfo("Test du lien", text, parent=self))
+        threading.Thread(target=worker, daemon=True).start()
+
     def change_config(self):
         if self.config_callback: self.config_callback()
 
+# =================================================================
+# ALLER AU FICHIER
+# =================================================================
+
+class GoToFileDialog(tk.Toplevel):
+    """Recherche approximative dans l'index local des chemins du serveur."""
+    # Parcours en cours par serveur : ils survivent à la fermeture du dialogue
+    _crawls = {}
+
+    def __init__(self, explorer):
+        super().__init__(explorer)
+        self.explorer = explorer
+        self.server = cache.server_key(explorer.ssh.cfg)
+        self.index = None
+        self._pending = None
+
+        self.title("Aller au fichier")
+        self.geometry("700x450")
+        self.configure(bg="#0A3D62")
+        self.transient(explorer)
+
+        self.query = tk.StringVar()
+        entry = tk.Entry(self, textvariable=self.query, bg="#333333", fg="white", insertbackground="white")
+        entry.pack(fill="x", padx=8, pady=8)
+        entry.focus_set()
+        self.query.trace_add("write", lambda *a: self._schedule())
+        entry.bind("<Return>", lambda e: self.go())
+        entry.bind("<Down>", lambda e: self._move(1))
+        entry.bind("<Up>", lambda e: self._move(-1))
+
+        self.results = tk.Listbox(self, bg="#333333", fg="#A1D6E2", selectbackground="#0E4F95")
+        self.results.pack(fill="both", expand=True, padx=8)
+        self.results.bind("<Double-1>", lambda e: self.go())
+
+        bottom = tk.Frame(self, bg="#0A3D62")
+        bottom.pack(fill="x", padx=8, pady=6)
+        self.status = tk.Label(bottom, text="Chargement de l'index...", bg="#0A3D62", fg="#A1D6E2", anchor="w")
+        self.status.pack(side="left", fill="x", expand=True)
+        tk.Button(bottom, text="Indexer le serveur", bg="#0E4F95", fg="white",
+                  command=self.build).pack(side="right")
+
+        self.bind("<Escape>", lambda e: self.close())
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        threading.Thread(target=self._load_worker, daemon=True).start()
+
+    def _load_worker(self):
+        index = indexer.get_index(self.server)
+        self.after(0, lambda: self._set_index(index))
+
+    def _set_index(self, index):
+        if not self.winfo_exists():
+            return
+        self.index = index
+        if index is None:
+            self.status.configure(text="Aucun index pour ce serveur : cliquez sur « Indexer le serveur ».")
+        else:
+            self.status.configure(text=f"{len(index)} chemins indexés.")
+            self.search()
+        if self.server in self._crawls:
+            self.status.configure(text="Indexation en cours en arrière-plan...")
+
+    def build(self):
+        if self.server in self._crawls:
+            self.status.configure(text="Indexation déjà en cours en arrière-plan...")
+            return
+        root = simpledialog.askstring("Indexer", "Dossier à indexer :", initialvalue="/", parent=self)
+        if not root: return
+        self.status.configure(text="Indexation en cours (priorité basse)...")
+        # Le parcours continue si le dialogue est fermé ; son Event ne sert
+        # qu'au ralentissement entre dossiers (voir indexer.crawl)
+        server, ssh, crawls = self.server, self.explorer.ssh, self._crawls
+        crawls[server] = threading.Event()
+
+        def report(text):
+            self.after(0, lambda: self.status.configure(text=text) if self.winfo_exists() else None)
+
+        def progress(n):
+            report(f"Indexation : {n} chemins...")
+
+        def worker():
+            try:
+                index = indexer.build_index(ssh, server, root, progress=progress, cancel=crawls[server])
+                crawls.pop(server, None)
+                self.after(0, lambda: self._set_index(index))
+            except Exception as e:
+                crawls.pop(server, None)
+                if not isinstance(e, OperationCancelled):
+                    report(f"Échec de l'indexation : {e}")
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _schedule(self):
+        # Regroupe les frappes rapprochées en une seule recherche
+        if self._pending is not None:
+            self.after_cancel(self._pending)
+        self._pending = self.after(80, self.search)
+
+    def search(self):
+        self._pending = None
+        if self.index is None:
+            return
+        start = time.perf_counter()
+        found = self.index.search(self.query.get(), limit=200)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.results.delete(0, "end")
+        for p in found:
+            self.results.insert("end", p)
+        if found:
+            self.results.selection_set(0)
+        self.status.configure(text=f"{len(found)} résultat(s) sur {len(self.index)} chemins ({elapsed:.1f} ms)")
+
+    def _move(self, step):
+        sel = self.results.curselection()
+        i = max(0, min(self.results.size() - 1, (sel[0] if sel else -1) + step))
+        self.results.selection_clear(0, "end")
+        self.results.selection_set(i)
+        self.results.see(i)
+
+    def go(self):
+        sel = self.results.curselection()
+        if not sel: return
+        path = self.results.get(sel[0])
+        if path.endswith("/"):
+            self.explorer.navigate(path.rstrip("/") or "/")
+        else:
+            folder, name = posixpath.split(path)
+            self.explorer.navigate(folder or "/", select=name)
+        self.close()
+
+    def close(self):
+        threading.Thread(target=indexer.save_dirty, daemon=True).start()
+        self.destroy()
+
+# =================================================================
+# STATISTIQUES DE PERFORMANCE
+# =================================================================
+
+class StatsWindow(tk.Toplevel):
+    """Histogrammes des temps d'opération (voir stats.py), rafraîchis chaque seconde."""
+    COLUMNS = (("count", "Appels", "{:d}"), ("errors", "Erreurs", "{:d}"), ("p50_ms", "p50 (ms)", "{:.1f}"),
+               ("p95_ms", "p95 (ms)", "{:.1f}"), ("p99_ms", "p99 (ms)", "{:.1f}"),
+               ("max_ms", "max (ms)", "{:.1f}"), ("bytes", "Octets", "{:d}"))
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Statistiques de performance")
+        self.geometry("900x450")
+        self.configure(bg="#0A3D62")
+
+        bar = tk.Frame(self, bg="#0A3D62")
+        bar.pack(fill="x", padx=5, pady=5)
+        self.enabled = tk.BooleanVar(value=stats.is_enabled())
+        tk.Checkbutton(bar, text="Mesure activée", variable=self.enabled, command=self._toggle,
+                       bg="#0A3D62", fg="#A1D6E2", selectcolor="#0A3D62").pack(side="left")
+        tk.Button(bar, text="Réinitialiser", bg="#0E4F95", fg="white", command=stats.reset).pack(side="left", padx=4)
+        tk.Button(bar, text="Exporter JSON...", bg="#0E4F95", fg="white", command=self.export).pack(side="left", padx=4)
+        self.profiling = tk.BooleanVar(value=profiling.is_running())
+        tk.Checkbutton(bar, text="Profilage (journal des opérations lentes)", variable=self.profiling,
+                       command=self._toggle_profiling,
+                       bg="#0A3D62", fg="#A1D6E2", selectcolor="#0A3D62").pack(side="right")
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in self.COLUMNS])
+        self.tree.heading("#0", text="Opération")
+        self.tree.column("#0", width=260)
+        for key, label, _ in self.COLUMNS:
+            self.tree.heading(key, text=label)
+            self.tree.column(key, width=85, anchor="e")
+        self.tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self._tick()
+
+    def _toggle(self):
+        stats.enable() if self.enabled.get() else stats.disable()
+
+    def _toggle_profiling(self):
+        if self.profiling.get():
+            profiling.start()
+            self.enabled.set(True)
+            return
+        path = profiling.stop()
+        if path:
+            messagebox.showinfo("Profilage", f"Profil : {path}\nJournal : {profiling.SLOW_LOG_FILE}", parent=self)
+
+    def _tick(self):
+        if not self.winfo_exists():
+            return
+        self.tree.delete(*self.tree.get_children())
+        for name, s in stats.snapshot().items():
+            self.tree.insert("", "end", text=name, values=[fmt.format(s[k]) for k, _, fmt in self.COLUMNS])
+        self.after(1000, self._tick)
+
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self, defaultextension=".json",
+                                            initialfile="stats.json", filetypes=[("JSON", "*.json")])
+        if path:
+            stats.dump_json(path)
+
+# =================================================================
+# ESPACE DISQUE
+# =================================================================
+
+class UsageWindow(tk.Toplevel):
+    """Répartition de l'espace d'un dossier par sous-dossier (voir diskusage.py).
+
+    Un résultat en cache encore valide s'affiche tout de suite ; sinon les
+    sous-dossiers apparaissent au fur et à mesure que leur parcours se termine.
+    Double-clic : descendre dans un sous-dossier.
+    """
+    BAR_WIDTH = 30
+
+    def __init__(self, explorer, path):
+        super().__init__(explorer)
+        self.explorer = explorer
+        self.ssh = explorer.ssh
+        self.geometry("700x500")
+        self.configure(bg="#0A3D62")
+        self.cancel = None
+
+        bar = tk.Frame(self, bg="#0A3D62")
+        bar.pack(fill="x", padx=5, pady=5)
+        tk.Button(bar, text="← Parent", bg="#0E4F95", fg="white", command=self.go_parent).pack(side="left", padx=2)
+        tk.Button(bar, text="Recalculer", bg="#0E4F95", fg="white",
+                  command=lambda: self.load(self.path, force=True)).pack(side="left", padx=2)
+        tk.Button(bar, text="Ouvrir dans l'explorateur", bg="#0E4F95", fg="white",
+                  command=lambda: explorer.navigate(self.path)).pack(side="left", padx=2)
+        self.status = tk.Label(self, text="", bg="#0A3D62", fg="#A1D6E2", anchor="w")
+        self.status.pack(fill="x", padx=5)
+
+        self.tree = ttk.Treeview(self, columns=("Taille", "Part", "Barre"))
+        self.tree.heading("#0", text="Nom")
+        self.tree.heading("Taille", text="Taille")
+        self.tree.heading("Part", text="%")
+        self.tree.heading("Barre", text="")
+        self.tree.column("#0", width=250)
+        self.tree.column("Taille", width=100, anchor="e")
+        self.tree.column("Part", width=60, anchor="e")
+        self.tree.column("Barre", width=230)
+        self.tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.tree.bind("<Double-1>", lambda e: self.open_selected())
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.load(path)
+
+    def load(self, path, force=False):
+        if self.cancel is not None:
+            self.cancel.set()
+        self.path = posixpath.normpath(path)
+        self.title(f"Espace disque : {self.path}")
+        self.status.config(text="Calcul en cours...")
+        self.subdirs = {}
+        self.total = None
+        self.render()
+        cancel = self.cancel = threading.Event()
+        threading.Thread(target=self._worker, args=(self.path, force, cancel), daemon=True).start()
+
+    def _worker(self, path, force, cancel):
+        def on_subdir(name, size):
+            self.after(0, lambda: self._partial(path, name, size))
+        try:
+            usage = None if force else diskusage.cached(self.ssh, path)
+            if usage is None:
+                usage = diskusage.compute(self.ssh, path, on_subdir, cancel)
+        except OperationCancelled:
+            return
+        except Exception as e:
+            msg = str(e)
+            self.after(0, lambda: self.status.config(text=f"Erreur : {msg}") if self.winfo_exists() else None)
+            return
+        self.after(0, lambda: self._done(path, usage))
+
+    def _partial(self, path, name, size):
+        if not self.winfo_exists() or path != self.path:
+            return
+        self.subdirs[name] = size
+        self.status.config(text=f"Calcul en cours... {len(self.subdirs)} sous-dossier(s) terminé(s)")
+        self.render()
+
+    def _done(self, path, usage):
+        if not self.winfo_exists() or path != self.path:
+            return
+        self.subdirs = dict(usage["subdirs"])
+        self.total = usage["total"]
+        when = time.strftime("%d/%m/%Y %H:%M", time.localtime(usage["computed"]))
+        method = "du" if usage["method"] == "du" else "parcours SFTP (taille apparente)"
+        self.status.config(text=f"Total : {diskusage.format_size(self.total)} — calculé le {when} via {method}")
+        self.render()
+
+    def render(self):
+        self.tree.delete(*self.tree.get_children())
+        rows = sorted(self.subdirs.items(), key=lambda x: -x[1])
+        if self.total is not None:
+            # Ce qui n'est dans aucun sous-dossier : fichiers posés directement ici
+            rows.append(("(fichiers de ce dossier)", max(0, self.total - sum(self.subdirs.values()))))
+        reference = self.total or max(self.subdirs.values(), default=0) or 1
+        for name, size in rows:
+            share = size / reference
+            self.tree.insert("", "end", text=name, values=(diskusage.format_size(size), f"{share:.0%}",
+                                                           "█" * round(share * self.BAR_WIDTH)))
+
+    def open_selected(self):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        name = self.tree.item(sel[0], "text")
+        if name in self.subdirs:
+            self.load(posixpath.join(self.path, name))
+
+    def go_parent(self):
+        if self.path != "/":
+            self.load(posixpath.dirname(self.path))
+
+    def close(self):
+        if self.cancel is not None:
+            self.cancel.set()
+        self.destroy()
+
+# =================================================================
+# ARCHIVES DISTANTES
+# =================================================================
+
+class ArchiveWindow(tk.Toplevel):
+    """Contenu d'une archive distante présenté comme un dossier (voir archives.py).
+
+    Double-clic : entrer dans un dossier, ou extraire un fichier. Seuls les
+    octets des membres extraits transitent sur le réseau.
+    """
+    def __init__(self, explorer, path):
+        super().__init__(explorer)
+        self.ssh = explorer.ssh
+        self.path = path
+        self.folder = ""
+        self.tree_data = None
+        self.title(f"Archive : {path}")
+        self.geometry("800x500")
+        self.configure(bg="#0A3D62")
+
+        bar = tk.Frame(self, bg="#0A3D62")
+        bar.pack(fill="x", padx=5, pady=5)
+        tk.Button(bar, text="← Parent", bg="#0E4F95", fg="white", command=self.go_parent).pack(side="left", padx=2)
+        tk.Button(bar, text="Extraire...", bg="#0E4F95", fg="white", command=self.extract_selection).pack(side="left", padx=2)
+        self.status = tk.Label(bar, text="Lecture de l'archive...", bg="#0A3D62", fg="#A1D6E2", anchor="w")
+        self.status.pack(side="left", fill="x", expand=True, padx=6)
+
+        self.tree = ttk.Treeview(self, columns=("type", "size"), selectmode="extended")
+        self.tree.heading("#0", text="Nom")
+        self.tree.heading("type", text="Type")
+        self.tree.heading("size", text="Taille")
+        self.tree.column("#0", width=500)
+        self.tree.column("type", width=100)
+        self.tree.column("size", width=100)
+        self.tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.tree.bind("<Double-1>", lambda e: self.on_double_click())
+        threading.Thread(target=self._load, daemon=True).start()
+
+    def _load(self):
+        try:
+            self.archive = archives.open_archive(self.ssh, self.path)
+            members = self.archive.members()
+            tree_data = archives.build_tree(members)
+        except Exception as e:
+            msg = f"Erreur : {e}"
+            self.after(0, lambda: self.status.config(text=msg) if self.winfo_exists() else None)
+            return
+
+        def show():
+            self.tree_data = tree_data
+            files = [m for m in members if not m.is_dir]
+            total = sum(m.size or 0 for m in files)
+            self.status.config(text=f"{len(files)} fichier(s), {diskusage.format_size(total)} décompressés")
+            self.populate()
+        self.after(0, show)
+
+    def populate(self):
+        self.tree.delete(*self.tree.get_children())
+        entries = self.tree_data.get(self.folder, {})
+        rows = []
+        for name, member in entries.items():
+            if member is None:
+                rows.append((name, "Dossier", ""))
+            else:
+                size = diskusage.format_size(member.size) if member.size is not None else ""
+                rows.append((name, "Fichier", size))
+        for r in sorted(rows, key=ExplorerUI._row_key):
+            self.tree.insert("", "end", text=r[0], values=r[1:])
+
+    def go_parent(self):
+        if self.folder:
+            self.folder = posixpath.dirname(self.folder)
+            self.populate()
+
+    def on_double_click(self):
+        sel = self.tree.selection()
+        if not sel or self.tree_data is None:
+            return
+        name = self.tree.item(sel[0], "text")
+        if self.tree.item(sel[0], "values")[0] == "Dossier":
+            self.folder = posixpath.join(self.folder, name) if self.folder else name
+            self.populate()
+        else:
+            self.extract_selection()
+
+    def _selected_members(self):
+        """Membres sélectionnés, dossiers développés en leurs fichiers : [(chemin relatif, Member)]."""
+        out = []
+
+        def collect(folder, name, rel):
+            member = self.tree_data.get(folder, {}).get(name)
+            if member is not None:
+                out.append((rel, member))
+                return
+            sub = posixpath.join(folder, name) if folder else name
+            for child in self.tree_data.get(sub, {}):
+                collect(sub, child, posixpath.join(rel, child))
+        for iid in self.tree.selection():
+            name = self.tree.item(iid, "text")
+            collect(self.folder, name, name)
+        return out
+
+    def extract_selection(self):
+        if self.tree_data is None:
+            return
+        selected = self._selected_members()
+        if not selected:
+            return
+        if len(selected) == 1 and "/" not in selected[0][0]:
+            dest = filedialog.asksaveasfilename(initialfile=selected[0][0], parent=self)
+            if not dest:
+                return
+            targets = [(dest, selected[0][1])]
+        else:
+            dest = filedialog.askdirectory(parent=self, title="Dossier de destination")
+            if not dest:
+                return
+            # Les noms viennent de build_tree (sans ".."), on vérifie quand même
+            # que rien ne sort du dossier choisi (liens, lecteurs Windows...)
+            root = os.path.realpath(dest)
+            targets = []
+            for rel, m in selected:
+                local = os.path.realpath(os.path.join(root, *rel.split("/")))
+                if not local.startswith(os.path.join(root, "")):
+                    messagebox.showerror("Extraction", f"{m.name} : chemin hors du dossier de destination.",
+                                         parent=self)
+                    return
+                targets.append((local, m))
+            existing = [t for t in targets if os.path.exists(t[0])]
+            if existing:
+                answer = messagebox.askyesnocancel(
+                    "Extraction",
+                    f"{len(existing)} fichier(s) existent déjà dans {dest}.\n"
+                    "Oui : les remplacer — Non : les ignorer",
+                    parent=self)
+                if answer is None:
+                    return
+                if not answer:
+                    targets = [t for t in targets if t not in existing]
+                    if not targets:
+                        return
+        dlg = ProgressDialog(self, "Extraction")
+        threading.Thread(target=self._extract_worker, args=(targets, dlg), daemon=True).start()
+
+    def _extract_worker(self, targets, dlg):
+        total = sum(m.size or 0 for _, m in targets) or None
+        base = 0
+        errors = []
+        for local, member in targets:
+            try:
+                os.makedirs(os.path.dirname(local) or ".", exist_ok=True)
+                with open(local, "wb") as out:
+                    self.archive.extract(member, out, cancel=dlg.cancel,
+                                         progress=lambda done, size, b=base: dlg.report(b + done, total))
+            except Exception as e:
+                # Pas de fichier à moitié extrait
+                try:
+                    os.remove(local)
+                except OSError:
+                    pass
+                if isinstance(e, OperationCancelled):
+                    break
+                errors.append(f"{member.name} : {e}")
+            base += member.size or 0
+
+        def finish():
+            dlg.destroy()
+            if errors:
+                messagebox.showwarning("Extraction", "\n".join(errors[:15]), parent=self)
+        self.after(0, finish)
+
+# =================================================================
+# SUIVI DE FICHIER (TAIL)
+# =================================================================
+
+class TailViewer(tk.Toplevel):
+    """Affiche un fichier distant en continu (équivalent de `tail -F`).
+
+    Le texte est un tampon circulaire : au-delà de TAIL_MAX_LINES lignes, les
+    plus anciennes sont supprimées, la mémoire reste stable sur des heures.
+    """
+    TAIL_MAX_LINES = 5000
+
+    def __init__(self, parent, ssh, path):
+        super().__init__(parent)
+        self.title(f"Suivi : {posixpath.basename(path)}")
+        self.geometry("900x600")
+        self.configure(bg="#0A3D62")
+        self.stop = threading.Event()
+
+        bar = tk.Frame(self, bg="#0A3D62")
+        bar.pack(fill="x", padx=5, pady=5)
+        self.autoscroll = tk.BooleanVar(value=True)
+        tk.Checkbutton(bar, text="Défilement automatique", variable=self.autoscroll,
+                       bg="#0A3D62", fg="#A1D6E2", selectcolor="#0A3D62").pack(side="left")
+        tk.Button(bar, text="Effacer", bg="#0E4F95", fg="white",
+                  command=lambda: self.text.delete("1.0", "end")).pack(side="left", padx=6)
+        self.status = tk.Label(bar, text=path, bg="#0A3D62", fg="#A1D6E2", anchor="e")
+        self.status.pack(side="right", fill="x", expand=True)
+
+        self.text = tk.Text(self, bg="#333333", fg="#A1D6E2", insertbackground="white", wrap="none")
+        scroll = ttk.Scrollbar(self, orient="vertical", command=self.text.yview)
+        self.text.configure(yscrollcommand=scroll.set)
+        scroll.pack(side="right", fill="y")
+        self.text.pack(fill="both", expand=True)
+
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        threading.Thread(target=self._worker, args=(ssh, path), daemon=True).start()
+
+    def _worker(self, ssh, path):
+        try:
+            tail = RemoteTail(ssh, path)
+        except Exception as e:
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Erreur", msg, parent=self))
+            return
+        try:
+            tail.follow(lambda text, event: self.after(0, lambda: self._append(text, event)), self.stop)
+        except Exception as e:
+            if not self.stop.is_set():
+                msg = f"Arrêté : {e}"
+                self.after(0, lambda: self.status.configure(text=msg))
+
+    def _append(self, text, event):
+        if self.stop.is_set():
+            return
+        messages = {"truncated": "--- fichier tronqué ---\n", "rotated": "--- nouveau fichier (rotation) ---\n"}
+        if event == "missing":
+            self.status.configure(text="Fichier absent, en attente...")
+            return
+        self.status.configure(text=time.strftime("Mis à jour à %H:%M:%S"))
+        at_end = self.text.yview()[1] >= 0.999
+        if event in messages:
+            self.text.insert("end", messages[event])
+        self.text.insert("end", text)
+        lines = int(self.text.index("end-1c").split(".")[0])
+        if lines > self.TAIL_MAX_LINES:
+            self.text.delete("1.0", f"{lines - self.TAIL_MAX_LINES + 1}.0")
+        if self.autoscroll.get() and at_end:
+            self.text.see("end")
+
+    def close(self):
+        self.stop.set()
+        self.destroy()
+
+# =================================================================
+# DÉPLOIEMENT MULTI-SERVEURS
+# =================================================================
+
+class FanOutDialog(tk.Toplevel):
+    """Envoie un fichier local vers plusieurs serveurs enregistrés en parallèle."""
+    def __init__(self, parent, entries):
+        super().__init__(parent)
+        import fanout
+        self.fanout = fanout
+        self.entries = list({fanout.entry_key(e): e for e in entries}.values())
+        self.data = None
+        self.local_name = ""
+        self.rows = {}  # utilisateur@hôte:port -> iid du tableau d'état
+
+        self.title("Déployer un fichier sur plusieurs serveurs")
+        self.geometry("760x520")
+        self.configure(bg="#0A3D62")
+
+        top = tk.Frame(self, bg="#0A3D62")
+        top.pack(fill="x", padx=8, pady=6)
+        tk.Button(top, text="Fichier local...", bg="#0E4F95", fg="white", command=self.pick_file).pack(side="left")
+        self.file_label = tk.Label(top, text="(aucun)", bg="#0A3D62", fg="#A1D6E2")
+        self.file_label.pack(side="left", padx=6)
+
+        opts = tk.Frame(self, bg="#0A3D62")
+        opts.pack(fill="x", padx=8)
+        tk.Label(opts, text="Chemin distant (vide = dossier de départ) :", bg="#0A3D62", fg="#A1D6E2").pack(side="left")
+        self.remote_var = tk.StringVar()
+        tk.Entry(opts, textvariable=self.remote_var, bg="#333333", fg="#A1D6E2").pack(side="left", fill="x", expand=True, padx=4)
+        tk.Label(opts, text="En parallèle :", bg="#0A3D62", fg="#A1D6E2").pack(side="left")
+        self.parallel_var = tk.IntVar(value=fanout.FANOUT_PARALLEL)
+        tk.Spinbox(opts, from_=1, to=64, width=4, textvariable=self.parallel_var).pack(side="left", padx=4)
+
+        self.status = ttk.Treeview(self, columns=("state", "detail"), selectmode="extended")
+        self.status.heading("#0", text="Serveur")
+        self.status.heading("state", text="État")
+        self.status.heading("detail", text="Détail")
+        self.status.column("#0", width=220)
+        self.status.column("state", width=90)
+        self.status.column("detail", width=400)
+        self.status.pack(fill="both", expand=True, padx=8, pady=6)
+        for e in self.entries:
+            name = self.fanout.entry_key(e)
+            self.rows[name] = self.status.insert("", "end", text=name, values=("", ""))
+        self.status.selection_set(list(self.rows.values()))
+
+        btns = tk.Frame(self, bg="#0A3D62")
+        btns.pack(fill="x", padx=8, pady=8)
+        self.send_btn = tk.Button(btns, text="Envoyer à la sélection", bg="#27ae60", fg="white",
+                                  command=lambda: self.start(self._selected_entries()))
+        self.send_btn.pack(side="left")
+        self.retry_btn = tk.Button(btns, text="Relancer les échecs", bg="#0E4F95", fg="white",
+                                   command=lambda: self.start(self._failed_entries()))
+        self.retry_btn.pack(side="left", padx=6)
+        tk.Button(btns, text="Fermer", bg="#8B0000", fg="white", command=self.destroy).pack(side="right")
+
+    def pick_file(self):
+        path = filedialog.askopenfilename(parent=self)
+        if path:
+            # Lecture unique : le même tampon sert à tous les serveurs
+            self.data = self.fanout.read_shared(path)
+            self.local_name = os.path.basename(path)
+            self.file_label.configure(text=f"{path} ({len(self.data)} octets)")
+
+    def _selected_entries(self):
+        selected = set(self.status.selection())
+        return [e for e in self.entries if self.rows[self.fanout.entry_key(e)] in selected]
+
+    def _failed_entries(self):
+        return [e for e in self.entries
+                if self.status.set(self.rows[self.fanout.entry_key(e)], "state") == self.fanout.FAILED]
+
+    def start(self, targets):
+        if self.data is None:
+            messagebox.showwarning("Fichier requis", "Choisissez d'abord un fichier local.", parent=self)
+            return
+        if not targets:
+            return
+        # Un seul envoi à la fois : boutons réactivés à la fin de _worker
+        self.send_btn.config(state="disabled")
+        self.retry_btn.config(state="disabled")
+        args = (targets, self.data, self.remote_var.get().strip(), self.local_name, self.parallel_var.get())
+        threading.Thread(target=self._worker, args=args, daemon=True).start()
+
+    def _worker(self, targets, data, remote_path, local_name, parallel):
+        try:
+            results = self.fanout.fan_out(targets, data, remote_path, local_name, parallel,
+                                          on_status=self._on_status)
+        finally:
+            self.after(0, self._finished)
+        failed = sum(1 for state, _ in results.values() if state == self.fanout.FAILED)
+        self.after(0, lambda: messagebox.showinfo(
+            "Déploiement terminé", f"{len(results) - failed} réussi(s), {failed} échec(s).", parent=self))
+
+    def _finished(self):
+        if self.winfo_exists():
+            self.send_btn.config(state="normal")
+            self.retry_btn.config(state="normal")
+
+    def _on_status(self, name, state, detail):
+        def update():
+            iid = self.rows.get(name)
+            if iid and self.status.exists(iid):
+                self.status.item(iid, values=(state, detail))
+        self.after(0, update)
+
+# =================================================================
+# SESSIONS OUVERTES
+# =================================================================
+
+class SessionsWindow(tk.Toplevel):
+    """Sessions SSH ouvertes (fenêtres et préconnexions), rafraîchies toutes les 2 s."""
+    COLUMNS = (("state", "État", 150), ("idle", "Inactive depuis", 100), ("channels", "Canaux", 60),
+               ("requests", "Requêtes SFTP", 95), ("buffered", "Tampons", 80),
+               ("rows", "Listing en mémoire", 150), ("socket", "Socket", 260))
+
+    def __init__(self, manager):
+        super().__init__(manager)
+        self.manager = manager
+        self.title("Sessions ouvertes")
+        self.geometry("1150x400")
+        self.configure(bg="#0A3D62")
+
+        bar = tk.Frame(self, bg="#0A3D62")
+        bar.pack(fill="x", padx=5, pady=5)
+        self.memory = tk.Label(bar, text="", bg="#0A3D62", fg="#A1D6E2")
+        self.memory.pack(side="left")
+        tk.Button(bar, text="Appliquer", bg="#0E4F95", fg="white", command=self._apply_timeout).pack(side="right", padx=2)
+        tk.Label(bar, text="min (0 = jamais)", bg="#0A3D62", fg="#A1D6E2").pack(side="right")
+        self.timeout_var = tk.StringVar(value=str(sessions.idle_timeout() // 60))
+        tk.Spinbox(bar, from_=0, to=1440, width=5, textvariable=self.timeout_var).pack(side="right", padx=4)
+        tk.Label(bar, text="Fermer les sessions inactives après", bg="#0A3D62", fg="#A1D6E2").pack(side="right")
+
+        self.tree = ttk.Treeview(self, columns=[c[0] for c in self.COLUMNS], selectmode="browse")
+        self.tree.heading("#0", text="Fenêtre")
+        self.tree.column("#0", width=220)
+        for key, label, width in self.COLUMNS:
+            self.tree.heading(key, text=label)
+            self.tree.column(key, width=width)
+        self.tree.pack(fill="both", expand=True, padx=5, pady=5)
+
+        actions = tk.Frame(self, bg="#0A3D62")
+        actions.pack(fill="x", padx=5, pady=5)
+        tk.Button(actions, text="Mettre en veille", bg="#0E4F95", fg="white",
+                  command=lambda: self._act("suspend")).pack(side="left", padx=2)
+        tk.Button(actions, text="Fermer la fenêtre", bg="#8B0000", fg="white",
+                  command=lambda: self._act("close")).pack(side="left", padx=2)
+        self._tick()
+
+    def _apply_timeout(self):
+        try:
+            minutes = int(self.timeout_var.get())
+        except ValueError:
+            messagebox.showerror("Sessions", "Durée invalide.", parent=self)
+            return
+        sessions.set_idle_timeout(minutes * 60)
+
+    def _act(self, action):
+        sel = self.tree.selection()
+        if not sel:
+            return
+        for window in sessions.windows():
+            if str(window) == sel[0]:
+                getattr(window, action)()
+        self._tick(reschedule=False)
+
+    @staticmethod
+    def _values(ssh, state, idle, rows):
+        info = ssh.session_info()
+        if not info["connected"]:
+            return (state if state == "en veille" else "déconnectée", idle, "", "", "", rows, "")
+        socket = f"{info['local']} → {info['peer']}" if info["peer"] else ""
+        return (state, idle, info["channels"], info["requests"], diskusage.format_size(info["buffered"]),
+                rows, socket)
+
+    def _tick(self, reschedule=True):
+        if not self.winfo_exists():
+            return
+        selected = self.tree.selection()
+        self.tree.delete(*self.tree.get_children())
+        now = time.monotonic()
+        for window in sessions.windows():
+            if not window.winfo_exists():
+                continue
+            if window.suspended:
+                state = "en veille"
+            else:
+                state = "occupée" if window.ssh.is_busy() else "active"
+            idle = f"{int(now - window.last_activity) // 60} min"
+            rows = f"{len(window.all_rows)} lignes ({diskusage.format_size(sessions.rows_memory(window.all_rows))})"
+            self.tree.insert("", "end", iid=str(window), text=window.title(),
+                             values=self._values(window.ssh, state, idle, rows))
+        for name, ssh in self.manager.warm_pool.sessions():
+            self.tree.insert("", "end", iid=f"warm:{name}", text=name,
+                             values=self._values(ssh, "préconnexion", "", ""))
+        for iid in selected:
+            if self.tree.exists(iid):
+                self.tree.selection_set(iid)
+        memory = sessions.process_memory()
+        self.memory.config(text=f"Mémoire du programme : {diskusage.format_size(memory)}" if memory else "")
+        if reschedule:
+            self.after(2000, self._tick)
+
 # =================================================================
 # SERVER MANAGER UI
 # =================================================================
@@ -271,9 +1834,23 @@ class ServerManagerUI(tk.Tk):
         self.title("Gestionnaire de serveurs SSH")
         self.geometry("650x450")
         self.configure(bg="#0A3D62")
-        self.explorers = {}
+        self.explorers = []  # fenêtres ouvertes (plusieurs possibles par serveur)
+        # Connexions préparées d'avance pour les serveurs les plus utilisés
+        self.warm_pool = warmup.WarmPool()
         self._build_ui()
         self.refresh_list()
+        if self.warmup_var.get():
+            self.warm_pool.start(warmup.top_entries(self.entries))
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+    def _on_close(self):
+        for explorer in list(self.explorers):
+            try:
+                explorer.close()
+            except tk.TclError:
+                pass
+        self.warm_pool.close()
+        self.destroy()
 
     def _build_ui(self):
         # Titre
@@ -301,6 +1878,10 @@ class ServerManagerUI(tk.Tk):
         # Bouton Ajouter
         tk.Button(btn_frame, text="➕ Ajouter", command=self.add_server, 
                   bg="#0E4F95", fg="white", width=10, height=1).pack(side="left", padx=5)
+
+        # Bouton Déployer (même fichier vers plusieurs serveurs)
+        tk.Button(btn_frame, text="📤 Déployer", command=lambda: FanOutDialog(self, self.entries),
+                  bg="#0E4F95", fg="white", width=10, height=1).pack(side="left", padx=5)
         
         # --- BOUTON SUPPRIMER (VERSION AJUSTÉE) ---
         tk.Button(btn_frame, 
@@ -315,6 +1896,21 @@ class ServerManagerUI(tk.Tk):
                   cursor="hand2"
                   ).pack(side="left", padx=10) # Espacement (padx) réduit à 10
 
+        # Préconnexion au lancement (serveurs les plus utilisés)
+        options = tk.Frame(self, bg="#0A3D62")
+        options.pack(fill="x", padx=10, pady=(0, 8))
+        self.warmup_var = tk.BooleanVar(value=warmup.is_enabled())
+        tk.Checkbutton(options, text="⚡ Préconnecter les serveurs fréquents au lancement",
+                       variable=self.warmup_var, command=self._toggle_warmup,
+                       bg="#0A3D62", fg="#A1D6E2", selectcolor="#0A3D62").pack(side="left")
+        tk.Button(options, text="🔌 Sessions", command=lambda: SessionsWindow(self),
+                  bg="#0E4F95", fg="white").pack(side="right")
+
+    def _toggle_warmup(self):
+        warmup.set_enabled(self.warmup_var.get())
+        if self.warmup_var.get():
+            self.warm_pool.start(warmup.top_entries(self.entries))
+
     def show_context_menu(self, event):
         idx = self.lb.nearest(event.y)
         if idx >= 0:
@@ -341,37 +1937,48 @@ class ServerManagerUI(tk.Tk):
         if not cur: return
         
         entry = self.entries[cur[0]]
-        server_display = f"{entry.get('user_serveur')}@{entry.get('user_host')}"
-        
+        server_display = entry_display(entry)
+
         # Préparation config pour SSHClient
         try:
-            port = int(entry.get("user_port", 22))
-            auth = {"type": "key", "key_path": entry["key_path"]} if entry.get("key_path") else {"type": "password", "password": entry.get("password")}
-            
-            cfg = {
-                "host": entry["user_host"],
-                "port": port,
-                "username": entry["user_serveur"],
-                "auth": auth,
-                "start_path": entry.get("user_start_path", "/")
-            }
-            
+            cfg = config_from_entry(entry)
+            if self.warm_pool.has(entry):
+                # Connexion déjà établie en arrière-plan : ouverture immédiate
+                ssh = self.warm_pool.take(entry)
+                if ssh is not None:
+                    threading.Thread(target=warmup.record_use, args=(entry,), daemon=True).start()
+                    return self._open_explorer(ssh, cfg, server_display)
             ssh = SSHClient(cfg)
-            threading.Thread(target=self._connection_worker, args=(ssh, cfg, server_display), daemon=True).start()
+            threading.Thread(target=self._connection_worker, args=(ssh, cfg, server_display, entry), daemon=True).start()
         except Exception as e:
             messagebox.showerror("Erreur", f"Config invalide : {e}")
 
-    def _connection_worker(self, ssh, cfg, name):
+    def _connection_worker(self, ssh, cfg, name, entry=None):
         try:
-            ssh.connect()
+            # Préconnexion encore en cours : on l'attend plutôt que de recommencer
+            warm = self.warm_pool.take(entry) if entry is not None else None
+            if warm is not None:
+                ssh = warm
+            else:
+                ssh.connect()
+            if entry is not None:
+                warmup.record_use(entry)
             self.after(0, lambda: self._open_explorer(ssh, cfg, name))
         except Exception as e:
-            self.after(0, lambda: messagebox.showerror("Echec Connexion", str(e)))
+            msg = str(e)
+            self.after(0, lambda: messagebox.showerror("Echec Connexion", msg, parent=self))
 
     def _open_explorer(self, ssh, cfg, name):
         explorer = ExplorerUI(self, ssh, cfg.get("start_path", "/"))
         explorer.title(f"SSH: {name}")
-        self.explorers[name] = explorer
+        self.explorers.append(explorer)
+        explorer.bind("<Destroy>", lambda e: self._forget_explorer(explorer) if e.widget is explorer else None,
+                      add="+")
+
+    def _forget_explorer(self, explorer):
+        if explorer in self.explorers:
+            self.explorers.remove(explorer)
+        sessions.unregister(explorer)
 
     def add_server(self):
         from config import prompt_new_server, save_entries
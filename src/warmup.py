@@ -0,0 +1,179 @@
+# warmup.py
+# Préconnexion en arrière-plan aux serveurs les plus utilisés.
+# L'historique d'utilisation (nombre de connexions, dernière connexion) est
+# conservé dans warmup.json ; au lancement du gestionnaire, les WARMUP_COUNT
+# serveurs les mieux classés sont connectés d'avance, et un double-clic
+# récupère la connexion déjà ouverte au lieu d'en établir une nouvelle.
+import os
+import json
+import time
+import threading
+
+from logic import SSHClient, config_from_entry, entry_display
+from servers import get_path
+
+WARMUP_FILE = get_path("warmup.json")
+WARMUP_COUNT = 3
+# Connexion préparée mais jamais utilisée : fermée au bout de ce délai
+WARMUP_TTL = 10 * 60
+# Poids de la récence face à la fréquence : une connexion vieille d'une
+# demi-vie compte moitié moins.
+RECENCY_HALF_LIFE = 7 * 24 * 3600
+
+# warmup.json est lu puis réécrit depuis plusieurs threads
+_lock = threading.Lock()
+
+
+def entry_key(entry):
+    """Identifiant d'un serveur (historique et réserve) : utilisateur@hôte:port."""
+    return "{}:{}".format(entry_display(entry), config_from_entry(entry)["port"])
+
+
+# ===================== HISTORIQUE D'UTILISATION =====================
+
+def _load():
+    try:
+        with open(WARMUP_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save(data):
+    tmp = WARMUP_FILE + ".new"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, WARMUP_FILE)
+
+
+def is_enabled():
+    return bool(_load().get("enabled", False))
+
+
+def set_enabled(enabled):
+    with _lock:
+        data = _load()
+        data["enabled"] = bool(enabled)
+        _save(data)
+
+
+def record_use(entry):
+    """Note une connexion à `entry` (sert au classement des serveurs à préparer)."""
+    with _lock:
+        data = _load()
+        usage = data.setdefault("usage", {})
+        item = usage.setdefault(entry_key(entry), {"count": 0, "last": 0})
+        item["count"] += 1
+        item["last"] = time.time()
+        _save(data)
+
+
+def top_entries(entries, count=WARMUP_COUNT):
+    """Les `count` entrées les plus utilisées, la récence pondérant la fréquence."""
+    usage = _load().get("usage", {})
+    now = time.time()
+
+    def score(entry):
+        item = usage.get(entry_key(entry))
+        if not item:
+            return 0.0
+        return item["count"] * 0.5 ** ((now - item["last"]) / RECENCY_HALF_LIFE)
+
+    ranked = sorted((e for e in entries if score(e) > 0), key=score, reverse=True)
+    return ranked[:count]
+
+
+# ===================== RÉSERVE DE CONNEXIONS =====================
+
+class _Warm:
+    def __init__(self, entry):
+        self.ssh = SSHClient(dict(config_from_entry(entry), auto_tune=False))
+        self.ready = threading.Event()
+        self.error = None
+        self.created = time.monotonic()
+
+
+class WarmPool:
+    """Connexions ouvertes d'avance, récupérées une seule fois par take()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items = {}
+        self._closed = False
+        self._expiring = False  # un seul thread d'expiration à la fois
+
+    def start(self, entries):
+        """Lance en parallèle la connexion à chacune des `entries`."""
+        for entry in entries:
+            name = entry_key(entry)
+            with self._lock:
+                if self._closed or name in self._items:
+                    continue
+                warm = self._items[name] = _Warm(entry)
+            threading.Thread(target=self._connect, args=(warm,), daemon=True).start()
+        with self._lock:
+            if self._expiring or not self._items:
+                return
+            self._expiring = True
+        threading.Thread(target=self._expire, daemon=True).start()
+
+    def _connect(self, warm):
+        try:
+            warm.ssh.connect()
+        except Exception as e:
+            warm.error = e
+        finally:
+            warm.ready.set()
+
+    def _expire(self):
+        while True:
+            time.sleep(30)
+            with self._lock:
+                if self._closed or not self._items:
+                    self._expiring = False
+                    return
+                now = time.monotonic()
+                stale = [n for n, w in self._items.items()
+                         if w.ready.is_set() and now - w.created > WARMUP_TTL]
+                doomed = [self._items.pop(n) for n in stale]
+            for w in doomed:
+                w.ssh.close()
+
+    def take(self, entry, timeout=15):
+        """Retourne une connexion prête pour `entry`, ou None.
+
+        Si la préconnexion est encore en cours, attend sa fin (au plus
+        `timeout` secondes) : c'est toujours plus court que de recommencer.
+        Appeler depuis un thread de travail.
+        """
+        with self._lock:
+            warm = self._items.pop(entry_key(entry), None)
+        if warm is None:
+            return None
+        if not warm.ready.wait(timeout) or warm.error is not None:
+            warm.ssh.close()
+            return None
+        transport = warm.ssh.ssh.get_transport() if warm.ssh.ssh else None
+        if transport is None or not transport.is_active():
+            warm.ssh.close()
+            return None
+        return warm.ssh
+
+    def has(self, entry):
+        """True si une connexion prête (déjà établie) attend pour `entry`."""
+        with self._lock:
+            warm = self._items.get(entry_key(entry))
+        return warm is not None and warm.ready.is_set() and warm.error is None
+
+    def sessions(self):
+        """[(nom, SSHClient)] des préconnexions établies et pas encore utilisées."""
+        with self._lock:
+            return [(n, w.ssh) for n, w in self._items.items() if w.ready.is_set() and w.error is None]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            items, self._items = list(self._items.values()), {}
+        for w in items:
+            w.ssh.close()
@@ -0,0 +1,228 @@
+# workspace.py
+# Espace de travail temporaire propre à l'application.
+# Tout fichier temporaire créé par l'explorateur (sauvegardes de l'éditeur,
+# fichiers vides, transferts partiels) est inscrit dans un manifeste afin que
+# le nettoyage ne touche QUE ce que l'application a elle-même créé.
+# Plusieurs instances peuvent tourner en même temps : le manifeste est protégé
+# par un verrou de fichier, et le nettoyage épargne les entrées des processus
+# encore vivants.
+import os
+import json
+import time
+import errno
+import shutil
+import tempfile
+import threading
+import contextlib
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+APP_DIR_NAME = "explorateur_distant"
+WORKSPACE_DIR = os.path.join(tempfile.gettempdir(), APP_DIR_NAME)
+MANIFEST_FILE = os.path.join(WORKSPACE_DIR, "manifest.json")
+LOCK_FILE = os.path.join(WORKSPACE_DIR, "manifest.lock")
+
+_lock = threading.Lock()
+
+
+# ===================== MANIFESTE =====================
+
+def get_workspace():
+    """Retourne le dossier de travail de l'application (créé si besoin)."""
+    os.makedirs(WORKSPACE_DIR, exist_ok=True)
+    return WORKSPACE_DIR
+
+
+@contextlib.contextmanager
+def _locked():
+    """Accès exclusif au manifeste, entre threads et entre processus."""
+    with _lock:
+        get_workspace()
+        with open(LOCK_FILE, "a+b") as f:
+            if os.name == "nt":
+                import msvcrt
+                f.seek(0)
+                while True:
+                    try:
+                        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass  # LK_LOCK abandonne après 10 s : on réessaie
+                try:
+                    yield
+                finally:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _pid_alive(pid):
+    """True si le processus `pid` tourne encore (l'instance qui a créé l'entrée)."""
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    if pid == os.getpid():
+        return True
+    if HAS_PSUTIL:
+        return psutil.pid_exists(pid)
+    if os.name == "nt":
+        # os.kill(pid, 0) terminerait le processus sous Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return bool(ok) and code.value == 259  # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # existe, mais appartient à un autre utilisateur
+    except OSError:
+        return False
+    return True
+
+
+def _load_manifest():
+    try:
+        with open(MANIFEST_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(entries):
+    get_workspace()
+    tmp = MANIFEST_FILE + ".new"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entries, f)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def register(path):
+    """Inscrit un chemin (fichier ou dossier) créé par l'application."""
+    path = os.path.abspath(path)
+    with _locked():
+        entries = _load_manifest()
+        entries[path] = {"pid": os.getpid(), "created": time.time()}
+        _save_manifest(entries)
+    return path
+
+
+def unregister(path):
+    """Retire un chemin du manifeste (sans le supprimer)."""
+    path = os.path.abspath(path)
+    with _locked():
+        entries = _load_manifest()
+        if entries.pop(path, None) is not None:
+            _save_manifest(entries)
+
+
+# ===================== FICHIERS TEMPORAIRES =====================
+
+def new_temp_file(suffix="", prefix="tmp"):
+    """Crée un fichier vide dans l'espace de travail et retourne son chemin."""
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix=prefix, dir=get_workspace())
+    os.close(fd)
+    return register(path)
+
+
+def partial_path(final_path):
+    """Chemin d'un transfert partiel, dans l'espace de travail et inscrit au manifeste.
+
+    Rien n'est laissé à côté de la destination si le transfert est interrompu :
+    le nettoyage retrouve tous les fichiers partiels au même endroit.
+    """
+    name = os.path.basename(final_path) or "transfert"
+    return new_temp_file(suffix=".part", prefix=name + ".")
+
+
+def commit_partial(part_path, final_path):
+    """Remplace atomiquement `final_path` par le transfert terminé.
+
+    Destination sur un autre volume que l'espace de travail : copie vers un
+    nom temporaire à côté d'elle (inscrit au manifeste le temps de la copie),
+    puis renommage.
+    """
+    try:
+        os.replace(part_path, final_path)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        folder, name = os.path.split(os.path.abspath(final_path))
+        fd, staging = tempfile.mkstemp(prefix=f".{name}.", suffix=".part", dir=folder)
+        os.close(fd)
+        register(staging)
+        try:
+            shutil.copy2(part_path, staging)
+            os.replace(staging, final_path)
+        except BaseException:
+            release(staging)
+            raise
+        unregister(staging)
+        release(part_path)
+        return
+    unregister(part_path)
+
+
+def release(path):
+    """Supprime un fichier temporaire et le retire du manifeste."""
+    try:
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        elif os.path.exists(path):
+            os.remove(path)
+    except OSError:
+        pass
+    unregister(path)
+
+
+# ===================== NETTOYAGE =====================
+
+def clean(include_current=False):
+    """Supprime les entrées du manifeste laissées par les exécutions terminées.
+
+    Les fichiers des instances encore en cours (autres fenêtres, CLI) sont
+    conservés ; ceux de l'instance courante aussi, sauf si `include_current`.
+    Retourne le nombre d'entrées supprimées.
+    """
+    pid = os.getpid()
+    with _locked():
+        entries = _load_manifest()
+        stale = [p for p, meta in entries.items()
+                 if (include_current and meta.get("pid") == pid) or not _pid_alive(meta.get("pid"))]
+        for p in stale:
+            entries.pop(p, None)
+        if stale:
+            _save_manifest(entries)
+
+    for p in stale:
+        try:
+            if os.path.isdir(p):
+                shutil.rmtree(p, ignore_errors=True)
+            elif os.path.exists(p):
+                os.remove(p)
+        except OSError:
+            pass
+    return len(stale)
+
+
+def clean_in_background():
+    """Lance `clean()` dans un thread démon pour ne pas retarder le démarrage."""
+    t = threading.Thread(target=clean, daemon=True)
+    t.start()
+    return t